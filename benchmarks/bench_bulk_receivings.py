@@ -0,0 +1,126 @@
+"""Durchsatz der Sammelanlage von Wareneingängen (createReceiving mit Liste) gegenüber dem bisherigen Weg.
+
+Bisher: ein Wareneingangskopf über createReceiving und jede Position einzeln über createReceivingPos. Neu: ein Aufruf
+von createReceiving mit einer Liste von Wareneingängen samt Positionen. Gemessen werden Dauer, Positionen je Sekunde
+und Anzahl der SQL-Statements gegen eine lokale SQLite-Datenbank. Anschließend werden die Bewertungsschichten beider
+Wege mit einem Neuaufbau aus den Wareneingängen verglichen; bei einer Abweichung endet das Skript mit Exit-Code 1.
+
+Aufruf: python benchmarks/bench_bulk_receivings.py [--positions N] [--deliveries N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import simplejson as json
+
+os.environ.setdefault('DB_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bulk_receivings.db'))
+os.environ.setdefault('QUERY_LOG_SAMPLE_RATE', '0')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'receiving_handler'))
+
+from sqlalchemy.dialects.mysql import DOUBLE, TINYINT  # noqa: E402
+from sqlalchemy.ext.compiler import compiles  # noqa: E402
+
+MATERIALS = 200
+
+
+@compiles(DOUBLE, 'sqlite')
+def _compileDouble(type_, compiler, **kw):
+    return 'FLOAT'
+
+
+@compiles(TINYINT, 'sqlite')
+def _compileTinyint(type_, compiler, **kw):
+    return 'INTEGER'
+
+
+def seed():
+    from db import engine, session_scope
+    from schema_receiving import Base, Material, Supplier
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with session_scope() as session:
+        session.add(Supplier(idsuppliers=1, name='Lieferant'))
+        for i in range(MATERIALS):
+            session.add(Material(idmaterials=50000000 + i, name='M' + str(i), art='Rohstoff'))
+
+
+def position(delivery, number):
+    return {'position': number, 'fkmaterials': 50000000 + (delivery * 7 + number) % MATERIALS,
+            'quantity': number % 9 + 1, 'price': round(1 + number % 13 * 0.25, 2)}
+
+
+def singlePath(deliveries, positions):
+    """Kopf über createReceiving, Positionen einzeln über createReceivingPos."""
+    from receivings_handler import createReceiving, createReceivingPos
+    from query_stats import query_statistics
+
+    statements = 0
+    for delivery in range(deliveries):
+        response = createReceiving({'body': json.dumps({'fksuppliers': 1, 'capturer': 'einzeln'})}, None)
+        statements = statements + query_statistics.count
+        id = json.loads(response['body'])['id']
+        for number in range(1, positions + 1):
+            body = dict(position(delivery, number), fkreceivings=id)
+            response = createReceivingPos({'body': json.dumps(body)}, None)
+            statements = statements + query_statistics.count
+            assert response['statusCode'] == 200, response['body']
+    return statements
+
+
+def bulkPath(deliveries, positions):
+    """Eine Sammelanlage je Lieferung."""
+    from receivings_handler import createReceiving
+    from query_stats import query_statistics
+
+    statements = 0
+    for delivery in range(deliveries):
+        body = [{'fksuppliers': 1, 'capturer': 'sammel',
+                 'receivingPos': [position(delivery, number) for number in range(1, positions + 1)]}]
+        response = createReceiving({'body': json.dumps(body)}, None)
+        statements = statements + query_statistics.count
+        assert response['statusCode'] == 200, response['body']
+    return statements
+
+
+def verifyValuations():
+    """Vergleicht die fortgeschriebenen Bewertungsschichten mit einem Neuaufbau aus den Wareneingängen."""
+    from db import session_scope
+    from schema_receiving import MaterialValuation
+    from valuation import buildLayers, loadLayers
+
+    differences = 0
+    with session_scope() as session:
+        for valuation in session.query(MaterialValuation):
+            expected = json.loads(json.dumps(buildLayers(loadLayers(session, valuation.fkmaterials))))
+            if json.loads(valuation.layers) != expected:
+                differences = differences + 1
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Durchsatz der Sammelanlage von Wareneingängen')
+    parser.add_argument('--positions', type=int, default=300, help='Positionen je Lieferung')
+    parser.add_argument('--deliveries', type=int, default=3, help='Anzahl Lieferungen')
+    args = parser.parse_args()
+    positions = args.positions
+    deliveries = args.deliveries
+    seed()
+
+    for name, path in (('einzeln', singlePath), ('Sammelanlage', bulkPath)):
+        start = time.time()
+        statements = path(deliveries, positions)
+        duration = time.time() - start
+        print('%-13s %d Lieferungen x %d Positionen: %7.2f s, %8.1f Positionen/s, %6d Statements' %
+              (name, deliveries, positions, duration, deliveries * positions / duration, statements))
+
+    differences = verifyValuations()
+    if differences:
+        print('FEHLER: ' + str(differences) + ' Bewertungen weichen vom Neuaufbau ab')
+        sys.exit(1)
+    print('OK: Bewertungsschichten identisch mit dem Neuaufbau')
+
+
+if __name__ == '__main__':
+    main()
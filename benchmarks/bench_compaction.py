@@ -0,0 +1,150 @@
+"""Prüft die Verdichtung des Journals stockEntries (stock_handler/compaction.py) gegen eine SQLite-Datenbank.
+
+Die Datenbank wird mit alembic upgrade head angelegt und mit Buchungen über zwei Jahre gefüllt (Zu- und Abgänge, mit
+und ohne Produktionsauftrag). Geprüft wird, dass die Summen des Journals (balances.ledgerBalances, Sicht inventory)
+nach einem abgebrochenen Lauf, nach dem Fortsetzen und nach einem erneuten Lauf unverändert sind, die Bestände
+(stockBalances) zum Journal passen und jede Buchung genau einmal im Journal oder im Archiv steht. Ausgegeben werden die
+Zeilen des Journals und die Dauer von ledgerBalances vor und nach der Verdichtung.
+
+Aufruf: python benchmarks/bench_compaction.py [--entries N]
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+
+MATERIALS = 50
+PLACES = 10
+FIRST_MATERIAL = 50000000
+
+
+def setup():
+    os.environ.setdefault('DB_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_compaction.db'))
+    os.environ.setdefault('QUERY_LOG_SAMPLE_RATE', '0')
+    os.environ.setdefault('METRICS_EMF', '0')
+    subprocess.check_call([sys.executable, '-m', 'alembic', 'upgrade', 'head'], cwd=ROOT)
+    sys.path.insert(0, os.path.join(ROOT, 'stock_handler'))
+
+    from sqlalchemy.dialects.mysql import DOUBLE, TINYINT
+    from sqlalchemy.ext.compiler import compiles
+
+    @compiles(DOUBLE, 'sqlite')
+    def _compileDouble(type_, compiler, **kw):
+        return 'FLOAT'
+
+    @compiles(TINYINT, 'sqlite')
+    def _compileTinyint(type_, compiler, **kw):
+        return 'INTEGER'
+
+
+def seed(count):
+    from db import engine, session_scope
+    from schema_stock import Material, Stock, Place, StockEntry
+    from balances import rebuildBalances
+
+    rnd = random.Random(7)
+    start = datetime.now() - timedelta(days=730)
+    entries = []
+    for e in range(count):
+        order = rnd.choice([None, '', 'PO-' + str(rnd.randrange(20))])
+        entries.append(dict(fkmaterials=FIRST_MATERIAL + rnd.randrange(MATERIALS), fkplaces=rnd.randrange(PLACES) + 1,
+                            productionOrderNr=order, opened=rnd.randrange(2), quantity=rnd.choice([5, 10, -3, -7]),
+                            booking_date=start + timedelta(minutes=e * 730 * 24 * 60 // count)))
+    # Einige Buchungen mit früherem Datum zwischen den neuen (nachträglich erfasst)
+    for entry in rnd.sample(entries[count // 2:], count // 100):
+        entry['booking_date'] = entry['booking_date'] - timedelta(days=400)
+
+    with engine.begin() as connection:
+        connection.execute(Material.__table__.insert(), [
+            dict(idmaterials=FIRST_MATERIAL + i, name='Material ' + str(i), art='Fertigware')
+            for i in range(MATERIALS)])
+        connection.execute(Stock.__table__.insert(), [dict(idstocks=1, description='Lager')])
+        connection.execute(Place.__table__.insert(), [
+            dict(idplaces=p + 1, description='Platz', fkstocks=1) for p in range(PLACES)])
+        connection.execute(StockEntry.__table__.insert(), entries)
+    with session_scope() as session:
+        rebuildBalances(session)
+
+
+def state():
+    """Summen des Journals, Inhalt der Sicht inventory, Abweichungen der Bestände und Dauer von ledgerBalances."""
+    from sqlalchemy import func
+    from db import session_scope
+    from schema_stock import StockEntry, StockEntryArchive
+    from balances import ledgerBalances, verifyBalances
+
+    with session_scope() as session:
+        start = time.time()
+        ledger = ledgerBalances(session)
+        duration = time.time() - start
+        inventory = sorted((row[0], row[1], row[2], int(row[3])) for row in session.execute(
+            'SELECT fkplaces, fkmaterials, opened, quantity FROM inventory'))
+        differences = verifyBalances(session)
+        ids = [id for (id,) in session.query(StockEntry.idstockEntries).filter(StockEntry.snapshot_date.is_(None))]
+        ids = ids + [id for (id,) in session.query(StockEntryArchive.idstockEntries)]
+        rows = session.query(func.count(StockEntry.idstockEntries)).scalar()
+    return {'ledger': ledger, 'inventory': inventory, 'differences': differences, 'ids': sorted(ids), 'rows': rows,
+            'duration': duration}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verdichtung des Journals stockEntries')
+    parser.add_argument('--entries', type=int, default=20000, help='Anzahl Buchungen')
+    count = parser.parse_args().entries
+    setup()
+    seed(count)
+
+    from db import session_scope
+    from compaction import compactBatch, compactEntries, compactionHorizon
+
+    before = state()
+    horizon = compactionHorizon(365)
+    errors = []
+
+    def check(step, result):
+        for name in ('ledger', 'inventory', 'ids'):
+            if result[name] != before[name]:
+                errors.append(step + ': ' + name + ' geändert')
+        if result['differences']:
+            errors.append(step + ': ' + str(len(result['differences'])) + ' Abweichungen der Bestände')
+        print('%-28s %8d Zeilen  ledgerBalances %7.1f ms' % (step, result['rows'], result['duration'] * 1000))
+
+    print('%-28s %8d Zeilen  ledgerBalances %7.1f ms' % ('vorher', before['rows'], before['duration'] * 1000))
+
+    # Abbruch nach dem ersten Block
+    with session_scope() as session:
+        compactBatch(session, horizon, batch_size=500)
+    check('nach einem Block', state())
+
+    result = compactEntries(horizon, batch_size=500)
+    check('fortgesetzt', state())
+    if not result['finished'] or result['compacted'] <= 0:
+        errors.append('Verdichtung nicht abgeschlossen: ' + str(result))
+
+    again = compactEntries(horizon, batch_size=500)
+    after = state()
+    check('erneut', after)
+    if again['compacted'] != 0:
+        errors.append('erneuter Lauf hat ' + str(again['compacted']) + ' Buchungen verdichtet')
+
+    later = compactEntries(compactionHorizon(180), batch_size=500)
+    check('späterer Horizont', state())
+    if later['compacted'] <= 0:
+        errors.append('späterer Horizont hat keine Buchungen verdichtet')
+
+    if errors:
+        for error in errors:
+            print('FEHLER: ' + error)
+        sys.exit(1)
+    print('OK: Summen unverändert, ' + str(before['rows'] - after['rows']) + ' Zeilen weniger im Journal')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,391 @@
+"""Lokaler Benchmark der Lambda Functions ohne AWS und ohne Partnerdienste.
+
+Für jedes CodeUri-Verzeichnis (stock_handler, receiving_handler) läuft ein eigener Prozess, da beide Verzeichnisse
+gleichnamige Module enthalten. Der Prozess füllt eine lokale Datenbank mit synthetischen Daten der gewählten Größe
+(SQLite oder über DB_URL eine MySQL/MariaDB-Testdatenbank) und ruft die Handler mit Events im Format des API Gateways
+auf. Produktion und Versand (ApiProductionUrl/ApiVersandUrl) werden durch den Stub-Server aus stub_partners.py ersetzt.
+
+Je Handler werden der erste Aufruf (kalt), p50/p95/p99 der folgenden Aufrufe, die maximale Anzahl an SQL-Statements
+(query_stats) und der Spitzenwert des Speichers eines Aufrufs (tracemalloc) ausgegeben und mit der gespeicherten
+Baseline (baseline_handlers.json) verglichen. Verschlechtern sich p50/p95, die Statements oder der Speicher über die
+Toleranz hinaus, endet das Skript mit Exit-Code 1. Laufzeiten zählen erst ab BENCH_MIN_LATENCY_ITERATIONS
+Wiederholungen (Standard 20) und werden bei einer Verschlechterung einmal nachgemessen, damit Messrauschen das Skript
+nicht scheitern lässt. Die Laufzeiten der Baseline hängen vom Rechner ab und sollten auf dem Vergleichsrechner neu
+gespeichert werden (--save-baseline).
+
+Aufruf: python benchmarks/bench_handlers.py [--size small|medium|large] [--iterations N] [--handler Name]
+                                            [--save-baseline]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import simplejson as json
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(BENCHMARKS, 'baseline_handlers.json')
+
+# Datenmengen je Größe: Materialien, Lagerplätze, Lagerbuchungen, Wareneingänge und Bestellungen mit je positions
+# Positionen
+SIZES = {
+    'small': dict(materials=50, places=10, stock_entries=1000, receivings=20, orders=20, positions=10),
+    'medium': dict(materials=500, places=50, stock_entries=10000, receivings=200, orders=200, positions=25),
+    'large': dict(materials=2000, places=200, stock_entries=100000, receivings=1000, orders=1000, positions=50),
+}
+
+# Erlaubte Verschlechterung gegenüber der Baseline (Anteil) und Mindestabstand der Laufzeit in Millisekunden, damit
+# Messrauschen bei sehr kurzen Aufrufen nicht als Verschlechterung gilt
+latency_tolerance = float(os.environ.get('BENCH_LATENCY_TOLERANCE', 0.5))
+latency_slack_ms = float(os.environ.get('BENCH_LATENCY_SLACK_MS', 2.0))
+# Laufzeiten führen erst ab dieser Anzahl an Wiederholungen zu einem Fehler, darunter werden sie nur ausgegeben
+min_latency_iterations = int(os.environ.get('BENCH_MIN_LATENCY_ITERATIONS', 20))
+memory_tolerance = float(os.environ.get('BENCH_MEMORY_TOLERANCE', 0.25))
+
+FIRST_MATERIAL = 50000000
+
+
+def apiEvent(method, path, resource=None, body=None, pathParameters=None, queryStringParameters=None):
+    """Event im Format der API Gateway Lambda-Proxy-Integration."""
+    return {
+        'resource': resource or path,
+        'path': path,
+        'httpMethod': method,
+        'headers': {'Content-Type': 'application/json', 'Host': 'localhost'},
+        'queryStringParameters': queryStringParameters,
+        'pathParameters': pathParameters,
+        'stageVariables': None,
+        'requestContext': {'resourcePath': resource or path, 'httpMethod': method, 'stage': 'Prod',
+                           'requestTimeEpoch': int(time.time() * 1000)},
+        'body': json.dumps(body) if body is not None else None,
+        'isBase64Encoded': False,
+    }
+
+
+def _material(size, i):
+    return FIRST_MATERIAL + i % size['materials']
+
+
+# Handler je Verzeichnis: (Name, Modul, Funktion, Event zur i-ten Wiederholung)
+CASES = {
+    'stock_handler': [
+        ('getInventory', 'inventory_handler', 'getInventory',
+         lambda size, i: apiEvent('GET', '/inventory')),
+        ('getInventory (Seite)', 'inventory_handler', 'getInventory',
+         lambda size, i: apiEvent('GET', '/inventory', queryStringParameters={'limit': '100'})),
+        ('getPackageList', 'goods_orders_handler', 'getPackageList',
+         lambda size, i: apiEvent('GET', '/goods/orders')),
+        ('createGoodsOrders', 'goods_orders_handler', 'createGoodsOrders',
+         lambda size, i: apiEvent('POST', '/goods/orders', body=[
+             {'fkmaterials': _material(size, 2 * i), 'quantity': 1}])),
+        ('bookMaterial', 'booking_handler', 'bookMaterial',
+         lambda size, i: apiEvent('POST', '/stock/material', body={
+             'fkmaterials': _material(size, 2 * i + 1), 'fkplaces': i % size['places'] + 1, 'opened': 0,
+             'quantity': 5})),
+        ('bookProductToStock', 'product_handler', 'bookProductToStock',
+         lambda size, i: apiEvent('POST', '/stock/product', body={
+             'productionOrderNr': 'BENCH-' + str(i), 'fkplaces': i % size['places'] + 1})),
+    ],
+    'receiving_handler': [
+        ('getReceiving', 'receivings_handler', 'getReceiving',
+         lambda size, i: apiEvent('GET', '/receivings/' + str(i % size['receivings'] + 1), '/receivings/{id}',
+                                  pathParameters={'id': str(i % size['receivings'] + 1)})),
+        ('get_allReceiving', 'receivings_handler', 'get_allReceiving',
+         lambda size, i: apiEvent('GET', '/receivings')),
+        ('getOrder', 'orders_handler', 'getOrder',
+         lambda size, i: apiEvent('GET', '/orders/' + str(i % size['orders'] + 1), '/orders/{id}',
+                                  pathParameters={'id': str(i % size['orders'] + 1)})),
+        ('getMaterial', 'materials_handler', 'getMaterial',
+         lambda size, i: apiEvent('GET', '/materials/' + str(_material(size, i)), '/materials/{id}',
+                                  pathParameters={'id': str(_material(size, i))})),
+        ('get_allMaterials', 'materials_handler', 'get_allMaterials',
+         lambda size, i: apiEvent('GET', '/materials')),
+        ('createReceivingPos', 'receivings_handler', 'createReceivingPos',
+         lambda size, i: apiEvent('POST', '/receivings/pos', body=[
+             {'fkreceivings': i % size['receivings'] + 1, 'position': size['positions'] + 1 + i // size['receivings'],
+              'fkmaterials': _material(size, i), 'quantity': 3, 'price': 1.5}])),
+    ],
+}
+
+
+def _setup(handler_dir):
+    sys.path.insert(0, os.path.join(BENCHMARKS, '..', handler_dir))
+
+    from sqlalchemy.dialects.mysql import DOUBLE, TINYINT
+    from sqlalchemy.ext.compiler import compiles
+
+    @compiles(DOUBLE, 'sqlite')
+    def _compileDouble(type_, compiler, **kw):
+        return 'FLOAT'
+
+    @compiles(TINYINT, 'sqlite')
+    def _compileTinyint(type_, compiler, **kw):
+        return 'INTEGER'
+
+
+def _receivingRows(size):
+    """Wareneingänge mit Positionen (Preis je Material und Wareneingang verschieden)."""
+    receivings = [dict(id=r + 1, capturer='bench', fksuppliers=1) for r in range(size['receivings'])]
+    positions = [dict(fkreceivings=r + 1, position=p + 1, fkmaterials=_material(size, r * size['positions'] + p),
+                      quantity=p % 9 + 1, price=round(1 + (r + p) % 13 * 0.25, 2))
+                 for r in range(size['receivings']) for p in range(size['positions'])]
+    return receivings, positions
+
+
+def seedStock(size):
+    """Füllt materials, places, stockEntries, stockBalances, inventory, goodsOrders(Pos) und receivings(Pos)."""
+    from datetime import datetime
+    from sqlalchemy import Table, Column, Integer
+    from db import engine
+    from schema_stock import Base, Material, Stock, Place, Inventory, StockEntry, StockBalance, GoodsOrder, \
+        GoodsOrderPosition, Receiving, ReceivingPosition, MaterialValuation, CacheVersion, ProductionOrder, \
+        OutboxEvent
+
+    # receivingsPos verweist auf ordersPos, das nur im Schema des receiving_handler enthalten ist
+    orders_pos = Table('ordersPos', Base.metadata, Column('idordersPos', Integer, primary_key=True))
+    tables = [orders_pos] + [model.__table__ for model in (
+        Material, Stock, Place, Inventory, StockEntry, StockBalance, GoodsOrder, GoodsOrderPosition, Receiving,
+        ReceivingPosition, MaterialValuation, CacheVersion, ProductionOrder, OutboxEvent)]
+    Base.metadata.drop_all(engine, tables=tables)
+    Base.metadata.create_all(engine, tables=tables)
+
+    now = datetime.now()
+    entries = []
+    balances = {}
+    for e in range(size['stock_entries']):
+        # Gerade Materialien: Fertigware mit Produktionsauftrag, ungerade: Rohstoffe ohne Produktionsauftrag
+        fkmaterials = _material(size, e)
+        productionOrderNr = 'PO-' + str(e % (size['materials'] * 4)) if fkmaterials % 2 == 0 else ''
+        entry = dict(fkmaterials=fkmaterials, fkplaces=e % size['places'] + 1, productionOrderNr=productionOrderNr,
+                     opened=0, quantity=e % 20 + 5, booking_date=now)
+        entries.append(entry)
+        key = (entry['fkmaterials'], entry['fkplaces'], productionOrderNr, 0)
+        balances[key] = balances.get(key, 0) + entry['quantity']
+
+    inventory = {}
+    for (fkmaterials, fkplaces, productionOrderNr, opened), quantity in balances.items():
+        key = (fkplaces, fkmaterials, opened)
+        inventory[key] = inventory.get(key, 0) + quantity
+
+    receivings, positions = _receivingRows(size)
+    with engine.begin() as connection:
+        connection.execute(Material.__table__.insert(), [
+            dict(idmaterials=FIRST_MATERIAL + i, name='Material ' + str(i), size=1, measure='st',
+                 art='Fertigware' if i % 2 == 0 else 'Rohstoff') for i in range(size['materials'])])
+        connection.execute(Stock.__table__.insert(), [dict(idstocks=1, description='Lager')])
+        connection.execute(Place.__table__.insert(), [
+            dict(idplaces=p + 1, description='Platz ' + str(p + 1), fkstocks=1) for p in range(size['places'])])
+        connection.execute(StockEntry.__table__.insert(), entries)
+        connection.execute(StockBalance.__table__.insert(), [
+            dict(fkmaterials=key[0], fkplaces=key[1], productionOrderNr=key[2], opened=key[3], quantity=quantity,
+                 first_booking_date=now) for key, quantity in balances.items()])
+        connection.execute(Inventory.__table__.insert(), [
+            dict(fkplaces=key[0], fkmaterials=key[1], opened=key[2], quantity=quantity)
+            for key, quantity in inventory.items()])
+        connection.execute(GoodsOrder.__table__.insert(), [
+            dict(idgoodsOrders=o + 1, fkmaterials=_material(size, 2 * o), creation_date=now)
+            for o in range(size['orders'])])
+        connection.execute(GoodsOrderPosition.__table__.insert(), [
+            dict(fkgoodsOrders=o + 1, productionOrderNr='PO-' + str(2 * o), quantity=1, done=0,
+                 fkplaces=o % size['places'] + 1) for o in range(size['orders'])])
+        connection.execute(Receiving.__table__.insert(), [dict(receiving, receiving_date=now)
+                                                           for receiving in receivings])
+        connection.execute(ReceivingPosition.__table__.insert(), positions)
+
+
+def seedReceiving(size):
+    """Füllt materials, suppliers, receivings(Pos), orders(Pos) und materialValuations."""
+    from datetime import datetime
+    from db import engine, session_scope
+    from schema_receiving import Base, Material, Supplier, Receiving, ReceivingPosition, Order, OrderPosition
+    from valuation import addValuationLayers
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    now = datetime.now()
+    receivings, positions = _receivingRows(size)
+    with engine.begin() as connection:
+        connection.execute(Material.__table__.insert(), [
+            dict(idmaterials=FIRST_MATERIAL + i, name='Material ' + str(i), size=1, measure='st',
+                 art='Fertigware' if i % 2 == 0 else 'Rohstoff') for i in range(size['materials'])])
+        connection.execute(Supplier.__table__.insert(), [dict(idsuppliers=1, name='Lieferant')])
+        connection.execute(Receiving.__table__.insert(), [dict(receiving, receiving_date=now)
+                                                           for receiving in receivings])
+        connection.execute(ReceivingPosition.__table__.insert(), positions)
+        connection.execute(Order.__table__.insert(), [
+            dict(idorders=o + 1, capturer='bench', state='offen', fksuppliers=1) for o in range(size['orders'])])
+        connection.execute(OrderPosition.__table__.insert(), [
+            dict(fkorders=o + 1, position=p + 1, fkmaterials=_material(size, o + p), quantity=p + 1)
+            for o in range(size['orders']) for p in range(size['positions'])])
+    with session_scope() as session:
+        addValuationLayers(session, [dict(position, receiving_date=now) for position in positions])
+
+
+def percentile(values, p):
+    """Perzentil nach dem Nearest-Rank-Verfahren."""
+    values = sorted(values)
+    rank = max(int(-(-p * len(values) // 100)), 1)
+    return values[rank - 1]
+
+
+def runCase(handler_dir, size, iterations, name, module, function, event):
+    """Ruft einen Handler kalt, einmal unter tracemalloc und danach iterations Mal auf."""
+    import importlib
+    from query_stats import query_statistics
+
+    handler = getattr(importlib.import_module(module), function)
+
+    def call(i):
+        start = time.perf_counter()
+        response = handler(event(size, i), None)
+        duration = (time.perf_counter() - start) * 1000
+        if response['statusCode'] not in (200, 207):
+            raise RuntimeError(name + ': Status ' + str(response['statusCode']) + ' ' + response['body'][:200])
+        return duration, query_statistics.count
+
+    cold, cold_queries = call(0)
+
+    # Speicher immer beim zweiten Aufruf messen, damit er nicht von der Anzahl der Wiederholungen abhängt
+    tracemalloc.start()
+    call(1)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies = []
+    queries = []
+    for i in range(2, iterations + 2):
+        duration, count = call(i)
+        latencies.append(duration)
+        queries.append(count)
+
+    return {'handler': name, 'cold_ms': round(cold, 3), 'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3), 'p99_ms': round(percentile(latencies, 99), 3),
+            'queries': max(queries), 'cold_queries': cold_queries, 'peak_kb': round(peak / 1024.0, 1)}
+
+
+def runHandlerDir(handler_dir, size_name, iterations, only):
+    """Läuft im Kindprozess: Datenbank füllen, Handler messen und Ergebnisse als JSON ausgeben."""
+    _setup(handler_dir)
+    size = SIZES[size_name]
+    if handler_dir == 'stock_handler':
+        seedStock(size)
+    else:
+        seedReceiving(size)
+
+    results = [runCase(handler_dir, size, iterations, name, module, function, event)
+               for name, module, function, event in CASES[handler_dir] if only is None or name == only]
+    sys.stdout.write(json.dumps(results) + '\n')
+
+
+def compare(results, baseline, iterations):
+    """Vergleicht die Ergebnisse mit der Baseline und gibt die Verschlechterungen als (Handler, Laufzeit ja/nein,
+    Meldung) zurück. Laufzeiten werden erst ab min_latency_iterations Wiederholungen verglichen."""
+    regressions = []
+    for result in results:
+        base = baseline.get(result['handler'])
+        if base is None:
+            continue
+        # p99 entspricht bei wenigen Wiederholungen dem langsamsten Aufruf und wird nur ausgegeben
+        for key in ('p50_ms', 'p95_ms'):
+            if iterations >= min_latency_iterations and \
+                    result[key] > base[key] * (1 + latency_tolerance) + latency_slack_ms:
+                regressions.append((result['handler'], True, '%s: %s %.1f ms statt %.1f ms' % (
+                    result['handler'], key, result[key], base[key])))
+        if result['queries'] > base['queries']:
+            regressions.append((result['handler'], False, '%s: %d Statements statt %d' % (
+                result['handler'], result['queries'], base['queries'])))
+        if result['peak_kb'] > base['peak_kb'] * (1 + memory_tolerance):
+            regressions.append((result['handler'], False, '%s: Speicher %.0f KB statt %.0f KB' % (
+                result['handler'], result['peak_kb'], base['peak_kb'])))
+    return regressions
+
+
+def measure(base, size, iterations, only=None):
+    """Misst die Handler (oder nur den Handler only) je CodeUri-Verzeichnis in einem eigenen Prozess mit neuer
+    Datenbank."""
+    directory = tempfile.mkdtemp()
+    results = []
+    for handler_dir in sorted(CASES):
+        if only is not None and only not in [case[0] for case in CASES[handler_dir]]:
+            continue
+        env = dict(os.environ)
+        env.setdefault('DB_URL', 'sqlite:///' + os.path.join(directory, handler_dir + '.db'))
+        env.setdefault('QUERY_LOG_SAMPLE_RATE', '0')
+        env.update({'API_PRODUCTION_URL': base + '/ok', 'API_VERSAND_URL': base + '/ok'})
+        command = [sys.executable, __file__, '--run', handler_dir, size, str(iterations)]
+        if only is not None:
+            command.append(only)
+        output = subprocess.check_output(command, env=env)
+        results.extend(json.loads(output.decode().strip().splitlines()[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lokaler Benchmark der Lambda Functions')
+    parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--handler', help='nur diesen Handler messen')
+    parser.add_argument('--save-baseline', action='store_true', help='Ergebnisse als Baseline speichern')
+    args = parser.parse_args()
+
+    sys.path.insert(0, BENCHMARKS)
+    from stub_partners import startStub
+    base = startStub()
+    results = measure(base, args.size, args.iterations, args.handler)
+
+    print('Größe %s (%s), %d Wiederholungen' % (args.size, ', '.join('%s=%d' % item for item in
+                                                                     sorted(SIZES[args.size].items())),
+                                                args.iterations))
+    print('%-22s %9s %9s %9s %9s %10s %12s' % ('Handler', 'kalt [ms]', 'p50 [ms]', 'p95 [ms]', 'p99 [ms]',
+                                                'Statements', 'Speicher [KB]'))
+    for result in results:
+        print('%-22s %9.1f %9.1f %9.1f %9.1f %10d %12.0f' % (result['handler'], result['cold_ms'], result['p50_ms'],
+                                                              result['p95_ms'], result['p99_ms'], result['queries'],
+                                                              result['peak_kb']))
+
+    baselines = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE) as f:
+            baselines = json.load(f)
+
+    if args.save_baseline:
+        baselines.setdefault(args.size, {}).update(dict((result['handler'], result) for result in results))
+        with open(BASELINE, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print('Baseline gespeichert: ' + BASELINE)
+        return
+
+    if args.size not in baselines:
+        print('Keine Baseline für die Größe ' + args.size + ' vorhanden (--save-baseline)')
+        return
+    regressions = compare(results, baselines[args.size], args.iterations)
+
+    # Laufzeiten einmal nachmessen, damit eine kurzzeitige Last des Rechners nicht als Verschlechterung gilt
+    retry = sorted(set(handler for handler, latency, message in regressions if latency))
+    if retry:
+        print('Laufzeit erneut messen: ' + ', '.join(retry))
+        for handler in retry:
+            for result in measure(base, args.size, args.iterations, handler):
+                print('%-22s %9s %9.1f %9.1f %9.1f' % (result['handler'], '', result['p50_ms'], result['p95_ms'],
+                                                       result['p99_ms']))
+                results = [result if previous['handler'] == handler else previous for previous in results]
+        regressions = compare(results, baselines[args.size], args.iterations)
+
+    if args.iterations < min_latency_iterations:
+        print('Laufzeiten werden erst ab %d Wiederholungen verglichen (--iterations)' % min_latency_iterations)
+    for handler, latency, regression in regressions:
+        print('VERSCHLECHTERUNG: ' + regression)
+    if regressions:
+        sys.exit(1)
+    print('OK: keine Verschlechterung gegenüber der Baseline')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        runHandlerDir(sys.argv[2], sys.argv[3], int(sys.argv[4]), sys.argv[5] if len(sys.argv) > 5 else None)
+    else:
+        main()
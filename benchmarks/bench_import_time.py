@@ -0,0 +1,58 @@
+"""Startzeit (Import) je Lambda Function laut template.yaml, gemessen mit python -X importtime.
+
+Jedes Handler-Modul wird mehrfach in einem neuen Prozess importiert, ausgegeben wird der kleinste kumulierte
+Importwert des Moduls sowie, ob requests bzw. marshmallow_sqlalchemy geladen wurden. Ohne Datenbank wird die
+Verbindung mit DB_URL auf SQLite umgestellt; die Engine wird beim Import nur erzeugt, nicht verbunden.
+
+Aufruf: python benchmarks/bench_import_time.py [--repeat N]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def handlers():
+    """Liest (CodeUri, Modul, Function) aus template.yaml."""
+    with open(os.path.join(ROOT, 'template.yaml')) as template:
+        text = template.read()
+    return re.findall(r'CodeUri: (\w+)/\s+Handler: (\w+)\.(\w+)', text)
+
+
+def importTime(code_uri, module):
+    """Importiert das Modul in einem neuen Prozess und gibt (kumulierte Zeit in ms, geladene Module) zurück."""
+    environment = dict(os.environ)
+    environment.setdefault('DB_URL', 'sqlite://')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                            cwd=os.path.join(ROOT, code_uri), env=environment, stderr=subprocess.PIPE,
+                            stdout=subprocess.DEVNULL, universal_newlines=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            modules[parts[2].strip()] = int(parts[1])
+    return modules[module] / 1000.0, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startzeit (Import) je Lambda Function')
+    parser.add_argument('--repeat', type=int, default=5, help='Importe je Handler-Modul')
+    repeat = parser.parse_args().repeat
+    print('%-20s %-24s %-22s %10s %9s %24s' % ('CodeUri', 'Modul', 'Function', 'Import [ms]', 'requests',
+                                               'marshmallow_sqlalchemy'))
+    measured = {}
+    for code_uri, module, function in handlers():
+        if (code_uri, module) not in measured:
+            times = [importTime(code_uri, module) for i in range(repeat)]
+            measured[(code_uri, module)] = (min(time for time, modules in times), times[0][1])
+        milliseconds, modules = measured[(code_uri, module)]
+        print('%-20s %-24s %-22s %10.1f %9s %24s' % (code_uri, module, function, milliseconds,
+                                                     'ja' if 'requests' in modules else 'nein',
+                                                     'ja' if 'marshmallow_sqlalchemy' in modules else 'nein'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Vergleich von Speicherbedarf und Laufzeit der Listen-Endpunkte: vollständige Liste (bisher) gegen blockweise
+Serialisierung (json_stream.dumpQuery).
+
+Die Tabellen werden in einer lokalen SQLite-Datenbank mit synthetischen Zeilen gefüllt. Jede Messung läuft in einem
+eigenen Prozess, damit der Spitzenwert des Speichers (ru_maxrss) nicht von vorherigen Messungen beeinflusst wird.
+
+Aufruf: python benchmarks/bench_list_endpoints.py [--rows N]
+"""
+import argparse
+import importlib
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ENDPOINTS = [('receiving_handler', 'materials_handler', 'get_allMaterials'),
+             ('receiving_handler', 'suppliers_handler', 'get_allSuppliers'),
+             ('stock_handler', 'goods_orders_handler', 'getPackageList')]
+
+
+def _setup(handler_dir):
+    os.environ.setdefault('QUERY_LOG_SAMPLE_RATE', '0')
+    os.environ.setdefault('METRICS_EMF', '0')
+    sys.path.insert(0, os.path.join(BENCHMARKS, '..', handler_dir))
+
+    from sqlalchemy.dialects.mysql import DOUBLE, TINYINT
+    from sqlalchemy.ext.compiler import compiles
+
+    @compiles(DOUBLE, 'sqlite')
+    def _compileDouble(type_, compiler, **kw):
+        return 'FLOAT'
+
+    @compiles(TINYINT, 'sqlite')
+    def _compileTinyint(type_, compiler, **kw):
+        return 'INTEGER'
+
+
+def seed(rows):
+    """Füllt materials, suppliers und goodsOrdersPos mit rows Zeilen."""
+    _setup('receiving_handler')
+    from db import engine
+    from schema_receiving import Base, Material, Supplier
+
+    Base.metadata.create_all(engine, tables=[Material.__table__, Supplier.__table__])
+    with engine.begin() as connection:
+        connection.execute(Material.__table__.insert(), [
+            dict(idmaterials=50000000 + i, name='Material ' + str(i), description='Beschreibung ' + str(i),
+                 size=1.5, measure='kg', minStock=10, art='Rohstoff') for i in range(rows)])
+        connection.execute(Supplier.__table__.insert(), [
+            dict(idsuppliers=i, name='Lieferant ' + str(i), address='Straße ' + str(i), postcode='77652',
+                 ort='Offenburg', contact='Kontakt', phone='0781', fax='0781', email='mail@example.org')
+            for i in range(rows)])
+        connection.execute('CREATE TABLE "goodsOrdersPos" (fkgoodsOrders INTEGER, productionOrderNr VARCHAR, '
+                           'quantity INTEGER, done INTEGER, fkplaces INTEGER, '
+                           'PRIMARY KEY (fkgoodsOrders, productionOrderNr, fkplaces))')
+        connection.execute('INSERT INTO "goodsOrdersPos" VALUES (?, ?, ?, ?, ?)', [
+            (i // 4, 'PO-' + str(i), i % 30 + 1, 0, i % 4) for i in range(rows)])
+
+
+def listBody(handler_dir, name):
+    """Bisherige Implementierung: gesamte Liste dumpen, dann json.dumps."""
+    import simplejson as json
+    from db import session_scope
+
+    with session_scope() as session:
+        if handler_dir == 'stock_handler':
+            from schema_stock import GoodsOrderPosition, ReservationOrderPositionSchema
+            rows = session.query(GoodsOrderPosition). \
+                filter((GoodsOrderPosition.done != 1) | (GoodsOrderPosition.done.is_(None))). \
+                order_by(GoodsOrderPosition.fkgoodsOrders).all()
+            result = ReservationOrderPositionSchema().dump(rows, many=True)
+        elif name == 'get_allMaterials':
+            from schema_receiving import Material, MaterialSchema
+            rows = session.query(Material).with_entities(Material.idmaterials, Material.name, Material.art). \
+                order_by(Material.idmaterials)
+            result = MaterialSchema().dump(rows, many=True)
+        else:
+            from schema_receiving import Supplier, SupplierSchema
+            rows = session.query(Supplier).with_entities(Supplier.idsuppliers, Supplier.name, Supplier.ort). \
+                order_by(Supplier.idsuppliers)
+            result = SupplierSchema().dump(rows, many=True)
+    return json.dumps(result)
+
+
+def measure(handler_dir, module, name, mode):
+    """Läuft im Kindprozess: misst Laufzeit und Anstieg des Spitzen-RSS eines Aufrufs."""
+    _setup(handler_dir)
+    handler = importlib.import_module(module)
+
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    if mode == 'list':
+        body = listBody(handler_dir, name)
+    else:
+        body = getattr(handler, name)({}, None)['body']
+    duration = time.time() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    print('%s %d %d' % (repr(duration), peak, len(body)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Speicherbedarf und Laufzeit der Listen-Endpunkte')
+    parser.add_argument('--rows', type=int, default=100000, help='Zeilen je Tabelle')
+    rows = parser.parse_args().rows
+    os.environ['DB_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_list_endpoints.db')
+
+    subprocess.check_call([sys.executable, __file__, '--seed', str(rows)])
+    print('%d Zeilen je Tabelle' % rows)
+    print('%-18s %-8s %10s %16s %14s' % ('Endpunkt', 'Variante', 'Dauer [s]', 'Spitzen-RSS [MB]', 'Body [MB]'))
+    for handler_dir, module, name in ENDPOINTS:
+        for mode in ('list', 'stream'):
+            output = subprocess.check_output([sys.executable, __file__, '--measure', handler_dir, module, name, mode])
+            duration, peak, size = output.decode().split()
+            print('%-18s %-8s %10.2f %16.1f %14.1f' % (name, mode, float(duration), int(peak) / 1024.0,
+                                                       int(size) / 1024.0 / 1024.0))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--seed':
+        seed(int(sys.argv[2]))
+    elif len(sys.argv) > 1 and sys.argv[1] == '--measure':
+        measure(sys.argv[2], sys.argv[3], sys.argv[4], sys.argv[5])
+    else:
+        main()
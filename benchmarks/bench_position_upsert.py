@@ -0,0 +1,160 @@
+"""Set-basierte Anlage und Änderung von Positionen (INSERT ... ON DUPLICATE KEY UPDATE) gegenüber Einzelaufrufen.
+
+Wareneingangspositionen werden einmal einzeln über createReceivingPos und einmal als Liste angelegt und anschließend
+als Liste geändert (Menge, Preis und Material). Bestellpositionen werden über createOrderPos als Liste angelegt und
+geändert. Gemessen werden Dauer und Anzahl der SQL-Statements gegen eine lokale SQLite-Datenbank (ON CONFLICT DO
+UPDATE). Geprüft werden die Antworten, die Positionen in der Datenbank und die Bewertungsschichten gegenüber einem
+Neuaufbau; bei einer Abweichung endet das Skript mit Exit-Code 1.
+
+Aufruf: python benchmarks/bench_position_upsert.py [--positions N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import simplejson as json
+
+os.environ.setdefault('DB_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'position_upsert.db'))
+os.environ.setdefault('QUERY_LOG_SAMPLE_RATE', '0')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'receiving_handler'))
+
+from sqlalchemy.dialects.mysql import DOUBLE, TINYINT  # noqa: E402
+from sqlalchemy.ext.compiler import compiles  # noqa: E402
+
+MATERIALS = 50
+
+
+@compiles(DOUBLE, 'sqlite')
+def _compileDouble(type_, compiler, **kw):
+    return 'FLOAT'
+
+
+@compiles(TINYINT, 'sqlite')
+def _compileTinyint(type_, compiler, **kw):
+    return 'INTEGER'
+
+
+def seed():
+    from db import engine, session_scope
+    from schema_receiving import Base, Material, Supplier, Receiving, Order
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with session_scope() as session:
+        session.add(Supplier(idsuppliers=1, name='Lieferant'))
+        for i in range(MATERIALS):
+            session.add(Material(idmaterials=50000000 + i, name='M' + str(i), art='Rohstoff'))
+        session.add(Receiving(id=1, fksuppliers=1, capturer='einzeln'))
+        session.add(Receiving(id=2, fksuppliers=1, capturer='liste'))
+        session.add(Order(idorders=1, fksuppliers=1, capturer='liste', state='offen'))
+
+
+def position(number, shift=0):
+    return {'position': number, 'fkmaterials': 50000000 + (number + shift) % MATERIALS,
+            'quantity': (number + shift) % 9 + 1, 'price': round(1 + (number + shift) % 13 * 0.25, 2)}
+
+
+def orderPosition(number, shift=0):
+    pos = position(number, shift)
+    del pos['price']
+    return pos
+
+
+def call(function, body):
+    from query_stats import query_statistics
+
+    start = time.time()
+    response = function({'body': json.dumps(body)}, None)
+    return response, time.time() - start, query_statistics.count
+
+
+def report(name, count, duration, statements):
+    print('%-30s %5d Positionen: %7.3f s, %6d Statements' % (name, count, duration, statements))
+
+
+def verifyValuations():
+    from db import session_scope
+    from schema_receiving import MaterialValuation
+    from valuation import buildLayers, loadLayers
+
+    differences = 0
+    with session_scope() as session:
+        for valuation in session.query(MaterialValuation):
+            expected = json.loads(json.dumps(buildLayers(loadLayers(session, valuation.fkmaterials))))
+            if json.loads(valuation.layers) != expected:
+                differences = differences + 1
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Set-basierte Anlage und Änderung von Positionen')
+    parser.add_argument('--positions', type=int, default=1000, help='Anzahl Positionen')
+    positions = parser.parse_args().positions
+    seed()
+
+    from receivings_handler import createReceivingPos
+    from orders_handler import createOrderPos
+    from db import session_scope
+    from schema_receiving import ReceivingPosition, OrderPosition
+
+    errors = []
+
+    duration = 0.0
+    statements = 0
+    for number in range(1, positions + 1):
+        response, seconds, count = call(createReceivingPos, dict(position(number), fkreceivings=1))
+        duration = duration + seconds
+        statements = statements + count
+        if response['statusCode'] != 200:
+            errors.append('Einzelanlage: ' + response['body'])
+            break
+    report('Wareneingang einzeln', positions, duration, statements)
+
+    for name, shift in (('Wareneingang Liste (neu)', 0), ('Wareneingang Liste (Änderung)', 3)):
+        body = [dict(position(number, shift), fkreceivings=2) for number in range(1, positions + 1)]
+        response, duration, statements = call(createReceivingPos, body)
+        report(name, positions, duration, statements)
+        if response['statusCode'] != 200:
+            errors.append(name + ': ' + response['body'])
+        elif [(pos['position'], pos['quantity']) for pos in json.loads(response['body'])] != \
+                [(pos['position'], pos['quantity']) for pos in body]:
+            errors.append(name + ': Antwort weicht von den übergebenen Positionen ab')
+
+    response, duration, statements = call(createReceivingPos, [dict(position(1), fkreceivings=99)])
+    if response['statusCode'] != 400:
+        errors.append('Fehlender Wareneingang nicht abgewiesen')
+
+    body = [dict(orderPosition(number), fkorders=1) for number in range(1, positions + 1)]
+    response, duration, statements = call(createOrderPos, body)
+    report('Bestellung Liste (neu)', positions, duration, statements)
+    written = json.loads(response['body']) if response['statusCode'] == 200 else []
+    if len(written) != positions:
+        errors.append('Bestellung Liste (neu): ' + response['body'])
+    else:
+        body = [dict(orderPosition(pos['position'], 5), fkorders=1, idordersPos=pos['idordersPos']) for pos in written]
+        response, duration, statements = call(createOrderPos, body)
+        report('Bestellung Liste (Änderung)', positions, duration, statements)
+        if response['statusCode'] != 200 or \
+                [pos['quantity'] for pos in json.loads(response['body'])] != [pos['quantity'] for pos in body]:
+            errors.append('Bestellung Liste (Änderung): ' + response['body'][:200])
+
+    with session_scope() as session:
+        if session.query(ReceivingPosition).filter_by(fkreceivings=2).count() != positions:
+            errors.append('Anzahl der Wareneingangspositionen weicht ab')
+        if session.query(OrderPosition).count() != positions:
+            errors.append('Anzahl der Bestellpositionen weicht ab')
+
+    differences = verifyValuations()
+    if differences:
+        errors.append(str(differences) + ' Bewertungen weichen vom Neuaufbau ab')
+
+    for error in errors:
+        print('FEHLER: ' + error)
+    if errors:
+        sys.exit(1)
+    print('OK: Positionen und Bewertungsschichten identisch mit dem Neuaufbau')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Micro-Benchmark: Parsen des createGoodsOrders-Bodys mit ast.literal_eval (bisher) und decodeBody (JSON).
+
+Aufruf: python benchmarks/bench_request_body.py [--orders N [N ...]]
+"""
+import argparse
+import ast
+import os
+import random
+import sys
+import timeit
+import simplejson as json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'stock_handler'))
+
+from schema_stock import GoodsOrderSchema  # noqa: E402
+from request_body import decodeBody  # noqa: E402
+
+
+def goodsOrdersEvent(orders):
+    """Erzeugt ein API Gateway Event mit realistischen Reservierungen (Materialnummer + Menge oder
+    Produktionsauftrag)."""
+    random.seed(orders)
+    body = []
+    for i in range(orders):
+        if i % 3 == 0:
+            body.append({'productionOrderNr': 'PO-' + str(random.randint(100000, 999999))})
+        else:
+            body.append({'fkmaterials': random.randint(10000000, 49999999), 'quantity': random.randint(1, 500)})
+    return {'httpMethod': 'POST', 'path': '/goods/orders', 'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps(body), 'isBase64Encoded': False}
+
+
+def literalEvalPath(event):
+    return GoodsOrderSchema().load(data=ast.literal_eval(event.get('body')), many=True)
+
+
+def decodeBodyPath(event):
+    orders, error = decodeBody(event, GoodsOrderSchema(), many=True)
+    return orders
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-Benchmark des Bodys von createGoodsOrders')
+    parser.add_argument('--orders', type=int, nargs='+', default=[1, 10, 50, 500], help='Anzahl Orders je Request')
+    args = parser.parse_args()
+
+    print('%8s %18s %18s %8s' % ('orders', 'literal_eval [us]', 'decodeBody [us]', 'faktor'))
+    for size in args.orders:
+        event = goodsOrdersEvent(size)
+        assert literalEvalPath(event) == decodeBodyPath(event)
+        number = max(10, 20000 // size)
+        old = min(timeit.repeat(lambda: literalEvalPath(event), number=number, repeat=5)) / number * 1e6
+        new = min(timeit.repeat(lambda: decodeBodyPath(event), number=number, repeat=5)) / number * 1e6
+        print('%8d %18.1f %18.1f %8.2f' % (size, old, new, old / new))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Parität und Laufzeit der vorkompilierten Serialisierer (row_serializer) gegenüber marshmallow.
+
+Für jedes Schema der Listen-Endpunkte werden synthetische Zeilen (ORM-Objekte, Tupel wie aus with_entities und dicts)
+mit beiden Verfahren serialisiert. Das JSON muss identisch sein, sonst endet das Skript mit Exit-Code 1. Jeder
+Handler läuft in einem eigenen Prozess, da beide Pakete gleichnamige Module enthalten.
+
+Aufruf: python benchmarks/bench_serializers.py [--rows N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+
+
+def stockCases(rows):
+    from schema_stock import Material, Place, Inventory, StockEntry, GoodsOrderPosition, MaterialSchema, \
+        InventorySchema, StockEntrySchema, ReservationOrderPositionSchema
+
+    def material(i):
+        return Material(idmaterials=50000000 + i, name='M' + str(i), description=None if i % 3 else 'Beschreibung',
+                        size=i / 7.0, measure='kg', minStock=None if i % 5 else i, art='Rohstoff')
+
+    inventory = []
+    for i in range(rows):
+        position = Inventory(fkplaces=i % 17, fkmaterials=50000000 + i, opened=i % 2, quantity=i)
+        position.material = material(i)
+        position.place = Place(idplaces=i % 17, description='Platz ' + str(i % 17), fkstocks=1)
+        inventory.append(position)
+
+    entries = [StockEntry(idstockEntries=i, fkplaces=i % 17, fkmaterials=50000000 + i,
+                          productionOrderNr=None if i % 4 else 'PO-' + str(i), opened=i % 2, quantity=i - rows // 2,
+                          booking_date=datetime(2021, 1, 1 + i % 28, i % 24, i % 60, i % 60)) for i in range(rows)]
+    entry_dicts = [dict(fkmaterials=entry.fkmaterials, fkplaces=entry.fkplaces, opened=entry.opened,
+                        quantity=entry.quantity, productionOrderNr='', booking_date=entry.booking_date)
+                   for entry in entries]
+    positions = [GoodsOrderPosition(fkgoodsOrders=i // 3, productionOrderNr='PO-' + str(i), quantity=i % 30 + 1,
+                                    done=None if i % 2 else 0, fkplaces=i % 17) for i in range(rows)]
+
+    return [
+        ('MaterialSchema', MaterialSchema(), [material(i) for i in range(rows)], None, False),
+        ('InventorySchema', InventorySchema(exclude=['value_of_materials']), inventory, None, False),
+        ('InventorySchema(only)', InventorySchema(only=['fkplaces', 'fkmaterials', 'quantity']), inventory, None,
+         False),
+        ('StockEntrySchema', StockEntrySchema(), entries, None, False),
+        ('StockEntrySchema(dict)', StockEntrySchema(), entry_dicts, list(entry_dicts[0]), True),
+        ('ReservationOrderPositionSchema', ReservationOrderPositionSchema(), positions, None, False),
+    ]
+
+
+def receivingCases(rows):
+    from schema_receiving import Material, Supplier, MaterialSchema, SupplierSchema, ReceivingSchema, OrderSchema
+
+    MaterialRow = namedtuple('MaterialRow', ['idmaterials', 'name', 'art'])
+    SupplierRow = namedtuple('SupplierRow', ['idsuppliers', 'name', 'ort'])
+    ReceivingRow = namedtuple('ReceivingRow', ['id', 'receiving_date'])
+    OrderRow = namedtuple('OrderRow', ['idorders', 'order_date', 'fksuppliers'])
+
+    return [
+        ('MaterialSchema', MaterialSchema(), [
+            Material(idmaterials=50000000 + i, name='M' + str(i), description=None, size=1.5, measure='kg',
+                     minStock=i, art='Rohstoff') for i in range(rows)], None, False),
+        ('MaterialSchema(tuple)', MaterialSchema(),
+         [MaterialRow(50000000 + i, 'M' + str(i), 'Rohstoff') for i in range(rows)], MaterialRow._fields, False),
+        ('SupplierSchema', SupplierSchema(), [
+            Supplier(idsuppliers=i, name='Lieferant ' + str(i), address=None, postcode='77652', ort='Offenburg',
+                     contact=None, phone='0781', fax=None, email='mail@example.org') for i in range(rows)], None,
+         False),
+        ('SupplierSchema(tuple)', SupplierSchema(),
+         [SupplierRow(i, 'Lieferant ' + str(i), None if i % 2 else 'Offenburg') for i in range(rows)],
+         SupplierRow._fields, False),
+        ('ReceivingSchema(tuple)', ReceivingSchema(),
+         [ReceivingRow(i, None if i % 9 == 0 else datetime(2021, 2, 1 + i % 28, i % 24)) for i in range(rows)],
+         ReceivingRow._fields, False),
+        ('OrderSchema(tuple)', OrderSchema(),
+         [OrderRow(i, datetime(2021, 3, 1 + i % 28), None if i % 3 else i) for i in range(rows)], OrderRow._fields,
+         False),
+    ]
+
+
+def run(handler_dir, rows):
+    sys.path.insert(0, os.path.join(BENCHMARKS, '..', handler_dir))
+    import simplejson as json
+    from row_serializer import compileSerializer
+
+    cases = stockCases(rows) if handler_dir == 'stock_handler' else receivingCases(rows)
+    failed = False
+    for name, schema, data, columns, mapping in cases:
+        start = time.time()
+        expected = schema.dump(data, many=True)
+        marshmallow_time = time.time() - start
+
+        serializer = compileSerializer(schema, columns=columns, mapping=mapping)
+        start = time.time()
+        result = serializer.many(data)
+        compiled_time = time.time() - start
+
+        same = json.dumps(expected) == json.dumps(result) and \
+            json.dumps(schema.dump(data[1])) == json.dumps(serializer.one(data[1]))
+        failed = failed or not same
+        print('%-18s %-32s marshmallow %7.3f s, vorkompiliert %7.3f s, Faktor %5.1f  %s' %
+              (handler_dir, name, marshmallow_time, compiled_time, marshmallow_time / max(compiled_time, 1e-9),
+               'identisch' if same else 'FEHLER: abweichendes JSON'))
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parität und Laufzeit der vorkompilierten Serialisierer')
+    parser.add_argument('--rows', type=int, default=20000, help='Zeilen je Schema')
+    rows = parser.parse_args().rows
+    failed = False
+    for handler_dir in ('stock_handler', 'receiving_handler'):
+        failed = subprocess.call([sys.executable, __file__, '--run', handler_dir, str(rows)]) != 0 or failed
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        sys.exit(1 if run(sys.argv[2], int(sys.argv[3])) else 0)
+    main()
@@ -0,0 +1,190 @@
+"""Vergleicht den Bewertungsbericht (stock_handler/valuation_report.py) mit der Bewertung je Material und Stichtag.
+
+Die SQLite-Datenbank wird mit alembic upgrade head angelegt und mit Buchungen und Wareneingängen über zwei Jahre
+gefüllt (auch Wareneingänge ohne Preis oder Datum). Ein Teil der Buchungen wird verdichtet (compaction.py), damit das
+Archiv einbezogen wird. Die Referenz bewertet jedes (Material, Monatsende) einzeln mit valuation.lifoValue und je zwei
+Abfragen; der aktuelle Stichtag wird zusätzlich mit valuation.calcMaterialValue verglichen. Ausgegeben werden Dauer und
+Anzahl der Statements beider Varianten, bei Abweichungen endet das Skript mit Exit-Code 1.
+
+Aufruf: python benchmarks/bench_valuation_report.py [--materials N] [--months N]
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+
+PLACES = 5
+FIRST_MATERIAL = 50000000
+
+
+def setup():
+    os.environ.setdefault('DB_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_valuation_report.db'))
+    os.environ.setdefault('QUERY_LOG_SAMPLE_RATE', '0')
+    os.environ.setdefault('METRICS_EMF', '0')
+    subprocess.check_call([sys.executable, '-m', 'alembic', 'upgrade', 'head'], cwd=ROOT)
+    sys.path.insert(0, os.path.join(ROOT, 'stock_handler'))
+
+    from sqlalchemy.dialects.mysql import DOUBLE, TINYINT
+    from sqlalchemy.ext.compiler import compiles
+
+    @compiles(DOUBLE, 'sqlite')
+    def _compileDouble(type_, compiler, **kw):
+        return 'FLOAT'
+
+    @compiles(TINYINT, 'sqlite')
+    def _compileTinyint(type_, compiler, **kw):
+        return 'INTEGER'
+
+
+def seed(materials, months):
+    """Je Material Wareneingänge (Zugänge) und Buchungen (Zu- und Abgänge) über months Monate."""
+    from db import engine
+    from schema_stock import Material, Stock, Place, StockEntry, Receiving, ReceivingPosition
+
+    rnd = random.Random(11)
+    start = datetime.now() - timedelta(days=months * 31)
+    receivings = [dict(id=r + 1, receiving_date=None if r == 0 else start + timedelta(days=r * months * 31 // 300),
+                       capturer='bench') for r in range(300)]
+    positions = []
+    entries = []
+    for m in range(materials):
+        fkmaterials = FIRST_MATERIAL + m
+        for position, r in enumerate(sorted(rnd.sample(range(300), 12))):
+            price = None if rnd.random() < 0.03 else round(rnd.uniform(0.5, 20.0), 2)
+            positions.append(dict(fkreceivings=r + 1, position=m * 100 + position, fkmaterials=fkmaterials,
+                                  quantity=rnd.choice([0, 50, 100, 200]), price=price))
+        for e in range(120):
+            entries.append(dict(fkmaterials=fkmaterials, fkplaces=rnd.randrange(PLACES) + 1, opened=0,
+                                productionOrderNr=None, quantity=rnd.choice([10, 20, -10, -5]),
+                                booking_date=start + timedelta(minutes=rnd.randrange(months * 31 * 24 * 60))))
+
+    with engine.begin() as connection:
+        connection.execute(Material.__table__.insert(), [
+            dict(idmaterials=FIRST_MATERIAL + m, name='Material ' + str(m), art='Rohware') for m in range(materials)])
+        connection.execute(Stock.__table__.insert(), [dict(idstocks=1, description='Lager')])
+        connection.execute(Place.__table__.insert(), [
+            dict(idplaces=p + 1, description='Platz', fkstocks=1) for p in range(PLACES)])
+        connection.execute(Receiving.__table__.insert(), receivings)
+        connection.execute(ReceivingPosition.__table__.insert(), positions)
+        connection.execute(StockEntry.__table__.insert(), entries)
+
+
+def countStatements(run):
+    """Führt run() aus und gibt (Ergebnis, Dauer in Sekunden, Anzahl Statements) zurück."""
+    from sqlalchemy import event
+    from db import engine
+
+    statements = [0]
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements[0] = statements[0] + 1
+
+    event.listen(engine, 'before_cursor_execute', _count)
+    try:
+        start = time.time()
+        result = run()
+        duration = time.time() - start
+    finally:
+        event.remove(engine, 'before_cursor_execute', _count)
+    return result, duration, statements[0]
+
+
+def referenceValues(session, materials, dates):
+    """Bewertung je Material und Stichtag mit valuation.lifoValue (zwei Abfragen je Paar)."""
+    from sqlalchemy import func
+    from schema_stock import StockEntry, StockEntryArchive, Receiving, ReceivingPosition
+    from valuation import lifoValue
+
+    values = {}
+    for fkmaterials in materials:
+        for day in dates:
+            cutoff = datetime.combine(day + timedelta(days=1), datetime.min.time())
+            live = session.query(StockEntry.quantity.label('quantity')). \
+                filter((StockEntry.fkmaterials == fkmaterials) & StockEntry.snapshot_date.is_(None) &
+                       (StockEntry.booking_date < cutoff))
+            archived = session.query(StockEntryArchive.quantity.label('quantity')). \
+                filter((StockEntryArchive.fkmaterials == fkmaterials) & (StockEntryArchive.booking_date < cutoff))
+            quantity = session.query(func.ifnull(func.sum(live.union_all(archived).subquery().c.quantity), 0)). \
+                scalar()
+            receivings = session.query(ReceivingPosition.price, ReceivingPosition.quantity). \
+                filter(ReceivingPosition.fkmaterials == fkmaterials). \
+                filter(ReceivingPosition.fkreceivings == Receiving.id). \
+                filter(Receiving.receiving_date.is_(None) | (Receiving.receiving_date < cutoff)). \
+                order_by(Receiving.receiving_date.is_(None), Receiving.receiving_date.desc(),
+                         ReceivingPosition.fkreceivings.desc(), ReceivingPosition.position.desc()).all()
+            values[(fkmaterials, day)] = (quantity, lifoValue(receivings, quantity) if quantity > 0 else 0.0)
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bewertungsbericht gegenüber der Bewertung je Material und Stichtag')
+    parser.add_argument('--materials', type=int, default=40, help='Anzahl Materialien')
+    parser.add_argument('--months', type=int, default=24, help='Anzahl Monatsenden')
+    args = parser.parse_args()
+    materials = args.materials
+    months = args.months
+    setup()
+    seed(materials, months)
+
+    import numpy as np
+    from db import session_scope
+    from balances import ledgerBalances
+    from compaction import compactEntries, compactionHorizon
+    from valuation import calcMaterialValue
+    from valuation_report import monthEnds, loadValuationReport
+
+    compactEntries(compactionHorizon(months * 31 // 2))
+
+    last = np.datetime64(date.today(), 'M') - 1
+    dates = monthEnds(str(last - (months - 1)), str(last))
+    day_list = [value.astype(date) for value in dates]
+    material_list = [FIRST_MATERIAL + m for m in range(materials)]
+    errors = []
+
+    with session_scope() as session:
+        report, report_time, report_statements = countStatements(lambda: loadValuationReport(session, dates))
+        reference, reference_time, reference_statements = countStatements(
+            lambda: referenceValues(session, material_list, day_list))
+
+    for fkmaterials, day, quantity, value in zip(report['fkmaterials'].tolist(), report['date'].astype(date).tolist(),
+                                                 report['quantity'].tolist(), report['value'].tolist()):
+        expected_quantity, expected_value = reference.pop((fkmaterials, day))
+        if quantity != expected_quantity or abs(value - expected_value) > 1e-6 * max(1.0, abs(expected_value)):
+            errors.append('%s %s: Bericht %s / %.4f, erwartet %s / %.4f' % (fkmaterials, day, quantity, value,
+                                                                             expected_quantity, expected_value))
+    if reference:
+        errors.append(str(len(reference)) + ' Paare fehlen im Bericht')
+
+    # Aktueller Stichtag gegen calcMaterialValue (alle Wareneingänge, Bestand laut Journal)
+    with session_scope() as session:
+        today = loadValuationReport(session, [np.datetime64(date.today() + timedelta(days=1), 'D')])
+        quantities = {}
+        for key, (quantity, first_booking_date) in ledgerBalances(session).items():
+            quantities[key[0]] = quantities.get(key[0], 0) + quantity
+        for fkmaterials, quantity, value in zip(today['fkmaterials'].tolist(), today['quantity'].tolist(),
+                                                today['value'].tolist()):
+            expected = calcMaterialValue(session, fkmaterials, quantities[fkmaterials])
+            if quantity != quantities[fkmaterials] or abs(value - expected) > 1e-6 * max(1.0, abs(expected)):
+                errors.append('%s heute: Bericht %s / %.4f, erwartet %s / %.4f' % (
+                    fkmaterials, quantity, value, quantities[fkmaterials], expected))
+
+    pairs = len(report['fkmaterials'])
+    print('%-28s %8.1f ms %8d Statements' % ('Bericht (' + str(pairs) + ' Paare)', report_time * 1000,
+                                              report_statements))
+    print('%-28s %8.1f ms %8d Statements' % ('je Material und Stichtag', reference_time * 1000, reference_statements))
+    if errors:
+        for error in errors[:20]:
+            print('FEHLER: ' + error)
+        sys.exit(1)
+    print('OK: Bestände und Werte stimmen überein')
+
+
+if __name__ == '__main__':
+    main()
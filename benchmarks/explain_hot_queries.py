@@ -0,0 +1,212 @@
+"""Prüft die Ausführungspläne der häufigsten Abfragen gegen eine mit den Migrationen (migrations/) angelegte
+Datenbank.
+
+Die Datenbank wird mit alembic upgrade head angelegt (SQLite oder über DB_URL eine leere MySQL/MariaDB-Testdatenbank)
+und mit synthetischen Daten gefüllt. Anschließend laufen die Funktionen der Reservierung, Bewertung und Outbox; jedes
+ausgeführte SELECT wird mit EXPLAIN (SQLite: EXPLAIN QUERY PLAN) geprüft. Liest eine Abfrage eine Tabelle vollständig
+(SQLite: SCAN, MySQL: type ALL oder index), endet das Skript mit Exit-Code 1.
+
+Wie in bench_handlers.py laufen die Funktionen beider CodeUri-Verzeichnisse in eigenen Prozessen.
+
+Aufruf: python benchmarks/explain_hot_queries.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import simplejson as json
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+
+MATERIALS = 200
+PLACES = 20
+PRODUCTION_ORDERS = 1000
+FIRST_MATERIAL = 50000000
+
+
+def _setup(handler_dir):
+    os.environ.setdefault('QUERY_LOG_SAMPLE_RATE', '0')
+    os.environ.setdefault('METRICS_EMF', '0')
+    sys.path.insert(0, os.path.join(ROOT, handler_dir))
+
+    from sqlalchemy.dialects.mysql import DOUBLE, TINYINT
+    from sqlalchemy.ext.compiler import compiles
+
+    @compiles(DOUBLE, 'sqlite')
+    def _compileDouble(type_, compiler, **kw):
+        return 'FLOAT'
+
+    @compiles(TINYINT, 'sqlite')
+    def _compileTinyint(type_, compiler, **kw):
+        return 'INTEGER'
+
+
+def seed():
+    """Füllt die Tabellen der geprüften Abfragen, damit auch MySQL realistische Statistiken erhält."""
+    from datetime import datetime, timedelta
+    from db import engine
+    from schema_stock import Material, Stock, Place, StockEntry, StockBalance, GoodsOrder, GoodsOrderPosition, \
+        Receiving, ReceivingPosition, OutboxEvent
+
+    now = datetime.now()
+    entries = [dict(fkmaterials=FIRST_MATERIAL + e % MATERIALS, fkplaces=e % PLACES + 1,
+                    productionOrderNr='PO-' + str(e % PRODUCTION_ORDERS), opened=0, quantity=5, booking_date=now)
+               for e in range(4 * PRODUCTION_ORDERS)]
+    balances = {}
+    for entry in entries:
+        key = (entry['fkmaterials'], entry['fkplaces'], entry['productionOrderNr'], 0)
+        balances[key] = balances.get(key, 0) + entry['quantity']
+
+    with engine.begin() as connection:
+        connection.execute(Material.__table__.insert(), [
+            dict(idmaterials=FIRST_MATERIAL + i, name='Material ' + str(i), art='Fertigware')
+            for i in range(MATERIALS)])
+        connection.execute(Stock.__table__.insert(), [dict(idstocks=1, description='Lager')])
+        connection.execute(Place.__table__.insert(), [
+            dict(idplaces=p + 1, description='Platz', fkstocks=1) for p in range(PLACES)])
+        connection.execute(StockEntry.__table__.insert(), entries)
+        connection.execute(StockBalance.__table__.insert(), [
+            dict(fkmaterials=key[0], fkplaces=key[1], productionOrderNr=key[2], opened=key[3], quantity=quantity,
+                 first_booking_date=now) for key, quantity in balances.items()])
+        connection.execute(GoodsOrder.__table__.insert(), [
+            dict(idgoodsOrders=o + 1, fkmaterials=FIRST_MATERIAL + o % MATERIALS, creation_date=now)
+            for o in range(PRODUCTION_ORDERS)])
+        connection.execute(GoodsOrderPosition.__table__.insert(), [
+            dict(fkgoodsOrders=o + 1, productionOrderNr='PO-' + str(o), quantity=1, done=o % 2,
+                 fkplaces=o % PLACES + 1) for o in range(PRODUCTION_ORDERS)])
+        connection.execute(Receiving.__table__.insert(), [
+            dict(id=r + 1, receiving_date=now - timedelta(days=r), capturer='explain') for r in range(500)])
+        connection.execute(ReceivingPosition.__table__.insert(), [
+            dict(fkreceivings=r + 1, position=p + 1, fkmaterials=FIRST_MATERIAL + (r * 10 + p) % MATERIALS,
+                 quantity=p + 1, price=1.5) for r in range(500) for p in range(10)])
+        connection.execute(OutboxEvent.__table__.insert(), [
+            dict(idempotency_key='key-' + str(e), target='versand', payload='{}',
+                 state='pending' if e % 50 == 0 else 'delivered', attempts=0, next_attempt=now - timedelta(minutes=1),
+                 creation_date=now) for e in range(5000)])
+
+        if engine.dialect.name == 'sqlite':
+            connection.exec_driver_sql('ANALYZE')
+        else:
+            connection.exec_driver_sql('ANALYZE TABLE stockBalances, stockEntries, goodsOrdersPos, receivings, '
+                                       'receivingsPos, outboxEvents, materials')
+
+
+def capture(run):
+    """Führt run() aus und gibt die dabei ausgeführten SELECT-Statements mit ihren Parametern zurück."""
+    from sqlalchemy import event
+    from db import engine
+
+    statements = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', _before)
+    try:
+        run()
+    finally:
+        event.remove(engine, 'before_cursor_execute', _before)
+    return statements
+
+
+def explain(statement, parameters):
+    """Gibt die Zugriffe des Ausführungsplans als Liste von (Tabelle, Zugriff, vollständig gelesen) zurück."""
+    from db import engine
+
+    accesses = []
+    with engine.connect() as connection:
+        if engine.dialect.name == 'sqlite':
+            for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters):
+                detail = row[-1]
+                words = detail.split()
+                if words[0] in ('SCAN', 'SEARCH'):
+                    accesses.append((words[1], detail, words[0] == 'SCAN'))
+        else:
+            result = connection.exec_driver_sql('EXPLAIN ' + statement, parameters)
+            for row in result.mappings():
+                if row['table'] is not None and not row['table'].startswith('<'):
+                    accesses.append((row['table'], 'type=%s key=%s' % (row['type'], row['key']),
+                                     row['type'] in ('ALL', 'index')))
+    return accesses
+
+
+def stockQueries():
+    from db import session_scope
+    from reservation import lockMaterials, loadStock, loadReservedStock
+    from balances import getProductionOrderBalance
+    from valuation import loadReceivings
+    from outbox import claimEvents
+
+    def inSession(function):
+        def run():
+            with session_scope() as session:
+                function(session)
+        return run
+
+    return [
+        ('reservation.lockMaterials', inSession(lambda session: lockMaterials(session, [], ['PO-1', 'PO-2']))),
+        ('reservation.loadStock', inSession(lambda session: loadStock(session, [FIRST_MATERIAL], ['PO-3']))),
+        ('reservation.loadReservedStock', inSession(lambda session: loadReservedStock(session, ['PO-1', 'PO-2']))),
+        ('balances.getProductionOrderBalance',
+         inSession(lambda session: getProductionOrderBalance(session, FIRST_MATERIAL + 1, 2, 'PO-1'))),
+        ('valuation.loadReceivings',
+         inSession(lambda session: loadReceivings(session, {FIRST_MATERIAL, FIRST_MATERIAL + 7}))),
+        ('outbox.claimEvents', lambda: claimEvents(limit=10)),
+    ]
+
+
+def receivingQueries():
+    from db import session_scope
+    from valuation import loadLayers
+
+    def run():
+        with session_scope() as session:
+            loadLayers(session, FIRST_MATERIAL + 3)
+
+    return [('valuation.loadLayers', run)]
+
+
+def check(handler_dir):
+    """Läuft im Kindprozess: Abfragen ausführen, Pläne prüfen und als JSON ausgeben."""
+    _setup(handler_dir)
+    if handler_dir == 'stock_handler':
+        seed()
+        queries = stockQueries()
+    else:
+        queries = receivingQueries()
+
+    results = []
+    for name, run in queries:
+        for statement, parameters in capture(run):
+            for table, access, full_scan in explain(statement, parameters):
+                results.append({'query': name, 'table': table, 'access': access, 'full_scan': full_scan})
+    sys.stdout.write(json.dumps(results) + '\n')
+
+
+def main():
+    env = dict(os.environ)
+    env.setdefault('DB_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'explain_hot_queries.db'))
+    subprocess.check_call([sys.executable, '-m', 'alembic', 'upgrade', 'head'], cwd=ROOT, env=env)
+
+    results = []
+    for handler_dir in ('stock_handler', 'receiving_handler'):
+        output = subprocess.check_output([sys.executable, __file__, '--check', handler_dir], env=env)
+        results.extend(json.loads(output.decode().strip().splitlines()[-1]))
+
+    for result in results:
+        print('%-36s %-16s %-6s %s' % (result['query'], result['table'], 'SCAN' if result['full_scan'] else 'OK',
+                                       result['access']))
+    scans = [result for result in results if result['full_scan']]
+    if scans:
+        print('FEHLER: ' + str(len(scans)) + ' Zugriffe lesen eine Tabelle vollständig')
+        sys.exit(1)
+    print('OK: alle Abfragen verwenden einen Index')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--check':
+        check(sys.argv[2])
+    else:
+        main()
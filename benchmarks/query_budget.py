@@ -0,0 +1,98 @@
+"""Prüft die Query-Budgets der lesenden Endpunkte des receiving_handler gegen eine lokale SQLite-Datenbank.
+
+Jeder Endpunkt wird mit Wareneingängen bzw. Bestellungen unterschiedlicher Positionsanzahl aufgerufen, Chargen und
+Materialien mit leerem und gefülltem Materialcache. Die Anzahl der
+SQL-Statements wird über query_stats erfasst und mit dem Budget aus query_stats.query_budgets verglichen. Bei einer
+Überschreitung endet das Skript mit Exit-Code 1.
+
+Aufruf: python benchmarks/query_budget.py
+"""
+import os
+import sys
+import tempfile
+import simplejson as json
+
+os.environ.setdefault('DB_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'query_budget.db'))
+os.environ.setdefault('QUERY_LOG_SAMPLE_RATE', '0')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'receiving_handler'))
+
+from sqlalchemy.dialects.mysql import DOUBLE, TINYINT  # noqa: E402
+from sqlalchemy.ext.compiler import compiles  # noqa: E402
+
+POSITIONS = [1, 10, 50]
+
+
+@compiles(DOUBLE, 'sqlite')
+def _compileDouble(type_, compiler, **kw):
+    return 'FLOAT'
+
+
+@compiles(TINYINT, 'sqlite')
+def _compileTinyint(type_, compiler, **kw):
+    return 'INTEGER'
+
+
+def seed():
+    """Legt Lieferant, Materialien, Wareneingänge, Bestellungen und Chargen an."""
+    from db import engine, session_scope
+    from schema_receiving import Base, Material, Supplier, Receiving, ReceivingPosition, Order, OrderPosition, \
+        Charge, ChargeShirt, ChargeColor
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with session_scope() as session:
+        session.add(Supplier(idsuppliers=1, name='Lieferant'))
+        for idmaterials in range(1, max(POSITIONS) + 1):
+            session.add(Material(idmaterials=50000000 + idmaterials, name='M' + str(idmaterials), art='Rohstoff'))
+        session.add(Material(idmaterials=60000001, name='Shirt', art='T-Shirt'))
+        session.add(Material(idmaterials=60000002, name='Farbe', art='Farbe'))
+        session.flush()
+
+        for count in POSITIONS:
+            session.add(Receiving(id=count, fksuppliers=1, receivingPos=[
+                ReceivingPosition(position=position, fkmaterials=50000000 + position, quantity=1, price=1.0)
+                for position in range(1, count + 1)]))
+            session.add(Order(idorders=count, fksuppliers=1, orderPos=[
+                OrderPosition(position=position, fkmaterials=50000000 + position, quantity=1)
+                for position in range(1, count + 1)]))
+
+        session.add(Charge(idcharges=1, fkmaterials=60000001, chargeShirt=ChargeShirt(whiteness=1, absorbency=1.0)))
+        session.add(Charge(idcharges=2, fkmaterials=60000002,
+                           chargeColor=ChargeColor(ppml=1, viscosity=1.0, deltaE=1.0)))
+        session.add(Charge(idcharges=3, fkmaterials=50000001))
+
+
+def main():
+    seed()
+    import receivings_handler
+    import orders_handler
+    import charges_handler
+    import materials_handler
+    from query_stats import query_statistics, query_budgets
+
+    calls = [(receivings_handler.getReceiving, count) for count in POSITIONS] + \
+        [(orders_handler.getOrder, count) for count in POSITIONS] + \
+        [(charges_handler.getCharge, idcharges) for idcharges in (1, 2, 3, 1)] + \
+        [(materials_handler.getMaterial, 50000001)] * 2
+
+    failed = False
+    for function, id in calls:
+        name = function.__name__
+        response = function({'pathParameters': {'id': id}}, None)
+        queries = query_statistics.count
+        budget = query_budgets.get(name)
+        ok = response['statusCode'] == 200 and (budget is None or queries <= budget)
+        failed = failed or not ok
+        print('%-14s id=%-4s Status %d, %d Statements (Budget %s)%s' %
+              (name, id, response['statusCode'], queries, budget, '' if ok else '  <- FEHLER'))
+        if response['statusCode'] != 200:
+            print(json.loads(response['body']))
+
+    if failed:
+        print('FEHLER: Query-Budget überschritten')
+        sys.exit(1)
+    print('OK: alle Endpunkte innerhalb ihres Query-Budgets')
+
+
+if __name__ == '__main__':
+    main()
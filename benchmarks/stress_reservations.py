@@ -0,0 +1,131 @@
+"""Stresstest für parallele Reservierungen (createGoodsOrders) gegen eine lokale MySQL/MariaDB.
+
+Die Verbindung wird wie in der Lambda Function über DB_HOST, DB_USER, DB_PASSWORD und DB_NAME angegeben. Die Datenbank
+sollte eine Testdatenbank sein: Die benötigten Tabellen werden bei Bedarf angelegt und das Testmaterial wird vorab
+gelöscht.
+
+Aufruf: python benchmarks/stress_reservations.py [--processes N] [--requests N]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+import simplejson as json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'stock_handler'))
+
+MATERIAL = 49999001
+PLACES = [990001, 990002]
+LOTS = 40
+LOT_QUANTITY = 25
+
+
+def seed():
+    """Legt Material, Lagerplätze und Bestände je Produktionsauftrag neu an."""
+    from db import engine, session_scope
+    from schema_stock import Base, Material, Stock, Place, StockEntry, StockBalance, GoodsOrder, GoodsOrderPosition
+    from balances import bookBalance
+
+    Base.metadata.create_all(engine, tables=[Material.__table__, Stock.__table__, Place.__table__,
+                                             StockEntry.__table__, StockBalance.__table__, GoodsOrder.__table__,
+                                             GoodsOrderPosition.__table__])
+    with session_scope() as session:
+        orders = [order for (order,) in session.query(GoodsOrder.idgoodsOrders).
+                  filter(GoodsOrder.fkmaterials == MATERIAL)]
+        if orders:
+            session.query(GoodsOrderPosition).filter(GoodsOrderPosition.fkgoodsOrders.in_(orders)). \
+                delete(synchronize_session=False)
+            session.query(GoodsOrder).filter(GoodsOrder.idgoodsOrders.in_(orders)).delete(synchronize_session=False)
+        session.query(StockEntry).filter(StockEntry.fkmaterials == MATERIAL).delete(synchronize_session=False)
+        session.query(StockBalance).filter(StockBalance.fkmaterials == MATERIAL).delete(synchronize_session=False)
+
+        if session.query(Material).get(MATERIAL) is None:
+            session.add(Material(idmaterials=MATERIAL, name='Stresstest', art='Fertigware'))
+        if session.query(Stock).get(99) is None:
+            session.add(Stock(idstocks=99, description='Stresstest'))
+        session.flush()
+        for idplaces in PLACES:
+            if session.query(Place).get(idplaces) is None:
+                session.add(Place(idplaces=idplaces, description='Stresstest', fkstocks=99))
+        session.flush()
+
+        for lot in range(LOTS):
+            stockEntry = StockEntry(fkmaterials=MATERIAL, fkplaces=PLACES[lot % len(PLACES)], opened=0,
+                                    quantity=LOT_QUANTITY, productionOrderNr='STRESS-' + str(lot))
+            session.add(stockEntry)
+            session.flush()
+            bookBalance(session, stockEntry.fkmaterials, stockEntry.fkplaces, stockEntry.productionOrderNr, 0,
+                        LOT_QUANTITY, stockEntry.booking_date)
+
+
+def worker(args):
+    """Sendet Reservierungen mit zufälliger Menge und gibt die laut Antwort reservierte Menge zurück."""
+    seed_value, requests = args
+    from goods_orders_handler import createGoodsOrders
+
+    random.seed(seed_value)
+    reserved = 0
+    start = time.time()
+    for i in range(requests):
+        body = [{'fkmaterials': MATERIAL, 'quantity': random.randint(1, 30)}]
+        response = createGoodsOrders({'body': json.dumps(body)}, None)
+        for order in json.loads(response['body']):
+            if order.get('reservation'):
+                reserved = reserved + sum(pos['quantity'] for pos in order['reservation']['goodsOrderPos'])
+    return reserved, time.time() - start
+
+
+def verify():
+    """Prüft, dass kein Produktionsauftrag über seinen Bestand hinaus reserviert wurde."""
+    from sqlalchemy import func
+    from db import session_scope
+    from schema_stock import GoodsOrder, GoodsOrderPosition
+
+    with session_scope() as session:
+        rows = session.query(GoodsOrderPosition.productionOrderNr, GoodsOrderPosition.fkplaces,
+                             func.sum(GoodsOrderPosition.quantity)). \
+            filter(GoodsOrderPosition.fkgoodsOrders == GoodsOrder.idgoodsOrders). \
+            filter(GoodsOrder.fkmaterials == MATERIAL). \
+            group_by(GoodsOrderPosition.productionOrderNr, GoodsOrderPosition.fkplaces).all()
+    over = [row for row in rows if row[2] > LOT_QUANTITY]
+    return sum(row[2] for row in rows), over
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stresstest für parallele Reservierungen')
+    parser.add_argument('--processes', type=int, default=8, help='Anzahl paralleler Prozesse')
+    parser.add_argument('--requests', type=int, default=25, help='Requests je Prozess')
+    args = parser.parse_args()
+    processes = args.processes
+    requests = args.requests
+
+    seed()
+    # Die Verbindungen des Pools aus seed() dürfen nicht an die Worker vererbt werden (fork), sonst teilen sich
+    # mehrere Prozesse dieselben MySQL-Sockets. Jeder Worker baut eigene Verbindungen auf.
+    from db import engine
+    engine.dispose()
+
+    start = time.time()
+    pool = multiprocessing.Pool(processes)
+    results = pool.map(worker, [(i, requests) for i in range(processes)])
+    pool.close()
+    pool.join()
+    duration = time.time() - start
+
+    reserved_by_response = sum(result[0] for result in results)
+    reserved_in_db, over = verify()
+    print('Prozesse: %d, Requests: %d, Dauer: %.2f s, Durchsatz: %.1f Requests/s' %
+          (processes, processes * requests, duration, processes * requests / duration))
+    print('Bestand: %d, reserviert (Antworten): %d, reserviert (Datenbank): %d' %
+          (LOTS * LOT_QUANTITY, reserved_by_response, reserved_in_db))
+
+    if over or reserved_in_db != reserved_by_response or reserved_in_db > LOTS * LOT_QUANTITY:
+        print('FEHLER: Doppelte Reservierung: ' + str(over))
+        sys.exit(1)
+    print('OK: keine Doppelreservierung')
+
+
+if __name__ == '__main__':
+    main()
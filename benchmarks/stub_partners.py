@@ -0,0 +1,247 @@
+"""Prüft integration.py (Verbindungspool, Timeouts, Wiederholungen, Circuit Breaker) und die Zustellung über den
+Outbox gegen einen lokalen Stub-Server und eine SQLite-Datenbank.
+
+Der Stub simuliert die Produktion und den Versand: /ok antwortet sofort, /slow erst nach STUB_DELAY Sekunden, /fail
+immer mit 503 und /flaky/<n> mit 503 für die ersten n Anfragen. Schlägt eine Prüfung fehl, endet das Skript mit
+Exit-Code 1.
+
+Aufruf: python benchmarks/stub_partners.py
+"""
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import simplejson as json
+from sqlalchemy.dialects.mysql import DOUBLE, TINYINT
+from sqlalchemy.ext.compiler import compiles
+
+STUB_DELAY = 0.5
+requests_by_path = {}
+idempotency_keys = []
+connections = set()
+
+
+@compiles(DOUBLE, 'sqlite')
+def _compileDouble(type_, compiler, **kw):
+    return 'FLOAT'
+
+
+@compiles(TINYINT, 'sqlite')
+def _compileTinyint(type_, compiler, **kw):
+    return 'INTEGER'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Header und Body werden getrennt geschrieben, ohne TCP_NODELAY verzögert das die Antwort um ca. 40 ms
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        connections.add(self.client_address)
+        count = requests_by_path.get(self.path, 0) + 1
+        requests_by_path[self.path] = count
+        if self.headers.get('Idempotency-Key'):
+            idempotency_keys.append(self.headers.get('Idempotency-Key'))
+
+        status = 200
+        if self.path.startswith('/slow'):
+            time.sleep(STUB_DELAY)
+        elif self.path.startswith('/fail'):
+            status = 503
+        elif self.path.startswith('/flaky/') and count <= int(self.path.split('/')[2]):
+            status = 503
+
+        body = json.dumps({'statusCode': 200, 'body': [{'articleNumber': 50000001, 'quantity': 3}]}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = _respond
+    do_PATCH = _respond
+
+
+class StubServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # Abgebrochene Verbindungen nach einem Read-Timeout des Clients
+
+
+def startStub():
+    server = StubServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return 'http://127.0.0.1:' + str(server.server_address[1])
+
+
+def main():
+    base = startStub()
+    os.environ.update({'API_PRODUCTION_URL': base + '/ok', 'API_VERSAND_URL': base + '/ok',
+                       'API_READ_TIMEOUT': '0.2', 'API_CONNECT_TIMEOUT': '0.2', 'API_RETRIES': '2',
+                       'API_BACKOFF': '0.01', 'API_DEADLINE': '2', 'API_BREAKER_THRESHOLD': '3',
+                       'API_BREAKER_RESET': '0.5'})
+    os.environ.setdefault('DB_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'stub_partners.db') +
+                          '?check_same_thread=false')
+    os.environ.setdefault('QUERY_LOG_SAMPLE_RATE', '0')
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'stock_handler'))
+    import integration
+    from integration import CircuitBreaker, IntegrationError, callService
+
+    failures = []
+
+    def check(name, condition, detail=''):
+        print('%-66s %s %s' % (name, 'OK' if condition else 'FEHLER', detail))
+        if not condition:
+            failures.append(name)
+
+    # Verbindungspool: Alle Aufrufe verwenden dieselbe Verbindung
+    connections.clear()
+    for i in range(10):
+        integration.readProductionOrder('PO-1')
+        integration.updateShippingStatus('PO-1', 4, 'Auf Lager')
+    check('20 Aufrufe über eine Verbindung', len(connections) == 1, str(len(connections)) + ' Verbindungen')
+
+    # Wiederholung nach zwei 503-Antworten
+    breaker = CircuitBreaker('flaky', threshold=10)
+    response = callService(breaker, 'POST', base + '/flaky/2', '{}')
+    check('Wiederholung bis zum Erfolg', response.status_code == 200 and requests_by_path['/flaky/2'] == 3,
+          str(requests_by_path['/flaky/2']) + ' Anfragen')
+
+    # Langsamer Dienst: Abbruch nach (Wiederholungen + 1) Read-Timeouts statt nach STUB_DELAY je Versuch
+    breaker = CircuitBreaker('slow', threshold=10)
+    start = time.time()
+    try:
+        callService(breaker, 'POST', base + '/slow', '{}')
+        slow_error = False
+    except IntegrationError:
+        slow_error = True
+    duration = time.time() - start
+    check('Langsamer Dienst: IntegrationError nach Timeouts', slow_error and duration < 3 * STUB_DELAY,
+          '%.2f s' % duration)
+
+    # Circuit Breaker: öffnet nach threshold Fehlschlägen, danach keine Anfragen mehr bis zum Reset
+    breaker = CircuitBreaker('fail', threshold=3, reset=0.5)
+    for i in range(3):
+        try:
+            callService(breaker, 'POST', base + '/fail', '{}', retries=0)
+        except IntegrationError:
+            pass
+    before = requests_by_path['/fail']
+    start = time.time()
+    try:
+        callService(breaker, 'POST', base + '/fail', '{}')
+        open_error = False
+    except IntegrationError:
+        open_error = True
+    check('Circuit Breaker offen: sofortiger Fehler ohne Anfrage',
+          open_error and requests_by_path['/fail'] == before and time.time() - start < 0.05)
+
+    time.sleep(0.5)
+    response = callService(breaker, 'POST', base + '/ok', '{}', retries=0)
+    check('Circuit Breaker schließt nach erfolgreichem Probeaufruf',
+          response.status_code == 200 and breaker.opened is None and breaker.failures == 0)
+
+    from db import engine, session_scope
+    from schema_stock import Base, Material, Stock, Place, StockEntry, StockBalance, CacheVersion, ProductionOrder, \
+        OutboxEvent
+    from outbox_handler import dispatchOutbox
+    Base.metadata.create_all(engine, tables=[Material.__table__, Stock.__table__, Place.__table__,
+                                             StockEntry.__table__, StockBalance.__table__, CacheVersion.__table__,
+                                             ProductionOrder.__table__, OutboxEvent.__table__])
+    with session_scope() as session:
+        session.add(Stock(idstocks=1, description='Lager'))
+        session.add(Place(idplaces=1, description='Platz', fkstocks=1))
+        session.add(Material(idmaterials=50000001, name='Fertigware', art='Fertigware'))
+
+    # Lambda Function: Produktion nicht erreichbar -> 503 statt Timeout der Function
+    integration.ApiProductionUrl = base + '/fail'
+    integration.breakers['production'] = CircuitBreaker('production', threshold=3)
+    from product_handler import bookProductToStock
+    start = time.time()
+    response = bookProductToStock({'body': json.dumps({'productionOrderNr': 'PO-1', 'fkplaces': 1})}, None)
+    check('bookProductToStock: 503, wenn die Produktion ausfällt', response['statusCode'] == 503,
+          '%s nach %.2f s' % (response['statusCode'], time.time() - start))
+
+    # Outbox: Die Buchung wartet nicht auf den Versand, das Ereignis wird vom Dispatcher zugestellt
+    integration.ApiProductionUrl = base + '/ok'
+    integration.ApiVersandUrl = base + '/fail'
+    integration.breakers['production'] = CircuitBreaker('production')
+    requests_by_path.pop('/fail', None)
+    response = bookProductToStock({'body': json.dumps({'productionOrderNr': 'PO-2', 'fkplaces': 1})}, None)
+    with session_scope() as session:
+        entries = session.query(StockEntry).filter(StockEntry.productionOrderNr == 'PO-2').count()
+        events = session.query(OutboxEvent.state).all()
+    check('bookProductToStock: Buchung und Ereignis ohne Aufruf des Versands',
+          response['statusCode'] == 200 and entries == 1 and events == [('pending',)] and
+          '/fail' not in requests_by_path, str(response['statusCode']))
+
+    # Versand fällt aus: Das Ereignis bleibt offen und wird später wiederholt
+    integration.breakers['versand'] = CircuitBreaker('versand', threshold=100)
+    result = dispatchOutbox({}, None)
+    with session_scope() as session:
+        event = session.query(OutboxEvent).one()
+        pending = (event.state, event.attempts, event.next_attempt > event.creation_date)
+        session.query(OutboxEvent).update({OutboxEvent.next_attempt: event.creation_date})
+    check('Outbox: Versand nicht erreichbar, Ereignis bleibt offen',
+          result == {'delivered': 0, 'failed': 1} and pending == ('pending', 1, True), str(pending))
+
+    # Versand erreichbar: Zustellung mit Idempotency-Key, danach keine weitere Zustellung
+    integration.ApiVersandUrl = base + '/ok'
+    del idempotency_keys[:]
+    first = dispatchOutbox({}, None)
+    second = dispatchOutbox({}, None)
+    with session_scope() as session:
+        event = session.query(OutboxEvent).one()
+        delivered = (event.state, event.attempts, event.idempotency_key)
+    check('Outbox: Zustellung genau einmal mit Idempotency-Key',
+          first == {'delivered': 1, 'failed': 0} and second == {'delivered': 0, 'failed': 0} and
+          delivered[:2] == ('delivered', 2) and idempotency_keys == [delivered[2]], str(delivered))
+
+    # Cache der Produktionsaufträge: zweite Buchung ohne Abfrage, neuer Container über die Tabelle
+    import product_handler
+    from production_orders import ProductionOrderCache
+    production_calls = requests_by_path['/ok']
+    response = bookProductToStock({'body': json.dumps({'productionOrderNr': 'PO-2', 'fkplaces': 1})}, None)
+    statistics = product_handler.production_order_cache.statistics()
+    check('Produktionsauftrag: zweite Buchung aus dem Speicher',
+          response['statusCode'] == 200 and requests_by_path['/ok'] == production_calls and statistics['hits'] == 1,
+          str(statistics))
+    product_handler.production_order_cache = ProductionOrderCache()
+    response = bookProductToStock({'body': json.dumps({'productionOrderNr': 'PO-2', 'fkplaces': 1})}, None)
+    statistics = product_handler.production_order_cache.statistics()
+    check('Produktionsauftrag: Kaltstart aus der Tabelle productionOrders',
+          response['statusCode'] == 200 and requests_by_path['/ok'] == production_calls and
+          statistics['table_hits'] == 1, str(statistics))
+
+    # Gleichzeitige Abfragen desselben Auftrags: eine Abfrage der Produktion
+    cache = ProductionOrderCache()
+    fetches = []
+
+    def slowFetch(productionOrderNr):
+        fetches.append(productionOrderNr)
+        time.sleep(0.2)
+        return {'articleNumber': 50000001, 'quantity': 1}, None
+
+    threads = [threading.Thread(target=cache.get, args=('PO-3', slowFetch)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    check('Produktionsauftrag: 8 gleichzeitige Abfragen, 1 Aufruf', len(fetches) == 1, str(cache.statistics()))
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Alembic-Umgebung der gemeinsamen Datenbank von stock_handler und receiving_handler.
+
+Die Verbindung wird wie in db.py über DB_URL bzw. DB_HOST, DB_USER, DB_PASSWORD und DB_NAME angegeben. Die Modelle
+beider Services (schema_stock.py und schema_receiving.py) bilden die Zielmetadaten für alembic revision --autogenerate.
+"""
+import os
+import sys
+from alembic import context
+from sqlalchemy import MetaData, create_engine, pool
+from sqlalchemy.dialects.mysql import DOUBLE, TINYINT
+from sqlalchemy.ext.compiler import compiles
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[0:0] = [os.path.join(ROOT, 'stock_handler'), os.path.join(ROOT, 'receiving_handler')]
+
+import schema_receiving  # noqa: E402
+import schema_stock  # noqa: E402
+
+# Sichten der Datenbank, die in den Modellen wie Tabellen abgebildet sind
+views = ['inventory']
+
+
+# MySQL-Typen für lokale Messungen mit SQLite (benchmarks/)
+@compiles(DOUBLE, 'sqlite')
+def _compileDouble(type_, compiler, **kw):
+    return 'FLOAT'
+
+
+@compiles(TINYINT, 'sqlite')
+def _compileTinyint(type_, compiler, **kw):
+    return 'INTEGER'
+
+
+def databaseUrl():
+    url = os.environ.get('DB_URL')
+    if url is None:
+        url = 'mysql+mysqlconnector://' + os.environ['DB_USER'] + ':' + os.environ['DB_PASSWORD'] + '@' + \
+              os.environ['DB_HOST'] + '/' + os.environ['DB_NAME']
+    return url
+
+
+def targetMetadata():
+    """Vereinigt die Tabellen beider Services. Gemeinsame Tabellen (z.B. materials, receivingsPos) werden aus
+    schema_receiving übernommen, das sie vollständig abbildet."""
+    metadata = MetaData()
+    for base in (schema_receiving.Base, schema_stock.Base):
+        for table in base.metadata.tables.values():
+            if table.name not in metadata.tables:
+                table.to_metadata(metadata)
+    return metadata
+
+
+def includeObject(object, name, type_, reflected, compare_to):
+    return not (type_ == 'table' and name in views)
+
+
+def runMigrationsOffline():
+    context.configure(url=databaseUrl(), target_metadata=targetMetadata(), include_object=includeObject,
+                      literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def runMigrationsOnline():
+    engine = create_engine(databaseUrl(), poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=targetMetadata(), include_object=includeObject)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    runMigrationsOffline()
+else:
+    runMigrationsOnline()
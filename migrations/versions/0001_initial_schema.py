@@ -0,0 +1,114 @@
+"""Ausgangsstand der Datenbank (Tabellen des ursprünglichen Projekts)
+
+Bestehende Datenbanken werden nur markiert (alembic stamp 0001) und danach mit alembic upgrade head aktualisiert.
+Die Längen der in den Modellen ohne Länge definierten Textspalten sind für MySQL auf 45 Zeichen festgelegt.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.mysql import DOUBLE, TINYINT
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('materials',
+                    sa.Column('idmaterials', sa.Integer(), primary_key=True),
+                    sa.Column('name', sa.String(20), nullable=False),
+                    sa.Column('description', sa.String(45)),
+                    sa.Column('size', DOUBLE()),
+                    sa.Column('measure', sa.String(10)),
+                    sa.Column('minStock', sa.Integer()),
+                    sa.Column('art', sa.String(45), nullable=False))
+    op.create_table('stocks',
+                    sa.Column('idstocks', sa.Integer(), primary_key=True),
+                    sa.Column('description', sa.String(45)))
+    op.create_table('places',
+                    sa.Column('idplaces', sa.Integer(), primary_key=True),
+                    sa.Column('description', sa.String(45)),
+                    sa.Column('fkstocks', sa.Integer(), sa.ForeignKey('stocks.idstocks'), nullable=False))
+    op.create_table('stockEntries',
+                    sa.Column('idstockEntries', sa.Integer(), primary_key=True),
+                    sa.Column('fkplaces', sa.Integer(), sa.ForeignKey('places.idplaces'), nullable=False),
+                    sa.Column('fkmaterials', sa.Integer(), sa.ForeignKey('materials.idmaterials'), nullable=False),
+                    sa.Column('productionOrderNr', sa.String(45)),
+                    sa.Column('opened', TINYINT(), nullable=False),
+                    sa.Column('quantity', sa.Integer(), nullable=False),
+                    sa.Column('booking_date', sa.DateTime(), nullable=False))
+    op.create_table('goodsOrders',
+                    sa.Column('idgoodsOrders', sa.Integer(), primary_key=True),
+                    sa.Column('fkmaterials', sa.Integer(), sa.ForeignKey('materials.idmaterials'), nullable=False),
+                    sa.Column('creation_date', sa.DateTime(), nullable=False))
+    op.create_table('goodsOrdersPos',
+                    sa.Column('fkgoodsOrders', sa.Integer(), sa.ForeignKey('goodsOrders.idgoodsOrders'),
+                              primary_key=True),
+                    sa.Column('productionOrderNr', sa.String(45), primary_key=True),
+                    sa.Column('quantity', sa.Integer(), nullable=False),
+                    sa.Column('done', TINYINT()),
+                    sa.Column('fkplaces', sa.Integer(), sa.ForeignKey('places.idplaces'), primary_key=True))
+    op.create_table('suppliers',
+                    sa.Column('idsuppliers', sa.Integer(), primary_key=True),
+                    sa.Column('name', sa.String(100)),
+                    sa.Column('address', sa.String(255)),
+                    sa.Column('postcode', sa.String(20)),
+                    sa.Column('ort', sa.String(45)),
+                    sa.Column('contact', sa.String(100)),
+                    sa.Column('phone', sa.String(45)),
+                    sa.Column('fax', sa.String(45)),
+                    sa.Column('email', sa.String(45)))
+    op.create_table('orders',
+                    sa.Column('idorders', sa.Integer(), primary_key=True),
+                    sa.Column('order_date', sa.DateTime()),
+                    sa.Column('capturer', sa.String(10)),
+                    sa.Column('state', sa.String(7)),
+                    sa.Column('fksuppliers', sa.Integer(), sa.ForeignKey('suppliers.idsuppliers')))
+    op.create_table('ordersPos',
+                    sa.Column('idordersPos', sa.Integer(), primary_key=True),
+                    sa.Column('fkorders', sa.Integer(), sa.ForeignKey('orders.idorders'), nullable=False),
+                    sa.Column('position', sa.Integer(), nullable=False),
+                    sa.Column('fkmaterials', sa.Integer(), sa.ForeignKey('materials.idmaterials'), nullable=False),
+                    sa.Column('quantity', sa.Integer(), nullable=False))
+    op.create_table('receivings',
+                    sa.Column('id', sa.Integer(), primary_key=True),
+                    sa.Column('receiving_date', sa.DateTime()),
+                    sa.Column('capturer', sa.String(45)),
+                    sa.Column('fksuppliers', sa.Integer(), sa.ForeignKey('suppliers.idsuppliers')))
+    op.create_table('receivingsPos',
+                    sa.Column('fkreceivings', sa.Integer(), sa.ForeignKey('receivings.id'), primary_key=True),
+                    sa.Column('position', sa.Integer(), primary_key=True),
+                    sa.Column('fkmaterials', sa.Integer(), sa.ForeignKey('materials.idmaterials'), nullable=False),
+                    sa.Column('quantity', sa.Integer(), nullable=False),
+                    sa.Column('checked', TINYINT()),
+                    sa.Column('price', DOUBLE()),
+                    sa.Column('fkordersPos', sa.Integer(), sa.ForeignKey('ordersPos.idordersPos')))
+    op.create_table('charges',
+                    sa.Column('idcharges', sa.Integer(), primary_key=True),
+                    sa.Column('fkmaterials', sa.Integer(), sa.ForeignKey('materials.idmaterials'), nullable=False),
+                    sa.Column('date', sa.DateTime()))
+    op.create_table('chargesShirt',
+                    sa.Column('fkcharges', sa.Integer(), sa.ForeignKey('charges.idcharges'), primary_key=True),
+                    sa.Column('whiteness', sa.Integer(), nullable=False),
+                    sa.Column('absorbency', DOUBLE(), nullable=False))
+    op.create_table('chargesColor',
+                    sa.Column('fkcharges', sa.Integer(), sa.ForeignKey('charges.idcharges'), primary_key=True),
+                    sa.Column('ppml', sa.Integer(), nullable=False),
+                    sa.Column('viscosity', DOUBLE(), nullable=False),
+                    sa.Column('deltaE', DOUBLE(), nullable=False))
+
+    # Inventar: Summe des Journals je Lagerplatz, Material und geöffnet (Modell Inventory)
+    op.execute('CREATE VIEW inventory AS '
+               'SELECT fkplaces, fkmaterials, opened, SUM(quantity) AS quantity FROM stockEntries '
+               'GROUP BY fkplaces, fkmaterials, opened')
+
+
+def downgrade():
+    op.execute('DROP VIEW inventory')
+    for table in ('chargesColor', 'chargesShirt', 'charges', 'receivingsPos', 'receivings', 'ordersPos', 'orders',
+                  'suppliers', 'goodsOrdersPos', 'goodsOrders', 'stockEntries', 'places', 'stocks', 'materials'):
+        op.drop_table(table)
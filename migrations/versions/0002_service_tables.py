@@ -0,0 +1,62 @@
+"""Tabellen für Bestände, Bewertung, Caches und Outbox
+
+stockBalances (balances.py), materialValuations (valuation.py), cacheVersions (material_cache.py), productionOrders
+(production_orders.py) und outboxEvents (outbox.py). Die Bestände werden aus dem Journal stockEntries aufgebaut,
+die Bewertungsschichten schreibt receiving_handler/valuation.py bei der nächsten Buchung je Material fort.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:05:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.mysql import TINYINT
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stockBalances',
+                    sa.Column('fkmaterials', sa.Integer(), sa.ForeignKey('materials.idmaterials'), primary_key=True),
+                    sa.Column('fkplaces', sa.Integer(), sa.ForeignKey('places.idplaces'), primary_key=True),
+                    sa.Column('productionOrderNr', sa.String(45), primary_key=True, server_default=''),
+                    sa.Column('opened', TINYINT(), primary_key=True),
+                    sa.Column('quantity', sa.Integer(), nullable=False, server_default='0'),
+                    sa.Column('first_booking_date', sa.DateTime(), nullable=False))
+    op.create_table('materialValuations',
+                    sa.Column('fkmaterials', sa.Integer(), sa.ForeignKey('materials.idmaterials'), primary_key=True),
+                    sa.Column('layers', sa.Text(), nullable=False),
+                    sa.Column('updated', sa.DateTime(), nullable=False))
+    op.create_table('cacheVersions',
+                    sa.Column('name', sa.String(45), primary_key=True),
+                    sa.Column('version', sa.Integer(), nullable=False, server_default='0'))
+    op.create_table('productionOrders',
+                    sa.Column('productionOrderNr', sa.String(45), primary_key=True),
+                    sa.Column('articleNumber', sa.Integer(), nullable=False),
+                    sa.Column('quantity', sa.Integer(), nullable=False),
+                    sa.Column('fetched', sa.DateTime(), nullable=False))
+    op.create_table('outboxEvents',
+                    sa.Column('idoutboxEvents', sa.Integer(), primary_key=True),
+                    sa.Column('idempotency_key', sa.String(36), nullable=False, unique=True),
+                    sa.Column('target', sa.String(20), nullable=False),
+                    sa.Column('payload', sa.Text(), nullable=False),
+                    sa.Column('state', sa.String(10), nullable=False, server_default='pending'),
+                    sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+                    sa.Column('next_attempt', sa.DateTime(), nullable=False),
+                    sa.Column('last_error', sa.String(255)),
+                    sa.Column('creation_date', sa.DateTime(), nullable=False),
+                    sa.Column('delivery_date', sa.DateTime()))
+
+    # Bestände aus dem Journal (wie python balances.py rebuild)
+    op.execute('INSERT INTO stockBalances (fkmaterials, fkplaces, productionOrderNr, opened, quantity, '
+               'first_booking_date) '
+               "SELECT fkmaterials, fkplaces, IFNULL(productionOrderNr, ''), opened, SUM(quantity), MIN(booking_date) "
+               "FROM stockEntries GROUP BY fkmaterials, fkplaces, IFNULL(productionOrderNr, ''), opened")
+
+
+def downgrade():
+    for table in ('outboxEvents', 'productionOrders', 'cacheVersions', 'materialValuations', 'stockBalances'):
+        op.drop_table(table)
@@ -0,0 +1,40 @@
+"""Indizes für die häufigsten Abfragen der Reservierung, Bewertung und Outbox
+
+- stockBalances (productionOrderNr, fkplaces, fkmaterials): Bestände und Sperren je Produktionsauftrag
+  (reservation.lockMaterials, reservation.loadStock). Der Primärschlüssel beginnt mit fkmaterials. Die Bestände je
+  Produktionsauftrag werden nicht mehr aus stockEntries summiert, das Journal erhält daher keinen weiteren Index.
+- goodsOrdersPos (productionOrderNr, fkplaces, done, quantity): offen reservierte Menge (reservation.loadReservedStock),
+  abdeckend.
+- receivingsPos (fkmaterials, fkreceivings, position, quantity, price): Wareneingänge je Material für die Bewertung
+  (valuation.loadReceivings, valuation.loadLayers), abdeckend; receivings wird über den Primärschlüssel verbunden.
+- outboxEvents (state, next_attempt): fällige Ereignisse (outbox.claimEvents).
+
+Prüfung der Ausführungspläne: python benchmarks/explain_hot_queries.py
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 09:10:00
+"""
+from alembic import op
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+indexes = [
+    ('ix_stockBalances_order_place_material', 'stockBalances', ['productionOrderNr', 'fkplaces', 'fkmaterials']),
+    ('ix_goodsOrdersPos_order_place_done', 'goodsOrdersPos', ['productionOrderNr', 'fkplaces', 'done', 'quantity']),
+    ('ix_receivingsPos_material', 'receivingsPos', ['fkmaterials', 'fkreceivings', 'position', 'quantity', 'price']),
+    ('ix_outboxEvents_state_next_attempt', 'outboxEvents', ['state', 'next_attempt']),
+]
+
+
+def upgrade():
+    for name, table, columns in indexes:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, columns in reversed(indexes):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,37 @@
+"""Verdichtung des Journals stockEntries
+
+stockEntries.snapshot_date kennzeichnet die Snapshot-Zeilen der Verdichtung (stock_handler/compaction.py), die
+verdichteten Buchungen werden nach stockEntriesArchive verschoben. Vor dem Downgrade müssen die archivierten Buchungen
+zurückgeschrieben werden, sonst fehlen sie im Journal.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 11:20:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.mysql import TINYINT
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('stockEntries', sa.Column('snapshot_date', sa.DateTime(), nullable=True))
+    op.create_table('stockEntriesArchive',
+                    sa.Column('idstockEntries', sa.Integer(), primary_key=True, autoincrement=False),
+                    sa.Column('fkplaces', sa.Integer(), nullable=False),
+                    sa.Column('fkmaterials', sa.Integer(), nullable=False),
+                    sa.Column('productionOrderNr', sa.String(45)),
+                    sa.Column('opened', TINYINT(), nullable=False),
+                    sa.Column('quantity', sa.Integer(), nullable=False),
+                    sa.Column('booking_date', sa.DateTime(), nullable=False),
+                    sa.Column('fksnapshot', sa.Integer(), nullable=False),
+                    sa.Column('archive_date', sa.DateTime(), nullable=False))
+
+
+def downgrade():
+    op.drop_table('stockEntriesArchive')
+    op.drop_column('stockEntries', 'snapshot_date')
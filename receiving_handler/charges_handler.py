@@ -0,0 +1,107 @@
+import simplejson as json
+import logging
+from sqlalchemy.orm import joinedload
+from db import session_scope
+from query_stats import trackQueries, query_budgets
+from schema_receiving import Material, CacheVersion, Charge, MaterialSchema, ChargeSchema
+from material_cache import MaterialCache, material_columns
+from row_serializer import compileSerializer
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Ladeplan: Shirt- bzw. Farbwerte mit einem JOIN, das Material der Charge kommt aus dem Materialcache.
+charge_load_plan = [joinedload(Charge.chargeShirt), joinedload(Charge.chargeColor)]
+
+# Materialstammdaten, bleiben über warme Aufrufe des Containers erhalten
+material_cache = MaterialCache(Material, CacheVersion)
+
+# Maximale Anzahl an SQL-Statements je Request. Bei leerem Materialcache je eine Abfrage für den Versionsstempel und
+# das Material.
+query_budgets.update({
+    'getCharge': 3,
+})
+
+
+@trackQueries
+def getCharge(event, context):  # Lambda Function
+    """Gibt eine Charge mit einer bestimmten ID zurück."""
+    params = event["pathParameters"]
+    id = params["id"]
+
+    with session_scope() as session:
+        charge = session.query(Charge).options(*charge_load_plan).filter(Charge.idcharges == id).first()
+
+        if charge is None:
+            return {
+                "statusCode": 400,
+                'headers': {
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+                },
+                "body": json.dumps({"message": "Die Charge mit der ID " + str(id) + " existiert nicht."}),
+            }
+
+        material = material_cache.getMaterial(session, charge.fkmaterials)
+        if material is None:
+            return {
+                "statusCode": 404,
+                'headers': {
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+                },
+                "body": json.dumps({"message": "Das Material " + str(charge.fkmaterials) + " der Charge mit der ID " +
+                                               str(id) + " existiert nicht."}),
+            }
+
+        if material['art'] == 'T-Shirt':
+            exclude = ['chargeColor']
+        elif material['art'] == 'Farbe':
+            exclude = ['chargeShirt']
+        else:
+            exclude = ['chargeShirt', 'chargeColor']
+
+        # Serialize the queryset. Das Material kommt aus dem Cache und wird an seiner Stelle im Schema eingefügt,
+        # damit die Reihenfolge der Felder unverändert bleibt.
+        schema = ChargeSchema(exclude=exclude)
+        result = ChargeSchema(exclude=exclude + ['material']).dump(charge)
+        result['material'] = compileSerializer(MaterialSchema(), columns=material_columns, mapping=True).one(material)
+        result = dict((name, result[name]) for name in schema.dump_fields if name in result)
+
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps(result),
+    }
+
+
+@trackQueries
+def createCharge(event, context):  # Lambda Function
+    """Anlage oder Änderung einer Charge."""
+    logger.info(event)
+
+    body = json.loads(event.get('body'))
+    logger.info(body)
+
+    with session_scope() as session:
+        charge_new = ChargeSchema().load(body, session=session)
+        session.add(charge_new)
+        session.commit()
+
+        # Serialize the queryset
+        result = ChargeSchema().dump(charge_new)
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps(result),
+    }
@@ -0,0 +1,152 @@
+# Gemeinsame Datenbankanbindung der Lambda Functions.
+# Identische Kopie in stock_handler/db.py und receiving_handler/db.py (je CodeUri ein Paket), bitte synchron halten.
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger()
+
+# Datenbank. DB_URL ersetzt die Verbindung vollständig (z.B. sqlite:///... für lokale Messungen in benchmarks/).
+db_url = os.environ.get('DB_URL')
+if db_url is None:
+    rds_host = os.environ['DB_HOST']
+    name = os.environ['DB_USER']
+    password = os.environ['DB_PASSWORD']
+    db_name = os.environ['DB_NAME']
+    db_url = 'mysql+mysqlconnector://' + name + ':' + password + '@' + rds_host + '/' + db_name
+
+# Verbindungspool je Container: Eine Lambda-Instanz bearbeitet immer nur einen Request, benötigt durch verschachtelte
+# Sessions (z.B. bookProductFromStock -> bookToStock) aber zwei Verbindungen gleichzeitig.
+pool_size = int(os.environ.get('DB_POOL_SIZE', 2))
+max_overflow = int(os.environ.get('DB_MAX_OVERFLOW', 1))
+pool_timeout = int(os.environ.get('DB_POOL_TIMEOUT', 5))
+
+# Verbindungen vor Ablauf des wait_timeout des MySQL-Servers erneuern.
+wait_timeout = int(os.environ.get('DB_WAIT_TIMEOUT', 28800))
+pool_recycle = max(wait_timeout - 60, 60)
+
+# Wiederholungen bei Deadlocks (1213) und Lock-Wait-Timeouts (1205) mit exponentiellem Backoff und Jitter
+deadlock_retries = int(os.environ.get('DB_DEADLOCK_RETRIES', 3))
+deadlock_backoff = float(os.environ.get('DB_DEADLOCK_BACKOFF', 0.05))
+deadlock_backoff_max = float(os.environ.get('DB_DEADLOCK_BACKOFF_MAX', 1.0))
+retryable_errors = (1205, 1213)
+
+
+class PoolStatistics(object):
+    """Zähler des Verbindungspools über alle Aufrufe eines Containers."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.hits = 0
+        self.misses = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.checkout_time = 0.0
+        self.checkout_time_max = 0.0
+
+    def recordCheckout(self, duration, hit):
+        self.checkouts = self.checkouts + 1
+        if hit:
+            self.hits = self.hits + 1
+        else:
+            self.misses = self.misses + 1
+        self.checkout_time = self.checkout_time + duration
+        self.checkout_time_max = max(self.checkout_time_max, duration)
+
+    def asDict(self):
+        return {
+            'checkouts': self.checkouts,
+            'hits': self.hits,
+            'misses': self.misses,
+            'connects': self.connects,
+            'invalidations': self.invalidations,
+            'checkout_ms_avg': round(self.checkout_time * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+            'checkout_ms_max': round(self.checkout_time_max * 1000, 3),
+        }
+
+
+pool_statistics = PoolStatistics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool, der Treffer (wiederverwendete Verbindung), Fehlschläge (neue Verbindung) und die Dauer jedes
+    Checkouts inklusive Pre-Ping erfasst."""
+
+    def connect(self):
+        start = time.time()
+        connects = pool_statistics.connects
+        try:
+            return super(InstrumentedQueuePool, self).connect()
+        finally:
+            pool_statistics.recordCheckout(time.time() - start, pool_statistics.connects == connects)
+
+
+# Kein echo: Die Statements werden von query_stats.py erfasst (SQL_TRACE=1 für die vollständige Ausgabe).
+engine = create_engine(db_url, poolclass=InstrumentedQueuePool, pool_size=pool_size, max_overflow=max_overflow,
+                       pool_timeout=pool_timeout, pool_recycle=pool_recycle, pool_pre_ping=True)
+
+
+@event.listens_for(engine, 'connect')
+def _onConnect(dbapi_connection, connection_record):
+    pool_statistics.connects = pool_statistics.connects + 1
+
+
+@event.listens_for(engine, 'invalidate')
+def _onInvalidate(dbapi_connection, connection_record, exception):
+    pool_statistics.invalidations = pool_statistics.invalidations + 1
+
+
+# Die Session-Factory wird einmal je Container erzeugt und bei warmen Aufrufen wiederverwendet.
+Session = sessionmaker(bind=engine)
+
+
+def getPoolStatistics():
+    """Gibt die Statistik des Verbindungspools dieses Containers zurück."""
+    return pool_statistics.asDict()
+
+
+@contextmanager
+def session_scope():
+    """Provide a transactional scope around a series of operations."""
+    session = Session()
+    try:
+        yield session
+        session.commit()
+    except:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def isRetryable(error):
+    """Prüft, ob der Datenbankfehler ein Deadlock oder Lock-Wait-Timeout ist."""
+    return getattr(error.orig, 'errno', None) in retryable_errors
+
+
+def runTransaction(work, retries=None):
+    """Führt work(session) in einer kurzen, eigenen Transaktion aus.
+
+    Bei Deadlocks und Lock-Wait-Timeouts wird die gesamte Transaktion nach einer zufälligen, exponentiell wachsenden
+    Wartezeit wiederholt (höchstens DB_DEADLOCK_RETRIES mal).
+    """
+    if retries is None:
+        retries = deadlock_retries
+
+    attempt = 0
+    while True:
+        try:
+            with session_scope() as session:
+                return work(session)
+        except DBAPIError as e:
+            if (attempt >= retries) or not isRetryable(e):
+                raise
+            attempt = attempt + 1
+            logger.warning('Transaktion wird wiederholt (' + str(attempt) + '/' + str(retries) + '): ' + str(e.orig))
+            time.sleep(random.uniform(0, min(deadlock_backoff_max, deadlock_backoff * (2 ** attempt))))
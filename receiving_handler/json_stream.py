@@ -0,0 +1,44 @@
+# Blockweise Serialisierung großer Abfrageergebnisse für die Listen-Endpunkte.
+# Identische Kopie in stock_handler/json_stream.py und receiving_handler/json_stream.py, bitte synchron halten.
+import os
+import simplejson as json
+from itertools import islice
+from row_serializer import querySerializer
+from profiling import invocation_timer
+
+# Anzahl der Zeilen, die gemeinsam aus der Datenbank gelesen und serialisiert werden
+stream_batch_size = int(os.environ.get('JSON_STREAM_BATCH', 1000))
+
+
+def iterBatches(rows, batch_size):
+    """Teilt ein iterierbares Abfrageergebnis in Listen mit höchstens batch_size Zeilen."""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def iterJsonArray(rows, dump, batch_size=None):
+    """Erzeugt ein JSON-Array schrittweise: Je Block werden die Zeilen mit dump(Liste) in Dicts umgewandelt und sofort
+    als Text ausgegeben, sodass nie mehr als ein Block an Zeilen und Dicts gleichzeitig im Speicher liegt."""
+    yield '['
+    separator = ''
+    for batch in iterBatches(rows, batch_size or stream_batch_size):
+        # Ohne die Klammern des Teil-Arrays anhängen
+        yield separator + json.dumps(dump(batch))[1:-1]
+        separator = ', '
+    yield ']'
+
+
+def dumpQuery(query, schema, batch_size=None):
+    """Liest eine Abfrage blockweise (yield_per) und gibt das Ergebnis als JSON-Array (Text) zurück.
+
+    query: SQLAlchemy Query
+    schema: Schema der Zeilen, serialisiert wird mit dem vorkompilierten Serialisierer (row_serializer)
+    """
+    batch_size = batch_size or stream_batch_size
+    # Die Zeit der blockweisen Abfragen zählt als SQL-Zeit, nicht als Serialisierung
+    with invocation_timer.measure('serialization'):
+        return ''.join(iterJsonArray(query.yield_per(batch_size), querySerializer(schema, query), batch_size))
@@ -0,0 +1,179 @@
+# Read-Through-Cache für Materialstammdaten, bleibt über warme Aufrufe eines Containers erhalten.
+# Identische Kopie in stock_handler/material_cache.py und receiving_handler/material_cache.py, bitte synchron halten.
+import logging
+import os
+import time
+import simplejson as json
+from collections import OrderedDict
+
+logger = logging.getLogger()
+
+# Gültigkeit eines Eintrags, maximale Anzahl an Einträgen (LRU) und Abstand der Prüfungen des Versionsstempels
+cache_ttl = float(os.environ.get('MATERIAL_CACHE_TTL', 300))
+cache_size = int(os.environ.get('MATERIAL_CACHE_SIZE', 1024))
+version_interval = float(os.environ.get('MATERIAL_CACHE_VERSION_INTERVAL', 5))
+# Optional: gemeinsamer Cache aller Container in einem Redis-kompatiblen Server, z.B. redis://localhost:6379/0
+redis_url = os.environ.get('MATERIAL_CACHE_REDIS_URL')
+
+material_columns = ('idmaterials', 'name', 'description', 'size', 'measure', 'minStock', 'art')
+version_name = 'materials'
+
+
+class MemoryBackend(object):
+    """Cache im Speicher des Containers mit TTL und LRU-Verdrängung."""
+
+    def __init__(self, size=cache_size, ttl=cache_ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+    def get(self, version, key):
+        entry = self.entries.get((version, key))
+        if entry is None:
+            return None
+        if entry[0] < time.time():
+            del self.entries[(version, key)]
+            return None
+        self.entries.move_to_end((version, key))
+        return entry[1]
+
+    def set(self, version, key, value):
+        self.entries[(version, key)] = (time.time() + self.ttl, value)
+        self.entries.move_to_end((version, key))
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def delete(self, version, key):
+        self.entries.pop((version, key), None)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class RedisBackend(object):
+    """Gemeinsamer Cache in Redis. Die Schlüssel enthalten den Versionsstempel, alte Versionen laufen über die TTL
+    ab.
+
+    Fehler und Timeouts von Redis werden protokolliert und wie ein Fehltreffer behandelt, die Materialien kommen dann
+    aus der Datenbank.
+    """
+
+    def __init__(self, url, ttl=cache_ttl):
+        import redis
+        self.client = redis.StrictRedis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self.errors = redis.RedisError
+        self.ttl = ttl
+
+    def _key(self, version, key):
+        return 'material:' + str(version) + ':' + str(key)
+
+    def get(self, version, key):
+        try:
+            value = self.client.get(self._key(version, key))
+        except self.errors as e:
+            logger.warning('Materialcache (Redis) nicht erreichbar: ' + str(e))
+            return None
+        return json.loads(value) if value is not None else None
+
+    def set(self, version, key, value):
+        try:
+            self.client.setex(self._key(version, key), int(self.ttl), json.dumps(value))
+        except self.errors as e:
+            logger.warning('Materialcache (Redis) nicht erreichbar: ' + str(e))
+
+    def delete(self, version, key):
+        try:
+            self.client.delete(self._key(version, key))
+        except self.errors as e:
+            logger.warning('Materialcache (Redis) nicht erreichbar: ' + str(e))
+
+    def clear(self):
+        """Leert nichts: Der gemeinsame Cache wird nur über einen neuen Versionsstempel (bumpVersion) ungültig, da
+        die Schlüssel die Version enthalten."""
+        pass
+
+
+def createBackend():
+    """Redis, falls MATERIAL_CACHE_REDIS_URL gesetzt und das Paket redis verfügbar ist, sonst Speicher."""
+    if redis_url:
+        try:
+            return RedisBackend(redis_url)
+        except ImportError:
+            logger.warning('Das Paket redis ist nicht installiert, der Materialcache bleibt im Speicher.')
+    return MemoryBackend()
+
+
+class MaterialCache(object):
+    """Materialstammdaten je idmaterials als dict der Spalten.
+
+    Der Versionsstempel liegt in der Tabelle cacheVersions und wird bei jeder Änderung eines Materials erhöht
+    (bumpVersion). Jeder Container prüft ihn höchstens alle MATERIAL_CACHE_VERSION_INTERVAL Sekunden und verwirft bei
+    einer neuen Version seine Einträge. Nicht vorhandene Materialien werden nicht gecacht.
+    """
+
+    def __init__(self, material_model, version_model, backend=None):
+        self.material_model = material_model
+        self.version_model = version_model
+        self.backend = backend if backend is not None else createBackend()
+        self.version = None
+        self.version_checked = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def currentVersion(self, session):
+        """Liest den Versionsstempel (höchstens alle version_interval Sekunden)."""
+        now = time.time()
+        if self.version is None or now - self.version_checked >= version_interval:
+            version = session.query(self.version_model.version). \
+                filter(self.version_model.name == version_name).scalar() or 0
+            if self.version is not None and version != self.version:
+                self.backend.clear()
+            self.version = version
+            self.version_checked = now
+        return self.version
+
+    def getMaterials(self, session, idmaterials):
+        """Gibt die Materialien als dict idmaterials -> Spalten zurück. Fehlende Einträge werden mit einer Abfrage
+        nachgeladen, nicht existierende Materialien fehlen im Ergebnis."""
+        version = self.currentVersion(session)
+        materials = {}
+        missing = set()
+        for id in set(idmaterials):
+            material = self.backend.get(version, id)
+            if material is None:
+                missing.add(id)
+            else:
+                materials[id] = material
+        self.hits = self.hits + len(materials)
+        self.misses = self.misses + len(missing)
+
+        if missing:
+            model = self.material_model
+            columns = [getattr(model, column) for column in material_columns]
+            for row in session.query(*columns).filter(model.idmaterials.in_(missing)):
+                material = dict(zip(material_columns, row))
+                self.backend.set(version, material['idmaterials'], material)
+                materials[material['idmaterials']] = material
+        return materials
+
+    def getMaterial(self, session, idmaterials):
+        """Gibt ein Material als dict zurück oder None, wenn es nicht existiert."""
+        try:
+            idmaterials = int(idmaterials)
+        except (TypeError, ValueError):
+            return None
+        return self.getMaterials(session, [idmaterials]).get(idmaterials)
+
+    def bumpVersion(self, session):
+        """Erhöht den Versionsstempel in der Transaktion der Änderung und leert den eigenen Cache."""
+        model = self.version_model
+        updated = session.query(model).filter(model.name == version_name). \
+            update({model.version: model.version + 1}, synchronize_session=False)
+        if not updated:
+            session.add(model(name=version_name, version=1))
+        session.flush()
+        self.backend.clear()
+        self.version = None
+
+    def statistics(self):
+        return {'hits': self.hits, 'misses': self.misses, 'version': self.version}
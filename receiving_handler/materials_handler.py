@@ -0,0 +1,100 @@
+import simplejson as json
+import logging
+from db import session_scope
+from query_stats import trackQueries, query_budgets
+from json_stream import dumpQuery
+from schema_receiving import Material, CacheVersion, MaterialSchema
+from material_cache import MaterialCache, material_columns
+from row_serializer import compileSerializer
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Materialstammdaten, bleiben über warme Aufrufe des Containers erhalten
+material_cache = MaterialCache(Material, CacheVersion)
+
+# Maximale Anzahl an SQL-Statements je Request. Bei leerem Materialcache je eine Abfrage für den Versionsstempel und
+# das Material.
+query_budgets.update({
+    'getMaterial': 2,
+})
+
+
+@trackQueries
+def getMaterial(event, context):  # Lambda Function
+    """Gibt ein Material mit einer bestimmten ID zurück."""
+    params = event["pathParameters"]
+    id = params["id"]
+
+    with session_scope() as session:
+        material = material_cache.getMaterial(session, id)
+        if material is None:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+                },
+                'body': json.dumps({"message": "[BadRequest] Ungültige Material-ID übergeben."})
+            }
+
+        # Serialize the queryset
+        result = compileSerializer(MaterialSchema(), columns=material_columns, mapping=True).one(material)
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps(result),
+    }
+
+
+@trackQueries
+def get_allMaterials(event, context):  # Lambda Function
+    """Gibt alle Materialien zurück."""
+    with session_scope() as session:
+        materials = session.query(Material).with_entities(Material.idmaterials, Material.name, Material.art). \
+            order_by(Material.idmaterials)
+
+        # Serialize the queryset (blockweise)
+        body = dumpQuery(materials, MaterialSchema())
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": body,
+    }
+
+
+@trackQueries
+def createMaterial(event, context):  # Lambda Function
+    """Anlage oder Änderung eines Materials."""
+    logger.info(event)
+
+    body = json.loads(event.get('body'))
+    logger.info(body)
+
+    with session_scope() as session:
+        material_new = MaterialSchema().load(body, session=session)
+        session.add(material_new)
+        # Andere Container verwerfen ihre gecachten Materialien
+        material_cache.bumpVersion(session)
+        session.commit()
+
+        # Serialize the queryset
+        result = MaterialSchema().dump(material_new)
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps(result),
+    }
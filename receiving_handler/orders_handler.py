@@ -0,0 +1,135 @@
+import simplejson as json
+import logging
+from marshmallow import ValidationError
+from sqlalchemy.orm import joinedload, selectinload
+from db import session_scope, runTransaction
+from query_stats import trackQueries, query_budgets
+from json_stream import dumpQuery
+from schema_receiving import Order, OrderPosition, OrderSchema, OrderPositionSchema, OrderPositionDataSchema
+from position_upsert import upsertOrderPositions
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Ladeplan: Genau die Beziehungen, die OrderSchema serialisiert, werden mit der Abfrage geladen. Kopf und Lieferant
+# mit einem JOIN, die Positionen samt Material mit einer zweiten Abfrage (IN über die Kopf-ID).
+order_load_plan = [joinedload(Order.supplier),
+                   selectinload(Order.orderPos).joinedload(OrderPosition.material)]
+
+# Maximale Anzahl an SQL-Statements je Request, unabhängig von der Anzahl der Positionen
+query_budgets.update({
+    'getOrder': 2,
+})
+
+
+@trackQueries
+def getOrder(event, context):  # Lambda Function
+    """Gibt eine Bestellung mit einer bestimmten ID zurück."""
+    params = event["pathParameters"]
+    id = params["id"]
+
+    with session_scope() as session:
+        order = session.query(Order).options(*order_load_plan).filter(Order.idorders == id).first()
+        if order is None:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+                },
+                'body': json.dumps({"message": "[BadRequest] Ungültige Wareneingang-ID übergeben."})
+            }
+
+        # Serialize the queryset
+        result = OrderSchema().dump(order)
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps(result),
+    }
+
+
+@trackQueries
+def createOrder(event, context):  # Lambda Function
+    """Anlage oder Änderung einer Bestellung."""
+    logger.info(event)
+
+    body = json.loads(event.get('body'))
+    logger.info(body)
+
+    with session_scope() as session:
+        order_new = OrderSchema().load(body, session=session)
+        session.add(order_new)
+        session.commit()
+        # Serialize the queryset
+        result = OrderSchema().dump(order_new)
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps(result),
+    }
+
+
+@trackQueries
+def createOrderPos(event, context):  # Lambda Function
+    """Anlage oder Änderung von Bestellpositionen. Alle Positionen werden set-basiert in Blöcken geschrieben
+    (INSERT ... ON DUPLICATE KEY UPDATE), vorhandene Positionen über idordersPos geändert."""
+    logger.info(event)
+
+    body = json.loads(event.get('body'))
+    logger.info(body)
+
+    try:
+        positions = OrderPositionDataSchema().load(body, many=True)
+    except ValidationError as e:
+        return {
+            "statusCode": 400,
+            'headers': {
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+            },
+            "body": json.dumps({"message": "Ungültige Daten: " + json.dumps(e.messages)}),
+        }
+
+    # Serialize the written positions
+    result = runTransaction(lambda session: OrderPositionSchema().dump(upsertOrderPositions(session, positions),
+                                                                       many=True))
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps(result),
+    }
+
+
+@trackQueries
+def get_allOrders(event, context):  # Lambda Function
+    """Gibt alle Bestellungen zurück."""
+    with session_scope() as session:
+        orders = session.query(Order).with_entities(Order.idorders, Order.order_date, Order.fksuppliers). \
+            order_by(Order.order_date)
+
+        # Serialize the queryset (blockweise)
+        body = dumpQuery(orders, OrderSchema())
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": body,
+    }
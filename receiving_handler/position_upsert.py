@@ -0,0 +1,116 @@
+import logging
+import os
+from sqlalchemy import tuple_
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import joinedload
+from schema_receiving import Receiving, ReceivingPosition, OrderPosition
+from valuation import addValuationLayers
+
+# Set-basierte Anlage oder Änderung von Bestell- und Wareneingangspositionen mit INSERT ... ON DUPLICATE KEY UPDATE
+# (SQLite für lokale Messungen: ON CONFLICT DO UPDATE). Statt einer Abfrage und eines Statements je Position wird je
+# Block von UPSERT_CHUNK_SIZE Positionen ein Statement ausgeführt.
+
+logger = logging.getLogger()
+
+upsert_chunk_size = int(os.environ.get('UPSERT_CHUNK_SIZE', 500))
+
+
+def upsertRows(session, model, rows, chunk_size=None):
+    """Fügt die Zeilen ein bzw. ändert vorhandene Zeilen (Primärschlüssel oder Unique Key) und gibt die Anzahl der
+    betroffenen Zeilen laut Datenbank zurück.
+
+    Geändert werden nur die übergebenen Spalten einer Zeile. Zeilen mit denselben Spalten werden gemeinsam in Blöcken
+    von chunk_size Zeilen geschrieben.
+    """
+    if chunk_size is None:
+        chunk_size = upsert_chunk_size
+
+    table = model.__table__
+    primary_key = [column.name for column in table.primary_key.columns]
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    affected = 0
+    for columns, group in groups.items():
+        update = [column for column in columns if column not in primary_key]
+        for start in range(0, len(group), chunk_size):
+            if session.bind.dialect.name == 'sqlite':
+                statement = sqlite.insert(table)
+                set_ = dict((column, getattr(statement.excluded, column)) for column in update)
+                statement = statement.on_conflict_do_update(index_elements=primary_key, set_=set_) if set_ \
+                    else statement.on_conflict_do_nothing(index_elements=primary_key)
+            else:
+                statement = mysql.insert(table)
+                # Ohne zu ändernde Spalte bleibt die vorhandene Zeile unverändert
+                set_ = dict((column, getattr(statement.inserted, column)) for column in update or primary_key[:1])
+                statement = statement.on_duplicate_key_update(set_)
+            affected = affected + max(session.execute(statement, group[start:start + chunk_size]).rowcount, 0)
+    return affected
+
+
+def upsertOrderPositions(session, positions):
+    """Legt Bestellpositionen an oder ändert sie (vorhandene idordersPos) und gibt die geschriebenen Positionen samt
+    Material zurück. Neue Positionen werden über Bestellung und Positionsnummer wiedergefunden (jüngste Zeile)."""
+    affected = upsertRows(session, OrderPosition, positions)
+    logger.info('Bestellpositionen: ' + str(len(positions)) + ' übergeben, ' + str(affected) + ' betroffene Zeilen')
+
+    ids = set(pos['idordersPos'] for pos in positions if pos.get('idordersPos') is not None)
+    pairs = set((pos['fkorders'], pos['position']) for pos in positions if pos.get('idordersPos') is None)
+    condition = OrderPosition.idordersPos.in_(ids) if ids else None
+    if pairs:
+        pair_condition = tuple_(OrderPosition.fkorders, OrderPosition.position).in_(pairs)
+        condition = pair_condition if condition is None else (condition | pair_condition)
+
+    by_id = {}
+    by_pair = {}
+    for pos in session.query(OrderPosition).options(joinedload(OrderPosition.material)).filter(condition). \
+            order_by(OrderPosition.idordersPos):
+        by_id[pos.idordersPos] = pos
+        by_pair[(pos.fkorders, pos.position)] = pos
+    return [by_id[pos['idordersPos']] if pos.get('idordersPos') is not None
+            else by_pair[(pos['fkorders'], pos['position'])] for pos in positions]
+
+
+def upsertReceivingPositions(session, positions):
+    """Legt Wareneingangspositionen an oder ändert sie und gibt die geschriebenen Positionen samt Material zurück.
+
+    Die vorhandenen Positionen werden vorab mit einer Abfrage gelesen und gesperrt: Neue Positionen werden als
+    Bewertungsschichten angehängt, für geänderte Positionen werden die Schichten des alten und neuen Materials neu
+    aufgebaut.
+    """
+    pairs = [(pos['fkreceivings'], pos['position']) for pos in positions]
+    existing = dict(((row.fkreceivings, row.position), row.fkmaterials) for row in
+                    session.query(ReceivingPosition.fkreceivings, ReceivingPosition.position,
+                                  ReceivingPosition.fkmaterials).
+                    filter(tuple_(ReceivingPosition.fkreceivings, ReceivingPosition.position).in_(set(pairs))).
+                    with_for_update())
+
+    affected = upsertRows(session, ReceivingPosition, positions)
+    logger.info('Wareneingangspositionen: ' + str(len(positions)) + ' übergeben, ' + str(affected) +
+                ' betroffene Zeilen')
+
+    result = dict(((pos.fkreceivings, pos.position), pos) for pos in
+                  session.query(ReceivingPosition).options(joinedload(ReceivingPosition.material),
+                                                           joinedload(ReceivingPosition.receiving)).
+                  filter(tuple_(ReceivingPosition.fkreceivings, ReceivingPosition.position).in_(set(pairs))))
+
+    # Bewertungsschichten in derselben Transaktion fortschreiben
+    rebuild = set()
+    new_positions = []
+    for pair in set(pairs):
+        pos = result[pair]
+        if pair in existing:
+            rebuild.update((existing[pair], pos.fkmaterials))
+        else:
+            new_positions.append(dict(fkreceivings=pos.fkreceivings, position=pos.position,
+                                      fkmaterials=pos.fkmaterials, quantity=pos.quantity, price=pos.price,
+                                      receiving_date=pos.receiving.receiving_date))
+    addValuationLayers(session, new_positions, rebuild)
+    return [result[pair] for pair in pairs]
+
+
+def missingReceivings(session, positions):
+    """Gibt die Wareneingang-IDs der Positionen zurück, zu denen es keinen Wareneingang gibt (eine Abfrage)."""
+    ids = set(pos['fkreceivings'] for pos in positions)
+    return ids - set(id for (id,) in session.query(Receiving.id).filter(Receiving.id.in_(ids)))
@@ -0,0 +1,104 @@
+import os
+import simplejson as json
+from datetime import datetime as dt
+from marshmallow import ValidationError
+from schema_receiving import Receiving, ReceivingPosition, OrderPosition, Supplier, ReceivingDataSchema
+from valuation import addValuationLayers
+
+# Maximale Anzahl an Wareneingängen und Positionen je Sammelanlage
+max_receivings = int(os.environ.get('MAX_BULK_RECEIVINGS', 100))
+max_receiving_positions = int(os.environ.get('MAX_BULK_RECEIVING_POSITIONS', 5000))
+
+
+def _error(receiving, message):
+    return {'receiving': receiving, 'message': message}
+
+
+def _missing(session, column, ids):
+    """Gibt die ids zurück, zu denen es in der Tabelle der Spalte keine Zeile gibt (eine Abfrage)."""
+    ids = set(id for id in ids if id is not None)
+    if not ids:
+        return set()
+    return ids - set(id for (id,) in session.query(column).filter(column.in_(ids)))
+
+
+def createReceivings(session, data, material_cache):
+    """Legt viele Wareneingänge mit ihren Positionen in einer Transaktion an.
+
+    Jede referenzierte Tabelle wird mit genau einer Abfrage geprüft (Materialien über den Materialcache), die Köpfe
+    und Positionen werden gesammelt eingefügt (executemany) und die Bewertungsschichten anschließend mit einer Abfrage
+    je Tabelle fortgeschrieben. Bei einem Fehler wird nichts angelegt.
+
+    Returns
+    ------
+    (angelegte Wareneingänge als dicts, None) bzw. (None, Liste von Fehlern {'receiving', 'message'})
+    """
+    schema = ReceivingDataSchema()
+    receivings = []
+    errors = []
+    for index, receiving_data in enumerate(data):
+        try:
+            receivings.append(schema.load(receiving_data))
+        except ValidationError as e:
+            errors.append(_error(index, 'Ungültige Daten: ' + json.dumps(e.messages)))
+    if errors:
+        return None, errors
+
+    positions = []
+    for index, receiving in enumerate(receivings):
+        receiving.setdefault('receivingPos', [])
+        positions.extend((index, pos) for pos in receiving['receivingPos'])
+        numbers = [pos['position'] for pos in receiving['receivingPos']]
+        if len(numbers) != len(set(numbers)):
+            errors.append(_error(index, 'Positionsnummern sind mehrfach vergeben.'))
+        if any(pos.get('fkreceivings') not in (None, receiving.get('id')) for pos in receiving['receivingPos']):
+            errors.append(_error(index, 'fkreceivings der Positionen weicht von der Wareneingang-ID ab.'))
+
+    # Existenzprüfungen: eine Abfrage je Tabelle
+    ids = [receiving['id'] for receiving in receivings if receiving.get('id') is not None]
+    if len(ids) != len(set(ids)):
+        errors.append(_error(None, 'Wareneingang-IDs sind mehrfach vergeben.'))
+    existing = set(ids) - _missing(session, Receiving.id, ids)
+    suppliers = _missing(session, Supplier.idsuppliers, [receiving.get('fksuppliers') for receiving in receivings])
+    orderPositions = _missing(session, OrderPosition.idordersPos,
+                              [pos.get('fkordersPos') for index, pos in positions])
+    fkmaterials = set(pos['fkmaterials'] for index, pos in positions)
+    materials = fkmaterials - set(material_cache.getMaterials(session, fkmaterials))
+
+    for index, receiving in enumerate(receivings):
+        if receiving.get('id') in existing:
+            errors.append(_error(index, 'Der Wareneingang ' + str(receiving['id']) + ' existiert bereits.'))
+        if receiving.get('fksuppliers') in suppliers:
+            errors.append(_error(index, 'Der Lieferant ' + str(receiving['fksuppliers']) + ' existiert nicht.'))
+    for index, pos in positions:
+        if pos['fkmaterials'] in materials:
+            errors.append(_error(index, 'Die Materialnummer ' + str(pos['fkmaterials']) + ' existiert nicht.'))
+        if pos.get('fkordersPos') in orderPositions:
+            errors.append(_error(index, 'Die Bestellposition ' + str(pos['fkordersPos']) + ' existiert nicht.'))
+    if errors:
+        return None, errors
+
+    # Köpfe einfügen; ohne ID vergibt die Datenbank den Schlüssel (return_defaults)
+    now = dt.now()
+    heads = []
+    for receiving in receivings:
+        head = dict((key, value) for key, value in receiving.items() if key != 'receivingPos')
+        head.setdefault('receiving_date', now)
+        heads.append(head)
+    session.bulk_insert_mappings(Receiving, heads, return_defaults=True)
+
+    # Positionen gesammelt einfügen (executemany)
+    rows = []
+    for head, receiving in zip(heads, receivings):
+        receiving['id'] = head['id']
+        receiving['receiving_date'] = head['receiving_date']
+        for pos in receiving['receivingPos']:
+            pos['fkreceivings'] = head['id']
+            rows.append(pos)
+    if rows:
+        session.bulk_insert_mappings(ReceivingPosition, rows)
+
+    # Bewertungsschichten der Materialien in derselben Transaktion fortschreiben
+    addValuationLayers(session, [dict(pos, receiving_date=receiving['receiving_date'])
+                                 for receiving in receivings for pos in receiving['receivingPos']])
+    return receivings, None
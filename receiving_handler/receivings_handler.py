@@ -0,0 +1,250 @@
+import simplejson as json
+import logging
+from sqlalchemy.orm import joinedload, selectinload
+from db import session_scope, runTransaction
+from query_stats import trackQueries, query_budgets
+from json_stream import dumpQuery
+from marshmallow import ValidationError
+from schema_receiving import Material, CacheVersion, Receiving, ReceivingPosition, ReceivingSchema, \
+    ReceivingPositionSchema, ReceivingDataSchema, ReceivingPositionDataSchema
+from valuation import updateValuationLayers
+from material_cache import MaterialCache
+from receiving_bulk import createReceivings, max_receivings, max_receiving_positions
+from position_upsert import upsertReceivingPositions, missingReceivings
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Ladeplan: Genau die Beziehungen, die ReceivingSchema serialisiert, werden mit der Abfrage geladen. Kopf und
+# Lieferant mit einem JOIN, die Positionen samt Material mit einer zweiten Abfrage (IN über die Kopf-ID).
+receiving_load_plan = [joinedload(Receiving.supplier),
+                       selectinload(Receiving.receivingPos).joinedload(ReceivingPosition.material)]
+
+# Maximale Anzahl an SQL-Statements je Request, unabhängig von der Anzahl der Positionen
+query_budgets.update({
+    'getReceiving': 2,
+})
+
+# Materialstammdaten für die Prüfung der Sammelanlage, bleiben über warme Aufrufe des Containers erhalten
+material_cache = MaterialCache(Material, CacheVersion)
+
+
+@trackQueries
+def getReceiving(event, context):  # Lambda Function
+    """Gibt den Wareneingang mit einer bestimmten ID zurück.
+
+    Parameters
+    ----------
+    event: dict, required
+        API Gateway Lambda Proxy Input Format
+
+        Event doc: https://docs.aws.amazon.com/apigateway/latest/developerguide/set-up-lambda-proxy-integrations.html#api-gateway-simple-proxy-for-lambda-input-format
+
+    context: object, required
+        Lambda Context runtime methods and attributes
+
+        Context doc: https://docs.aws.amazon.com/lambda/latest/dg/python-context-object.html
+
+    Returns
+    ------
+    API Gateway Lambda Proxy Output Format: dict
+
+        Return doc: https://docs.aws.amazon.com/apigateway/latest/developerguide/set-up-lambda-proxy-integrations.html
+    """
+
+    params = event["pathParameters"]
+    id = params["id"]
+
+    with session_scope() as session:
+        receiving = session.query(Receiving).options(*receiving_load_plan).filter(Receiving.id == id).first()
+        if receiving is None:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+                },
+                'body': json.dumps({"message": "[BadRequest] Ungültige Wareneingang-ID übergeben."})
+            }
+
+        # Serialize the queryset
+        result = ReceivingSchema().dump(receiving)
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps(result),
+    }
+
+
+@trackQueries
+def createReceiving(event, context):  # Lambda Function
+    """Anlage oder Änderung eines Wareneingangs. Eine Liste von Wareneingängen wird als Sammelanlage in einer
+    Transaktion angelegt."""
+    logger.info(event)
+
+    body = json.loads(event.get('body'))
+    logger.info(body)
+
+    if isinstance(body, list):
+        return createReceivingList(body)
+
+    with session_scope() as session:
+        receiving_new = ReceivingSchema().load(body, session=session)
+        session.add(receiving_new)
+        # Bewertungsschichten der Materialien in derselben Transaktion fortschreiben
+        updateValuationLayers(session, receivings=[receiving_new])
+        session.commit()
+        # Serialize the queryset
+        result = ReceivingSchema().dump(receiving_new)
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps(result),
+    }
+
+
+def createReceivingList(data):
+    """Sammelanlage von Wareneingängen mit Positionen (alles oder nichts)."""
+    positions = sum(len(receiving.get('receivingPos') or []) for receiving in data if isinstance(receiving, dict))
+    if len(data) <= 0 or len(data) > max_receivings or positions > max_receiving_positions:
+        return {
+            "statusCode": 400,
+            'headers': {
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+            },
+            "body": json.dumps({"message": "Eine Sammelanlage muss 1 bis " + str(max_receivings) +
+                                           " Wareneingänge mit höchstens " + str(max_receiving_positions) +
+                                           " Positionen enthalten."}),
+        }
+
+    # Eine Transaktion für alle Wareneingänge, bei Deadlocks wird die Sammelanlage wiederholt.
+    receivings, errors = runTransaction(lambda session: createReceivings(session, data, material_cache))
+    if errors is not None:
+        return {
+            "statusCode": 400,
+            'headers': {
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+            },
+            "body": json.dumps(errors),
+        }
+
+    # Serialize the receivings
+    result = ReceivingDataSchema(many=True).dump(receivings)
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps(result),
+    }
+
+
+@trackQueries
+def createReceivingPos(event, context):  # Lambda Function
+    """Anlage oder Änderung einer Wareneingangsposition. Eine Liste von Positionen wird set-basiert in Blöcken
+    geschrieben (INSERT ... ON DUPLICATE KEY UPDATE)."""
+    logger.info(event)
+
+    body = json.loads(event.get('body'))
+    logger.info(body)
+
+    if isinstance(body, list):
+        return createReceivingPosList(body)
+
+    with session_scope() as session:
+        receivingPos_new = ReceivingPositionSchema().load(body, session=session)
+        session.add(receivingPos_new)
+        # Bewertungsschichten des Materials in derselben Transaktion fortschreiben
+        updateValuationLayers(session, positions=[receivingPos_new])
+        session.commit()
+        # Serialize the queryset
+        result = ReceivingPositionSchema().dump(receivingPos_new)
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps(result),
+    }
+
+
+def createReceivingPosList(data):
+    """Anlage oder Änderung vieler Wareneingangspositionen in einer Transaktion (alles oder nichts)."""
+    try:
+        positions = ReceivingPositionDataSchema().load(data, many=True)
+        missing = dict((index, {'fkreceivings': ['Missing data for required field.']})
+                       for index, pos in enumerate(positions) if pos.get('fkreceivings') is None)
+        if missing:
+            raise ValidationError(missing)
+    except ValidationError as e:
+        message = "Ungültige Daten: " + json.dumps(e.messages)
+    else:
+        pairs = [(pos['fkreceivings'], pos['position']) for pos in positions]
+        message = "Positionen sind mehrfach enthalten." if len(pairs) != len(set(pairs)) else None
+
+    if message is None:
+        def work(session):
+            missing = missingReceivings(session, positions)
+            if missing:
+                return None, "Die Wareneingänge " + str(sorted(missing)) + " existieren nicht."
+            return ReceivingPositionSchema().dump(upsertReceivingPositions(session, positions), many=True), None
+
+        result, message = runTransaction(work)
+
+    if message is not None:
+        return {
+            "statusCode": 400,
+            'headers': {
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+            },
+            "body": json.dumps({"message": message}),
+        }
+
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps(result),
+    }
+
+
+@trackQueries
+def get_allReceiving(event, context):  # Lambda Function
+    """Gibt alle Wareneingänge zurück."""
+    with session_scope() as session:
+        receivings = session.query(Receiving).with_entities(Receiving.id, Receiving.receiving_date). \
+            order_by(Receiving.receiving_date)
+
+        # Serialize the queryset (blockweise)
+        body = dumpQuery(receivings, ReceivingSchema())
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": body,
+    }
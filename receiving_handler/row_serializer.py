@@ -0,0 +1,115 @@
+# Vorkompilierte Serialisierer für die lesenden Listen-Endpunkte. Erzeugen dieselben Dicts wie Schema().dump(), aber
+# ohne die Feld-Introspektion von marshmallow je Zeile.
+# Identische Kopie in stock_handler/row_serializer.py und receiving_handler/row_serializer.py, bitte synchron halten.
+from marshmallow import fields
+from profiling import invocation_timer
+
+# Bereits erzeugte Serialisierer je (Schema, only, exclude, Zeilenart, Spalten)
+_serializers = {}
+
+
+class RowSerializer(object):
+    """Serialisierer für ein Schema und eine Zeilenart: one(Zeile) -> dict, many(Zeilen) -> Liste von dicts.
+
+    one und many werden wie Schema.dump (profiling.timeDump) als Phase serialization erfasst.
+    """
+
+    def __init__(self, one, many):
+        # Ohne Zeitmessung, für verschachtelte Serialisierer
+        self.one_untimed = one
+        self.many_untimed = many
+
+    def one(self, row):
+        with invocation_timer.measure('serialization'):
+            return self.one_untimed(row)
+
+    def many(self, rows):
+        with invocation_timer.measure('serialization'):
+            return self.many_untimed(rows)
+
+    def __call__(self, rows):
+        return self.many(rows)
+
+
+def _hasDumpHooks(schema):
+    return any('dump' in str(tag) for tag, hooks in getattr(schema, '_hooks', {}).items() if hooks)
+
+
+def _valueExpression(field, value, namespace):
+    """Gibt den Python-Ausdruck zurück, der den Wert eines Feldes wie field._serialize umwandelt."""
+    if isinstance(field, fields.Nested):
+        serializer = compileSerializer(field.schema)
+        name = 'n' + str(len(namespace))
+        namespace[name] = serializer.many_untimed if field.many else serializer.one_untimed
+        return '(None if %s is None else %s(%s))' % (value, name, value)
+    if isinstance(field, fields.Integer) and not field.as_string:
+        return '(None if %s is None else int(%s))' % (value, value)
+    if isinstance(field, fields.Float) and not field.as_string:
+        return '(None if %s is None else float(%s))' % (value, value)
+    if isinstance(field, fields.String):
+        return '(None if %s is None else str(%s))' % (value, value)
+    if isinstance(field, fields.DateTime) and type(field) in (fields.DateTime, fields.NaiveDateTime):
+        data_format = field.format or field.DEFAULT_FORMAT
+        if data_format not in field.SERIALIZATION_FUNCS:
+            name = 'f' + str(len(namespace))
+            namespace[name] = data_format
+            return '(None if %s is None else %s.strftime(%s))' % (value, value, name)
+
+    # Alle übrigen Feldtypen über marshmallow selbst
+    name = 'f' + str(len(namespace))
+    namespace[name] = field
+    return '%s._serialize(%s, %r, row)' % (name, value, field.attribute or field.name)
+
+
+def _compile(schema, columns, mapping):
+    namespace = {}
+    items = []
+    for name, field in schema.dump_fields.items():
+        attribute = field.attribute or name
+        if columns is None:
+            value = 'row.' + attribute
+        elif attribute not in columns:
+            # Wie marshmallow: Felder, die in der Zeile fehlen, werden nicht ausgegeben
+            continue
+        elif mapping:
+            value = 'row[%r]' % attribute
+        else:
+            value = 'row[%d]' % columns.index(attribute)
+        items.append('%r: %s' % (field.data_key or name, _valueExpression(field, value, namespace)))
+
+    row_dict = '{' + ', '.join(items) + '}'
+    source = 'def one(row):\n    return %s\n\n\ndef many(rows):\n    return [%s for row in rows]\n' % \
+             (row_dict, row_dict)
+    exec(compile(source, '<' + type(schema).__name__ + ' serializer>', 'exec'), namespace)
+    return RowSerializer(namespace['one'], namespace['many'])
+
+
+def compileSerializer(schema, columns=None, mapping=False):
+    """Erzeugt den Serialisierer eines Schemas einmalig und gibt ihn danach aus dem Cache zurück.
+
+    columns: None für ORM-Objekte, sonst die Namen der Spalten der Zeilen (Tupel aus with_entities bzw. dicts)
+    mapping: True, wenn die Zeilen dicts sind
+
+    Schemas mit pre_dump/post_dump-Hooks werden weiterhin mit marshmallow serialisiert.
+    """
+    if columns is not None:
+        columns = tuple(columns)
+    key = (type(schema), tuple(sorted(schema.only)) if schema.only is not None else None,
+           tuple(sorted(schema.exclude)), columns, mapping)
+
+    serializer = _serializers.get(key)
+    if serializer is None:
+        if _hasDumpHooks(schema):
+            serializer = RowSerializer(schema.dump, lambda rows: schema.dump(rows, many=True))
+        else:
+            serializer = _compile(schema, columns, mapping)
+        _serializers[key] = serializer
+    return serializer
+
+
+def querySerializer(schema, query):
+    """Wählt den Serialisierer passend zu den Zeilen einer Abfrage: ORM-Objekte oder Tupel aus with_entities."""
+    descriptions = query.column_descriptions
+    if len(descriptions) == 1 and descriptions[0]['expr'] is descriptions[0]['entity'] is not None:
+        return compileSerializer(schema)
+    return compileSerializer(schema, columns=[description['name'] for description in descriptions])
@@ -1,10 +1,11 @@
 from sqlalchemy.dialects.mysql import TINYINT, DOUBLE
 from marshmallow_sqlalchemy.fields import Nested
-from marshmallow_sqlalchemy import SQLAlchemyAutoSchema
-from sqlalchemy import Column, Integer, DateTime, String, ForeignKey
+from marshmallow_sqlalchemy import SQLAlchemyAutoSchema, auto_field
+from sqlalchemy import Column, Integer, DateTime, String, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime as dt
 from sqlalchemy.ext.declarative import declarative_base
+from profiling import timeDump
 
 Base = declarative_base()
 dtf = "%Y/%m/%d %H:%M:%S"
@@ -46,6 +47,10 @@ class ReceivingPosition(Base):
     price = Column(DOUBLE)
     fkordersPos = Column(Integer, ForeignKey('ordersPos.idordersPos'))
 
+    # Wareneingänge je Material für die Bewertung (LIFO), gleicher Index in schema_stock.py
+    __table_args__ = (Index('ix_receivingsPos_material', 'fkmaterials', 'fkreceivings', 'position', 'quantity',
+                            'price'),)
+
     material = relationship("Material", back_populates="receivingPos")
     receiving = relationship("Receiving", back_populates="receivingPos")
 
@@ -120,81 +125,205 @@ class Supplier(Base):
     orders = relationship("Order", back_populates="supplier")
 
 
+class MaterialValuation(Base):
+    __tablename__ = 'materialValuations'
+    fkmaterials = Column(Integer, ForeignKey('materials.idmaterials'), primary_key=True)
+    layers = Column(Text, nullable=False)
+    updated = Column(DateTime, nullable=False, default=dt.now, onupdate=dt.now)
+
+
+class CacheVersion(Base):
+    __tablename__ = 'cacheVersions'
+    name = Column(String(45), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
 #SCHEMA
-class MaterialSchema(SQLAlchemyAutoSchema):
-    class Meta:
-        model = Material
-        include_fk = True
-        load_instance = True
+class LazySchema(object):
+    """Platzhalter für eine Schema-Klasse. SQLAlchemyAutoSchema liest das Modell bei der Definition der Klasse, daher
+    wird jede Klasse erst beim ersten Aufruf gebaut und nur von den Lambda Functions, die sie verwenden."""
+
+    def __init__(self, build):
+        self.build = build
+        self.schema_class = None
+
+    def __call__(self, *args, **kwargs):
+        if self.schema_class is None:
+            self.schema_class = timeDump(self.build())
+        return self.schema_class(*args, **kwargs)
+
+
+def _materialSchema():
+    class MaterialSchema(SQLAlchemyAutoSchema):
+        class Meta:
+            model = Material
+            include_fk = True
+            load_instance = True
+
+    return MaterialSchema
+
+
+MaterialSchema = LazySchema(_materialSchema)
+
+
+def _receivingPositionSchema():
+    class ReceivingPositionSchema(SQLAlchemyAutoSchema):
+        class Meta:
+            model = ReceivingPosition
+            include_fk = True
+            load_instance = True
+
+        material = Nested(lambda: MaterialSchema(), dump_only=True)
+
+    return ReceivingPositionSchema
+
+
+ReceivingPositionSchema = LazySchema(_receivingPositionSchema)
+
+
+def _receivingSchema():
+    class ReceivingSchema(SQLAlchemyAutoSchema):
+        class Meta:
+            model = Receiving
+            include_fk = True
+            load_instance = True
+            datetimeformat = dtf
+
+        receivingPos = Nested(ReceivingPositionSchema(), many=True)
+        supplier = Nested(lambda: SupplierSchema(), dump_only=True,
+                          exclude=('address', 'postcode', 'contact', 'email', 'phone', 'fax', ))
+
+    return ReceivingSchema
+
+
+ReceivingSchema = LazySchema(_receivingSchema)
+
+
+def _receivingPositionDataSchema():
+    class ReceivingPositionDataSchema(SQLAlchemyAutoSchema):
+        class Meta:
+            model = ReceivingPosition
+            include_fk = True
+
+        # Wird aus dem Wareneingangskopf übernommen
+        fkreceivings = auto_field(required=False)
+
+    return ReceivingPositionDataSchema
+
+
+ReceivingPositionDataSchema = LazySchema(_receivingPositionDataSchema)
+
+
+def _receivingDataSchema():
+    # Sammelanlage: Validierung ohne load_instance, das Ergebnis sind dicts statt ORM-Objekte
+    class ReceivingDataSchema(SQLAlchemyAutoSchema):
+        class Meta:
+            model = Receiving
+            include_fk = True
+            datetimeformat = dtf
+
+        receivingPos = Nested(ReceivingPositionDataSchema(many=True), many=True)
+
+    return ReceivingDataSchema
+
+
+ReceivingDataSchema = LazySchema(_receivingDataSchema)
+
+
+def _orderPositionSchema():
+    class OrderPositionSchema(SQLAlchemyAutoSchema):
+        class Meta:
+            model = OrderPosition
+            load_instance = True
+
+        material = Nested(lambda: MaterialSchema(), dump_only=True)
+
+    return OrderPositionSchema
+
+
+OrderPositionSchema = LazySchema(_orderPositionSchema)
+
+
+def _orderPositionDataSchema():
+    # Set-basierter Upsert: Validierung ohne load_instance
+    class OrderPositionDataSchema(SQLAlchemyAutoSchema):
+        class Meta:
+            model = OrderPosition
+            include_fk = True
+
+    return OrderPositionDataSchema
+
+
+OrderPositionDataSchema = LazySchema(_orderPositionDataSchema)
+
+
+def _orderSchema():
+    class OrderSchema(SQLAlchemyAutoSchema):
+        class Meta:
+            model = Order
+            include_fk = True
+            load_instance = True
+            datetimeformat = dtf
+
+        orderPos = Nested(OrderPositionSchema(), many=True)
+        supplier = Nested(lambda: SupplierSchema(), dump_only=True,
+                          exclude=('address', 'postcode', 'contact', 'email', 'phone', 'fax',))
+
+    return OrderSchema
+
 
+OrderSchema = LazySchema(_orderSchema)
 
-class ReceivingPositionSchema(SQLAlchemyAutoSchema):
-    class Meta:
-        model = ReceivingPosition
-        include_fk = True
-        load_instance = True
 
-    material = Nested(lambda: MaterialSchema(), dump_only=True)
+def _chargeShirtSchema():
+    class ChargeShirtSchema(SQLAlchemyAutoSchema):
+        class Meta:
+            model = ChargeShirt
+            load_instance = True
 
+    return ChargeShirtSchema
 
-class ReceivingSchema(SQLAlchemyAutoSchema):
-    class Meta:
-        model = Receiving
-        include_fk = True
-        load_instance = True
-        datetimeformat = dtf
 
-    receivingPos = Nested(ReceivingPositionSchema(), many=True)
-    supplier = Nested(lambda: SupplierSchema(), dump_only=True,
-                      exclude=('address', 'postcode', 'contact', 'email', 'phone', 'fax', ))
+ChargeShirtSchema = LazySchema(_chargeShirtSchema)
 
 
-class OrderPositionSchema(SQLAlchemyAutoSchema):
-    class Meta:
-        model = OrderPosition
-        load_instance = True
+def _chargeColorSchema():
+    class ChargeColorSchema(SQLAlchemyAutoSchema):
+        class Meta:
+            model = ChargeColor
+            load_instance = True
 
-    material = Nested(lambda: MaterialSchema(), dump_only=True)
+    return ChargeColorSchema
 
 
-class OrderSchema(SQLAlchemyAutoSchema):
-    class Meta:
-        model = Order
-        include_fk = True
-        load_instance = True
-        datetimeformat = dtf
+ChargeColorSchema = LazySchema(_chargeColorSchema)
 
-    orderPos = Nested(OrderPositionSchema(), many=True)
-    supplier = Nested(lambda: SupplierSchema(), dump_only=True,
-                      exclude=('address', 'postcode', 'contact', 'email', 'phone', 'fax',))
 
+def _chargeSchema():
+    class ChargeSchema(SQLAlchemyAutoSchema):
+        class Meta:
+            model = Charge
+            include_fk = True
+            load_instance = True
 
-class ChargeShirtSchema(SQLAlchemyAutoSchema):
-    class Meta:
-        model = ChargeShirt
-        load_instance = True
+        material = Nested(lambda: MaterialSchema(), dump_only=True)
+        chargeShirt = Nested(ChargeShirtSchema())
+        chargeColor = Nested(ChargeColorSchema())
 
+    return ChargeSchema
 
-class ChargeColorSchema(SQLAlchemyAutoSchema):
-    class Meta:
-        model = ChargeColor
-        load_instance = True
 
+ChargeSchema = LazySchema(_chargeSchema)
 
-class ChargeSchema(SQLAlchemyAutoSchema):
-    class Meta:
-        model = Charge
-        include_fk = True
-        load_instance = True
 
-    material = Nested(lambda: MaterialSchema(), dump_only=True)
-    chargeShirt = Nested(ChargeShirtSchema())
-    chargeColor = Nested(ChargeColorSchema())
+def _supplierSchema():
+    class SupplierSchema(SQLAlchemyAutoSchema):
+        class Meta:
+            model = Supplier
+            include_fk = True
+            load_instance = True
 
+    return SupplierSchema
 
-class SupplierSchema(SQLAlchemyAutoSchema):
-    class Meta:
-        model = Supplier
-        include_fk = True
-        load_instance = True
 
+SupplierSchema = LazySchema(_supplierSchema)
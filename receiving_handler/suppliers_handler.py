@@ -0,0 +1,87 @@
+import simplejson as json
+import logging
+from db import session_scope
+from query_stats import trackQueries
+from json_stream import dumpQuery
+from schema_receiving import Supplier, SupplierSchema
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+@trackQueries
+def getSupplier(event, context):  # Lambda Function
+    """Gibt einen Lieferanten mit einer bestimmten ID zurück."""
+    params = event["pathParameters"]
+    id = params["id"]
+
+    with session_scope() as session:
+        supplier = session.query(Supplier).filter(Supplier.idsuppliers == id).first()
+        if supplier is None:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+                },
+                'body': json.dumps({"message": "[BadRequest] Ungültige Lieferanten-ID übergeben."})
+            }
+
+        # Serialize the queryset
+        result = SupplierSchema().dump(supplier)
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps(result),
+    }
+
+
+@trackQueries
+def get_allSuppliers(event, context):  # Lambda Function
+    """Gibt alle Lieferanten zurück."""
+    with session_scope() as session:
+        suppliers = session.query(Supplier).with_entities(Supplier.idsuppliers, Supplier.name, Supplier.ort). \
+            order_by(Supplier.idsuppliers)
+
+        # Serialize the queryset (blockweise)
+        body = dumpQuery(suppliers, SupplierSchema())
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": body,
+    }
+
+
+@trackQueries
+def createSupplier(event, context):  # Lambda Function
+    """Anlage oder Änderung eines lieferanten."""
+    logger.info(event)
+
+    body = json.loads(event.get('body'))
+    logger.info(body)
+
+    with session_scope() as session:
+        supplier_new = SupplierSchema().load(body, session=session)
+        session.add(supplier_new)
+        session.commit()
+
+        # Serialize the queryset
+        result = SupplierSchema().dump(supplier_new)
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps(result),
+    }
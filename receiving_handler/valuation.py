@@ -0,0 +1,159 @@
+import simplejson as json
+from sqlalchemy import inspect
+from schema_receiving import Receiving, ReceivingPosition, MaterialValuation, dtf
+
+# Aufbau der Bewertungsschichten (materialValuations.layers), gelesen von stock_handler/valuation.py:
+# {"layers": [[fkreceivings, position, receiving_date, quantity, price], ...],  (älteste Schicht zuerst)
+#  "cumQuantity": [...], "cumValue": [...], "noPrice": Index der jüngsten Schicht ohne Preis oder -1}
+
+
+def _layerKey(layer):
+    """Sortierschlüssel einer Schicht: Wareneingangsdatum, danach Wareneingang und Position."""
+    return (layer[2] or '', layer[0], layer[1])
+
+
+def buildLayers(layers):
+    """Berechnet die kumulierten Mengen und Werte zu den nach Datum aufsteigend sortierten Schichten."""
+    valuation = {'layers': [], 'cumQuantity': [], 'cumValue': [], 'noPrice': -1}
+    for layer in layers:
+        appendLayer(valuation, layer)
+    return valuation
+
+
+def appendLayer(valuation, layer):
+    """Hängt eine neue jüngste Schicht an und führt die kumulierten Mengen und Werte fort."""
+    quantity = 0
+    value = 0.0
+    if valuation['layers']:
+        quantity = valuation['cumQuantity'][-1]
+        value = valuation['cumValue'][-1]
+
+    if layer[4] is None:
+        # Schichten ohne Preis werden nie verrechnet, sondern brechen die Bewertung ab.
+        valuation['noPrice'] = len(valuation['layers'])
+    elif layer[3] > 0:
+        quantity = quantity + layer[3]
+        value = value + (layer[3] * float(layer[4]))
+
+    valuation['layers'].append(layer)
+    valuation['cumQuantity'].append(quantity)
+    valuation['cumValue'].append(value)
+
+
+def loadLayers(session, fkmaterials):
+    """Liest alle Wareneingänge eines Materials als Schichten aus, älteste zuerst."""
+    receiving_query = session.query(ReceivingPosition.fkreceivings, ReceivingPosition.position,
+                                    ReceivingPosition.quantity, ReceivingPosition.price,
+                                    Receiving.receiving_date). \
+        filter(ReceivingPosition.fkmaterials == fkmaterials). \
+        filter(ReceivingPosition.fkreceivings == Receiving.id)
+
+    layers = [[pos.fkreceivings, pos.position,
+               pos.receiving_date.strftime(dtf) if pos.receiving_date is not None else None,
+               pos.quantity, pos.price] for pos in receiving_query]
+    return sorted(layers, key=_layerKey)
+
+
+def rebuildValuationLayers(session, fkmaterials):
+    """Baut die Bewertungsschichten eines Materials vollständig aus den Wareneingängen neu auf."""
+    layers = json.dumps(buildLayers(loadLayers(session, fkmaterials)))
+
+    valuation = session.query(MaterialValuation).filter(MaterialValuation.fkmaterials == fkmaterials). \
+        with_for_update().first()
+    if valuation is None:
+        valuation = MaterialValuation(fkmaterials=fkmaterials, layers=layers)
+        session.add(valuation)
+    else:
+        valuation.layers = layers
+    return valuation
+
+
+def updateValuationLayers(session, receivings=(), positions=()):
+    """Pflegt die Bewertungsschichten für neu angelegte oder geänderte Wareneingänge und -positionen.
+
+    Muss vor dem Flush der Änderungen aufgerufen werden. Neue Positionen, die jünger als die bisherigen Schichten sind,
+    werden angehängt. Alle anderen Änderungen führen zum Neuaufbau der Schichten des betroffenen Materials.
+    """
+    positions = list(positions)
+    rebuild = set()
+    for receiving in receivings:
+        positions.extend(receiving.receivingPos)
+        # Ein geändertes Datum verschiebt die Reihenfolge aller Schichten des Wareneingangs.
+        if inspect(receiving).persistent and inspect(receiving).attrs.receiving_date.history.has_changes():
+            rebuild.update(pos.fkmaterials for pos in receiving.receivingPos)
+
+    new_positions = []
+    for pos in positions:
+        state = inspect(pos)
+        if state.persistent:
+            rebuild.add(pos.fkmaterials)
+            rebuild.update(fk for fk in state.attrs.fkmaterials.history.deleted if fk is not None)
+        else:
+            new_positions.append(pos)
+
+    session.flush()
+
+    appends = {}
+    for pos in new_positions:
+        if pos.fkmaterials not in rebuild:
+            receiving_date = pos.receiving.receiving_date if pos.receiving is not None else None
+            appends.setdefault(pos.fkmaterials, []).append(
+                [pos.fkreceivings, pos.position, receiving_date.strftime(dtf) if receiving_date is not None else None,
+                 pos.quantity, pos.price])
+
+    _appendLayers(session, appends, rebuild)
+
+
+def addValuationLayers(session, positions, rebuild=()):
+    """Pflegt die Bewertungsschichten für bereits eingefügte, neue Wareneingangspositionen (Sammelanlage ohne
+    ORM-Objekte). Die Schichten der Materialien in rebuild werden vollständig neu aufgebaut.
+
+    positions: dicts mit fkreceivings, position, fkmaterials, quantity, price und receiving_date (datetime oder None)
+    """
+    appends = {}
+    for pos in positions:
+        receiving_date = pos['receiving_date']
+        appends.setdefault(pos['fkmaterials'], []).append(
+            [pos['fkreceivings'], pos['position'], receiving_date.strftime(dtf) if receiving_date is not None else None,
+             pos['quantity'], pos.get('price')])
+
+    _appendLayers(session, appends, set(rebuild))
+
+
+def _appendLayers(session, appends, rebuild):
+    """Hängt neue Schichten (fkmaterials -> Liste von Schichten) an und baut die Schichten der Materialien in rebuild
+    sowie aller Materialien ohne passende Bewertung neu auf. Die Bewertungen werden mit einer Abfrage gelesen."""
+    appends = dict((fkmaterials, layers) for fkmaterials, layers in appends.items() if fkmaterials not in rebuild)
+    valuations = {}
+    if appends:
+        valuations = dict((valuation.fkmaterials, valuation) for valuation in session.query(MaterialValuation).
+                          filter(MaterialValuation.fkmaterials.in_(list(appends))).with_for_update())
+
+    for fkmaterials, layers in appends.items():
+        valuation = valuations.get(fkmaterials)
+        if valuation is None:
+            rebuild.add(fkmaterials)
+            continue
+
+        current = json.loads(valuation.layers)
+        layers = sorted(layers, key=_layerKey)
+        if current['layers'] and _layerKey(layers[0]) < _layerKey(current['layers'][-1]):
+            # Nachträglich erfasster, älterer Wareneingang: Schichten müssen neu sortiert werden.
+            rebuild.add(fkmaterials)
+            continue
+
+        for layer in layers:
+            appendLayer(current, layer)
+        valuation.layers = json.dumps(current)
+
+    for fkmaterials in rebuild:
+        rebuildValuationLayers(session, fkmaterials)
+
+
+if __name__ == '__main__':
+    # Neuaufbau der Bewertungsschichten aller Materialien: python valuation.py
+    from db import session_scope
+
+    with session_scope() as session:
+        for (fkmaterials,) in session.query(ReceivingPosition.fkmaterials).distinct().all():
+            rebuildValuationLayers(session, fkmaterials)
@@ -0,0 +1,114 @@
+import sys
+from sqlalchemy import func
+from sqlalchemy.dialects import mysql, sqlite
+from schema_stock import StockEntry, StockBalance
+
+# Bestand je (Material, Lagerplatz, ProductionOrderNr, geöffnet). Wird von bookToStock in derselben Transaktion wie
+# die Buchung in stockEntries fortgeschrieben, sodass Bestandsprüfungen nicht mehr über das gesamte Journal summieren.
+# Abgleich mit dem Journal: python balances.py verify | rebuild
+
+
+def bookBalances(session, bookings):
+    """Schreibt Lagerbuchungen atomar in die Bestände fort (INSERT ... ON DUPLICATE KEY UPDATE).
+
+    bookings: Liste von dicts mit fkmaterials, fkplaces, productionOrderNr, opened, quantity und booking_date
+    """
+    if len(bookings) <= 0:
+        return
+
+    values = [dict(fkmaterials=booking['fkmaterials'], fkplaces=booking['fkplaces'],
+                   productionOrderNr=booking['productionOrderNr'] or '', opened=int(booking['opened']),
+                   quantity=booking['quantity'], first_booking_date=booking['booking_date']) for booking in bookings]
+
+    table = StockBalance.__table__
+    if session.bind.dialect.name == 'sqlite':
+        statement = sqlite.insert(table)
+        statement = statement.on_conflict_do_update(index_elements=table.primary_key.columns,
+                                                    set_=dict(quantity=table.c.quantity + statement.excluded.quantity))
+    else:
+        statement = mysql.insert(table)
+        statement = statement.on_duplicate_key_update(quantity=table.c.quantity + statement.inserted.quantity)
+    session.execute(statement, values)
+
+
+def bookBalance(session, fkmaterials, fkplaces, productionOrderNr, opened, quantity, booking_date):
+    """Schreibt eine Lagerbuchung atomar in den Bestand fort."""
+    bookBalances(session, [dict(fkmaterials=fkmaterials, fkplaces=fkplaces, productionOrderNr=productionOrderNr,
+                                opened=opened, quantity=quantity, booking_date=booking_date)])
+
+
+def getBalance(session, fkmaterials, fkplaces, productionOrderNr, opened, lock=False):
+    """Gibt den Bestand eines Lagerplatzes zurück (Primärschlüssel-Zugriff). Mit lock=True bleibt die Zeile bis zum
+    Ende der Transaktion für andere Buchungen gesperrt."""
+    query = session.query(StockBalance.quantity). \
+        filter((StockBalance.fkmaterials == fkmaterials) & (StockBalance.fkplaces == fkplaces) &
+               (StockBalance.productionOrderNr == (productionOrderNr or '')) & (StockBalance.opened == int(opened)))
+    if lock:
+        query = query.with_for_update()
+    balance = query.first()
+    return balance.quantity if balance is not None else 0
+
+
+def getProductionOrderBalance(session, fkmaterials, fkplaces, productionOrderNr):
+    """Gibt den Bestand eines Produktionsauftrags auf einem Lagerplatz zurück (geöffnet und ungeöffnet)."""
+    return session.query(func.ifnull(func.sum(StockBalance.quantity), 0)). \
+        filter((StockBalance.fkmaterials == fkmaterials) & (StockBalance.fkplaces == fkplaces) &
+               (StockBalance.productionOrderNr == (productionOrderNr or ''))).scalar()
+
+
+def ledgerBalances(session, lock=False):
+    """Summiert das Journal stockEntries je Bestandsschlüssel. Snapshot-Zeilen der Verdichtung (compaction.py)
+    enthalten die archivierten Buchungen."""
+    productionOrderNr = func.ifnull(StockEntry.productionOrderNr, '')
+    query = session.query(StockEntry.fkmaterials, StockEntry.fkplaces, productionOrderNr, StockEntry.opened,
+                          func.sum(StockEntry.quantity), func.min(StockEntry.booking_date)). \
+        group_by(StockEntry.fkmaterials, StockEntry.fkplaces, productionOrderNr, StockEntry.opened)
+    if lock:
+        # Neue Buchungen warten bis zum Ende des Abgleichs.
+        query = query.with_for_update(read=True)
+    return dict(((row[0], row[1], row[2], row[3]), (row[4], row[5])) for row in query)
+
+
+def verifyBalances(session):
+    """Vergleicht die Bestände mit dem Journal und gibt die Abweichungen als (Schlüssel, Journal, Bestand) zurück."""
+    ledger = ledgerBalances(session)
+    balances = dict(((balance.fkmaterials, balance.fkplaces, balance.productionOrderNr, balance.opened),
+                     balance.quantity) for balance in session.query(StockBalance))
+
+    differences = []
+    for key in sorted(set(ledger) | set(balances), key=str):
+        ledger_quantity = ledger[key][0] if key in ledger else 0
+        if ledger_quantity != balances.get(key, 0):
+            differences.append((key, ledger_quantity, balances.get(key, 0)))
+    return differences
+
+
+def rebuildBalances(session):
+    """Baut die Bestände vollständig aus dem Journal neu auf und gibt die Anzahl der Bestandszeilen zurück."""
+    ledger = ledgerBalances(session, lock=True)
+    session.query(StockBalance).delete(synchronize_session=False)
+    session.bulk_insert_mappings(StockBalance, [
+        dict(fkmaterials=key[0], fkplaces=key[1], productionOrderNr=key[2], opened=key[3], quantity=quantity,
+             first_booking_date=first_booking_date)
+        for key, (quantity, first_booking_date) in ledger.items()])
+    return len(ledger)
+
+
+if __name__ == '__main__':
+    from db import session_scope
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'verify'
+    with session_scope() as session:
+        if command == 'rebuild':
+            print(str(rebuildBalances(session)) + ' Bestände aus stockEntries neu aufgebaut.')
+        elif command == 'verify':
+            differences = verifyBalances(session)
+            for key, ledger_quantity, balance_quantity in differences:
+                print('Abweichung ' + str(key) + ': Journal ' + str(ledger_quantity) + ', Bestand ' +
+                      str(balance_quantity))
+            print(str(len(differences)) + ' Abweichungen.')
+            if differences:
+                sys.exit(1)
+        else:
+            print('Aufruf: python balances.py verify | rebuild')
+            sys.exit(2)
@@ -0,0 +1,212 @@
+import logging
+import simplejson as json
+from db import session_scope, runTransaction
+from query_stats import trackQueries
+from schema_stock import Material, CacheVersion, StockEntry, GoodsOrder, GoodsOrderPosition, StockEntrySchema, \
+    BookMaterialSchema, BookProductFromStockSchema
+from request_body import parseBody, loadBody, decodeBody
+from balances import bookBalance, getBalance, getProductionOrderBalance
+from material_booking import bookMaterials, max_bookings
+from material_cache import MaterialCache
+from outbox import addEvent
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Materialstammdaten, bleiben über warme Aufrufe des Containers erhalten
+material_cache = MaterialCache(Material, CacheVersion)
+
+
+@trackQueries
+def bookMaterial(event, context):  # Lambda Function
+    """Zu- und Abbuchung von Material. Eine Liste von Buchungen wird als Sammelbuchung in einer Transaktion gebucht."""
+    logger.info(event)
+
+    body, error = parseBody(event)
+    if error is not None:
+        return error
+
+    if isinstance(body, list):
+        return bookMaterialList(body)
+
+    bookMaterial, error = loadBody(body, BookMaterialSchema())
+    if error is not None:
+        return error
+    logger.info(bookMaterial)
+
+    if bookMaterial['fkmaterials'] < 50000000:
+        return {
+            "statusCode": 400,
+            'headers': {
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+            },
+            "body": json.dumps({"message": "Die Buchung von Fertigware mit diesem Service ist nicht erlaubt."}),
+        }
+
+    return bookToStock(fkmaterials=bookMaterial['fkmaterials'], fkplaces=bookMaterial['fkplaces'],
+                       opened=bookMaterial['opened'], quantity=bookMaterial['quantity'], productionOrderNr='')
+
+
+def bookMaterialList(lines):
+    """Sammelbuchung von Material mit Ergebnis je Zeile (Teilerfolg möglich)."""
+    if len(lines) <= 0 or len(lines) > max_bookings:
+        return {
+            "statusCode": 400,
+            'headers': {
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+            },
+            "body": json.dumps({"message": "Eine Sammelbuchung muss 1 bis " + str(max_bookings) +
+                                           " Buchungen enthalten."}),
+        }
+
+    # Eine Transaktion für alle Buchungen, bei Deadlocks wird die Sammelbuchung wiederholt.
+    results = runTransaction(lambda session: bookMaterials(session, lines, material_cache))
+
+    booked = len([result for result in results if result['statusCode'] == 200])
+    if booked == len(results):
+        statusCode = 200
+    elif booked > 0:
+        # Teilweise gebucht
+        statusCode = 207
+    else:
+        statusCode = 400
+
+    return {
+        "statusCode": statusCode,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps(results),
+    }
+
+
+@trackQueries
+def bookProductFromStock(event, context):  # Lambda Function
+    """Abbuchen von Produkten mit Produktions-Order-Nr. und Reservierung."""
+    logger.info(event)
+
+    bookProduct, error = decodeBody(event, BookProductFromStockSchema())
+    if error is not None:
+        return error
+    logger.info(bookProduct)
+
+    with session_scope() as session:
+        reservation = session.query(GoodsOrderPosition, GoodsOrder).filter(
+            (GoodsOrderPosition.fkgoodsOrders == GoodsOrder.idgoodsOrders) &
+            (GoodsOrderPosition.fkgoodsOrders == bookProduct.get('fkgoodsOrders')) &
+            (GoodsOrderPosition.productionOrderNr == bookProduct.get('productionOrderNr')) &
+            (GoodsOrderPosition.fkplaces == bookProduct.get('fkplaces')) &
+            ((GoodsOrderPosition.done != 1) | (GoodsOrderPosition.done.is_(None)))).first()
+
+        if reservation is None:
+            return {
+                "statusCode": 400,
+                'headers': {
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+                },
+                "body": json.dumps({"message": "Die Reservierung existiert nicht."}),
+            }
+
+        # Bestand des Produktionsauftrags auf dem Lagerplatz (Primärschlüssel-Zugriff auf stockBalances)
+        place = getProductionOrderBalance(session, reservation.GoodsOrder.fkmaterials, bookProduct.get('fkplaces'),
+                                          bookProduct.get('productionOrderNr'))
+
+        if place <= 0:
+            return {
+                "statusCode": 400,
+                'headers': {
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+                },
+                "body": json.dumps(
+                    {"message": "Für die Production-Order-Nr. existiert auf dem Lagerplatz kein Bestand."}),
+            }
+
+        if place < reservation.GoodsOrderPosition.quantity:
+            return {
+                "statusCode": 400,
+                'headers': {
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+                },
+                "body": json.dumps(
+                    {"message": "Der Lagerplatz hat nicht genügend Bestand Für die Production-Order-Nr."}),
+            }
+
+        reservation.GoodsOrderPosition.done = 1
+
+        return bookToStock(fkmaterials=reservation.GoodsOrder.fkmaterials, fkplaces=bookProduct.get('fkplaces'),
+                           opened=0, quantity=reservation.GoodsOrderPosition.quantity * (-1),
+                           productionOrderNr=bookProduct.get('productionOrderNr'))
+
+
+def bookToStock(fkmaterials, fkplaces, opened, quantity, productionOrderNr, events=()):
+    """Allgemeine Lagerbuchungsfunktion. events: Nachrichten (Ziel, Inhalt) an andere Dienste, die mit der Buchung in
+    den Outbox geschrieben werden."""
+    with session_scope() as session:
+        # Prüfen ob das Material existiert (Materialcache)
+        query_material = material_cache.getMaterial(session, fkmaterials)
+
+        if query_material is None:
+            # Material existiert nicht
+            return {
+                "statusCode": 400,
+                'headers': {
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST,GET, DELETE'
+                },
+                "body": json.dumps({"message": "Die Materialnummer existiert nicht."}),
+            }
+
+        if quantity < 0:
+            # das Material existiert in der Materialliste. Prüfen ob der Lagerplatz auch genügend Bestand hat. Die
+            # Bestandszeile bleibt bis zum Ende der Buchung gesperrt.
+            balance = getBalance(session, fkmaterials, fkplaces, productionOrderNr, opened, lock=True)
+
+            # kein Bestand oder
+            if balance < abs(quantity):
+                # nicht genug Lagerbestand
+                return {
+                    "statusCode": 400,
+                    'headers': {
+                        'Access-Control-Allow-Headers': 'Content-Type',
+                        'Access-Control-Allow-Origin': '*',
+                        'Access-Control-Allow-Methods': 'OPTIONS,POST,GET, DELETE'
+                    },
+                    "body": json.dumps({"message": "Der Lagerbestand für das Material ist zu niedrig."}),
+                }
+
+        # Buchen des Produktionsauftrags
+        stockEntry_new = StockEntry(fkmaterials=fkmaterials, fkplaces=fkplaces, opened=opened,
+                                    quantity=quantity, productionOrderNr=productionOrderNr)
+        session.add(stockEntry_new)
+        session.flush()
+
+        # Bestand in derselben Transaktion fortschreiben
+        bookBalance(session, fkmaterials, fkplaces, productionOrderNr, opened, quantity, stockEntry_new.booking_date)
+        for target, payload in events:
+            addEvent(session, target, payload)
+        session.commit()
+
+        # Serialize the queryset
+        result = StockEntrySchema().dump(stockEntry_new)
+        return {
+            "statusCode": 200,
+            'headers': {
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET, DELETE'
+            },
+            "body": json.dumps(result),
+        }
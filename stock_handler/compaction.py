@@ -0,0 +1,129 @@
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import tuple_
+from db import session_scope
+from schema_stock import StockEntry, StockEntryArchive
+
+# Verdichtung des Journals stockEntries: Buchungen vor dem Horizont werden je (Material, Lagerplatz,
+# ProductionOrderNr, geöffnet) zu einer Snapshot-Zeile (snapshot_date gesetzt) zusammengefasst und nach
+# stockEntriesArchive verschoben. Summen über das Journal (Sicht inventory, balances.ledgerBalances) bleiben dadurch
+# unverändert, die früheste Buchung bleibt als booking_date der Snapshot-Zeile erhalten.
+# Jeder Block läuft in einer eigenen Transaktion. Ein abgebrochener Lauf wird beim nächsten Aufruf fortgesetzt, ein
+# erneuter Lauf mit demselben Horizont ändert nichts.
+# Aufruf: python compaction.py [Horizont in Tagen]
+
+logger = logging.getLogger()
+
+# Buchungen, die älter als COMPACTION_HORIZON_DAYS Tage sind, werden in Blöcken von COMPACTION_BATCH_SIZE verdichtet
+compaction_horizon_days = int(os.environ.get('COMPACTION_HORIZON_DAYS', 365))
+compaction_batch_size = int(os.environ.get('COMPACTION_BATCH_SIZE', 1000))
+
+
+def entryKey(entry):
+    """Bestandsschlüssel einer Buchung wie in balances.ledgerBalances."""
+    return entry.fkmaterials, entry.fkplaces, entry.productionOrderNr or '', int(entry.opened)
+
+
+def compactionHorizon(days=None):
+    if days is None:
+        days = compaction_horizon_days
+    return datetime.now() - timedelta(days=days)
+
+
+def compactBatch(session, horizon, after_id=0, batch_size=None):
+    """Verdichtet die nächsten batch_size Buchungen vor horizon mit einer ID größer after_id.
+
+    Gibt (Anzahl verdichteter Buchungen, höchste gelesene ID) zurück. Sind es weniger als batch_size Buchungen, gibt
+    es keine weiteren.
+    """
+    if batch_size is None:
+        batch_size = compaction_batch_size
+
+    # Buchungen werden nicht geändert, daher ohne Sperre (keine Lückensperren vor neuen Buchungen)
+    entries = session.query(StockEntry). \
+        filter((StockEntry.idstockEntries > after_id) & StockEntry.snapshot_date.is_(None) &
+               (StockEntry.booking_date < horizon)). \
+        order_by(StockEntry.idstockEntries).limit(batch_size).all()
+    if len(entries) <= 0:
+        return 0, after_id
+
+    folded = {}
+    for entry in entries:
+        key = entryKey(entry)
+        quantity, booking_date = folded.get(key, (0, entry.booking_date))
+        folded[key] = (quantity + entry.quantity, min(booking_date, entry.booking_date))
+
+    # Vorhandene Snapshot-Zeilen fortschreiben, fehlende anlegen
+    snapshots = {}
+    for snapshot in session.query(StockEntry). \
+            filter(StockEntry.snapshot_date.isnot(None) &
+                   tuple_(StockEntry.fkmaterials, StockEntry.fkplaces).in_(set(key[:2] for key in folded))). \
+            order_by(StockEntry.idstockEntries):
+        if entryKey(snapshot) in folded:
+            snapshots.setdefault(entryKey(snapshot), snapshot)
+
+    for key, (quantity, booking_date) in folded.items():
+        snapshot = snapshots.get(key)
+        if snapshot is None:
+            snapshots[key] = StockEntry(fkmaterials=key[0], fkplaces=key[1], productionOrderNr=key[2] or None,
+                                        opened=key[3], quantity=quantity, booking_date=booking_date,
+                                        snapshot_date=horizon)
+            session.add(snapshots[key])
+        else:
+            snapshot.quantity = snapshot.quantity + quantity
+            snapshot.booking_date = min(snapshot.booking_date, booking_date)
+            snapshot.snapshot_date = max(snapshot.snapshot_date, horizon)
+    session.flush()
+
+    now = datetime.now()
+    session.bulk_insert_mappings(StockEntryArchive, [
+        dict(idstockEntries=entry.idstockEntries, fkplaces=entry.fkplaces, fkmaterials=entry.fkmaterials,
+             productionOrderNr=entry.productionOrderNr, opened=entry.opened, quantity=entry.quantity,
+             booking_date=entry.booking_date, fksnapshot=snapshots[entryKey(entry)].idstockEntries, archive_date=now)
+        for entry in entries])
+    session.query(StockEntry).filter(StockEntry.idstockEntries.in_([entry.idstockEntries for entry in entries])). \
+        delete(synchronize_session=False)
+    return len(entries), entries[-1].idstockEntries
+
+
+def compactEntries(horizon=None, batch_size=None, stop=None):
+    """Verdichtet alle Buchungen vor horizon blockweise, bis keine mehr anstehen oder stop() True zurückgibt.
+
+    Gibt die Anzahl verdichteter Buchungen und Blöcke zurück und ob alle Buchungen vor horizon verdichtet sind.
+    """
+    if horizon is None:
+        horizon = compactionHorizon()
+    if batch_size is None:
+        batch_size = compaction_batch_size
+
+    compacted = 0
+    batches = 0
+    after_id = 0
+    finished = False
+    while True:
+        with session_scope() as session:
+            count, after_id = compactBatch(session, horizon, after_id, batch_size)
+        compacted = compacted + count
+        batches = batches + 1
+        logger.info('Verdichtung: Block ' + str(batches) + ', ' + str(count) + ' Buchungen bis ID ' + str(after_id))
+        if count < batch_size:
+            finished = True
+            break
+        if stop is not None and stop():
+            break
+
+    return {'horizon': horizon.strftime('%Y/%m/%d %H:%M:%S'), 'compacted': compacted, 'batches': batches,
+            'finished': finished}
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) > 2 or (len(sys.argv) == 2 and not sys.argv[1].isdigit()):
+        print('Aufruf: python compaction.py [Horizont in Tagen]')
+        sys.exit(2)
+
+    result = compactEntries(compactionHorizon(int(sys.argv[1]) if len(sys.argv) == 2 else None))
+    print(str(result['compacted']) + ' Buchungen vor ' + result['horizon'] + ' in ' + str(result['batches']) +
+          ' Blöcken verdichtet.')
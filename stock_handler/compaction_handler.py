@@ -0,0 +1,20 @@
+import logging
+import os
+from query_stats import trackQueries
+from compaction import compactEntries
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Reserve bis zum Timeout der Function, in der kein weiterer Block mehr begonnen wird (Millisekunden)
+compaction_reserve_ms = int(os.environ.get('COMPACTION_RESERVE_MS', 30000))
+
+
+@trackQueries
+def compactStockEntries(event, context):  # Lambda Function (zeitgesteuert)
+    """Verdichtet die Buchungen vor dem Horizont. Reicht die Laufzeit nicht, setzt der nächste Aufruf fort."""
+    result = compactEntries(stop=lambda: context is not None and
+                            context.get_remaining_time_in_millis() < compaction_reserve_ms)
+    logger.info('Verdichtung: ' + str(result['compacted']) + ' Buchungen vor ' + result['horizon'] + ' verdichtet' +
+                ('' if result['finished'] else ', wird fortgesetzt'))
+    return result
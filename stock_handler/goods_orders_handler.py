@@ -0,0 +1,64 @@
+import logging
+import simplejson as json
+from db import session_scope, runTransaction
+from query_stats import trackQueries
+from json_stream import dumpQuery
+from schema_stock import GoodsOrderPosition, ReservationOrderPositionSchema, GoodsOrderSchema, \
+    ReservationResponseSchema
+from request_body import decodeBody
+from reservation import reserveOrders
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+@trackQueries
+def getPackageList(event, context):  # Lambda Function
+    """Gibt alle offenen Reservierungen bzw. Bestellungen des Versands als Packliste zurück."""
+    with session_scope() as session:
+        goodsOrdersPositions = session.query(GoodsOrderPosition). \
+            filter((GoodsOrderPosition.done != 1) | (GoodsOrderPosition.done.is_(None))). \
+            order_by(GoodsOrderPosition.fkgoodsOrders)
+
+        # Serialize the queryset (blockweise)
+        body = dumpQuery(goodsOrdersPositions, ReservationOrderPositionSchema())
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": body,
+    }
+
+
+@trackQueries
+def createGoodsOrders(event, context):  # Lambda Function
+    """Anlage von einer oder mehreren Reservierungen/Bestellungen von Produkten entweder mit Materialnummer + Menge
+    oder ProductionOrderNr """
+    logger.info(event)
+
+    orders, error = decodeBody(event, GoodsOrderSchema(), many=True)
+    if error is not None:
+        return error
+    logger.info(orders)
+
+    def reserve(session):
+        # Bestände und Reservierungen aller Orders gemeinsam ermitteln und verteilen
+        response = [dict(error_message=error_message, reservation=reservation)
+                    for reservation, error_message in reserveOrders(session, orders)]
+        return ReservationResponseSchema().dump(response, many=True)
+
+    # Kurze Transaktion mit Sperre je Material, bei Deadlocks wird die Reservierung wiederholt.
+    result = runTransaction(reserve)
+    logger.info(result)
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps(result),
+    }
@@ -0,0 +1,152 @@
+# Aufrufe der anderen Microservices (Produktion und Versand). Einziges Modul, das requests importiert.
+import logging
+import os
+import random
+import time
+import requests
+import simplejson as json
+from requests.adapters import HTTPAdapter
+from profiling import invocation_timer
+
+logger = logging.getLogger()
+
+# Urls der anderen Webservices (über die Umgebung überschreibbar, z.B. für den Stub-Server in benchmarks/)
+ApiProductionUrl = os.environ.get('API_PRODUCTION_URL',
+                                  'https://2pkivl4tnh.execute-api.eu-central-1.amazonaws.com/prod/readorderinfo')
+ApiVersandUrl = os.environ.get('API_VERSAND_URL',
+                               'https://5club7wre8.execute-api.eu-central-1.amazonaws.com/sales/updatestatus')
+
+# Timeouts je Versuch in Sekunden (Verbindungsaufbau, Warten auf Daten)
+connect_timeout = float(os.environ.get('API_CONNECT_TIMEOUT', 1.0))
+read_timeout = float(os.environ.get('API_READ_TIMEOUT', 2.0))
+# Höchstdauer eines Aufrufs inkl. Wiederholungen; ein weiterer Versuch wird nur gestartet, wenn er noch hineinpasst
+api_deadline = float(os.environ.get('API_DEADLINE', 4.0))
+
+# Wiederholungen bei Verbindungsfehlern, Timeouts und 429/5xx mit exponentiellem Backoff und Jitter
+api_retries = int(os.environ.get('API_RETRIES', 2))
+api_backoff = float(os.environ.get('API_BACKOFF', 0.1))
+api_backoff_max = float(os.environ.get('API_BACKOFF_MAX', 1.0))
+retryable_status = (429, 500, 502, 503, 504)
+
+# Circuit Breaker: Nach breaker_threshold Fehlschlägen in Folge wird der Dienst breaker_reset Sekunden nicht aufgerufen
+breaker_threshold = int(os.environ.get('API_BREAKER_THRESHOLD', 5))
+breaker_reset = float(os.environ.get('API_BREAKER_RESET', 30))
+
+
+class IntegrationError(Exception):
+    """Der Dienst war nach allen Versuchen nicht erreichbar oder der Circuit Breaker ist offen."""
+
+
+class CircuitBreaker(object):
+    """Zustand eines Dienstes über alle Aufrufe eines Containers.
+
+    Geschlossen: Aufrufe werden durchgeführt. Offen (nach threshold Fehlschlägen in Folge): Aufrufe schlagen sofort
+    fehl. Nach reset Sekunden wird ein einzelner Probeaufruf zugelassen, dessen Ergebnis den Breaker wieder schließt
+    oder erneut öffnet.
+    """
+
+    def __init__(self, name, threshold=breaker_threshold, reset=breaker_reset):
+        self.name = name
+        self.threshold = threshold
+        self.reset = reset
+        self.failures = 0
+        self.opened = None
+
+    def allow(self):
+        if self.opened is None:
+            return True
+        if time.time() - self.opened >= self.reset:
+            # Probeaufruf; schlägt er fehl, bleibt der Breaker weitere reset Sekunden offen
+            self.opened = time.time()
+            return True
+        return False
+
+    def recordSuccess(self):
+        if self.opened is not None:
+            logger.info('Circuit Breaker ' + self.name + ' geschlossen')
+        self.failures = 0
+        self.opened = None
+
+    def recordFailure(self):
+        self.failures = self.failures + 1
+        if self.failures >= self.threshold:
+            if self.opened is None:
+                logger.warning('Circuit Breaker ' + self.name + ' geöffnet nach ' + str(self.failures) +
+                               ' Fehlschlägen')
+            self.opened = time.time()
+
+
+def _createSession():
+    """Session mit Verbindungspool; die Verbindungen (inkl. TLS) bleiben über warme Aufrufe erhalten."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=2, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+http_session = _createSession()
+breakers = {'production': CircuitBreaker('production'), 'versand': CircuitBreaker('versand')}
+
+
+def callService(breaker, method, url, data, retries=None, headers=None):
+    """Ruft den Dienst mit Timeouts und Wiederholungen auf und gibt die Antwort (requests.Response) zurück.
+
+    Beide Aufrufe sind idempotent (Abfrage bzw. Setzen eines Status) und dürfen daher auch nach einem Read-Timeout
+    wiederholt werden, solange API_DEADLINE nicht überschritten würde. Antworten mit anderen Statuscodes als 429/5xx
+    werden unverändert zurückgegeben.
+    """
+    if retries is None:
+        retries = api_retries
+
+    start = time.time()
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise IntegrationError('Der Dienst ' + breaker.name + ' ist vorübergehend nicht erreichbar '
+                                   '(Circuit Breaker offen).')
+        try:
+            with invocation_timer.measure('http'):
+                response = http_session.request(method, url, data=data, headers=headers,
+                                                timeout=(connect_timeout, read_timeout))
+            if response.status_code not in retryable_status:
+                breaker.recordSuccess()
+                return response
+            error = 'HTTP ' + str(response.status_code)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e.__class__.__name__ + ': ' + str(e)
+        breaker.recordFailure()
+
+        backoff = random.uniform(0, min(api_backoff_max, api_backoff * (2 ** (attempt + 1))))
+        if attempt >= retries or time.time() - start + backoff + connect_timeout + read_timeout > api_deadline:
+            raise IntegrationError('Der Dienst ' + breaker.name + ' ist nicht erreichbar (' + error + ').')
+        attempt = attempt + 1
+        logger.warning('Aufruf ' + breaker.name + ' wird wiederholt (' + str(attempt) + '/' + str(retries) + '): ' +
+                       error)
+        time.sleep(backoff)
+
+
+def readProductionOrder(productionOrderNr):
+    """Fragt einen Produktionsauftrag bei der Produktion ab und gibt die Antwort (requests.Response) zurück."""
+    data = json.dumps({'prodOrderNum': productionOrderNr})
+    return callService(breakers['production'], 'POST', ApiProductionUrl, data)
+
+
+def updateShippingStatus(productionOrderNr, statusID, statusDescription, idempotency_key=None):
+    """Meldet dem Versand den Status eines Produktionsauftrags und gibt die Antwort (requests.Response) zurück."""
+    data = json.dumps({'prodOrderNr': productionOrderNr, 'statusID': statusID, 'statusDescription': statusDescription})
+    headers = {'Idempotency-Key': idempotency_key} if idempotency_key else None
+    return callService(breakers['versand'], 'PATCH', ApiVersandUrl, data, headers=headers)
+
+
+def deliverEvent(target, payload, idempotency_key):
+    """Stellt ein Ereignis aus dem Outbox zu (outbox.dispatchEvents). Fehler und Antworten außer 2xx lösen einen
+    IntegrationError aus, das Ereignis wird dann später wiederholt."""
+    if target != 'versand':
+        raise IntegrationError('Unbekanntes Ziel ' + str(target) + '.')
+    response = updateShippingStatus(payload['productionOrderNr'], payload['statusID'], payload['statusDescription'],
+                                    idempotency_key)
+    if not 200 <= response.status_code < 300:
+        raise IntegrationError('Der Dienst versand antwortet mit HTTP ' + str(response.status_code) + ': ' +
+                               response.text[:200])
+    return response
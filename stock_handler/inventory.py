@@ -0,0 +1,121 @@
+import base64
+import os
+import simplejson as json
+from sqlalchemy import tuple_
+from sqlalchemy.orm import selectinload
+from schema_stock import Inventory, Material, InventorySchema
+from valuation import calcMaterialValues
+from row_serializer import compileSerializer
+
+# Seitengröße für getInventory, falls nur ein Fortsetzungstoken übergeben wird, und maximale Seitengröße
+default_page_size = int(os.environ.get('INVENTORY_PAGE_SIZE', 500))
+max_page_size = int(os.environ.get('INVENTORY_MAX_PAGE_SIZE', 1000))
+
+# Auswählbare Felder (fields=...): Spalten des Inventars, verschachtelte Objekte und die Bewertung
+inventory_fields = ['fkplaces', 'fkmaterials', 'opened', 'quantity', 'material', 'place', 'value_of_materials']
+
+
+def encodeToken(inventory):
+    """Erzeugt das Fortsetzungstoken aus dem Schlüssel (fkplaces, fkmaterials, opened) der letzten Zeile."""
+    key = [inventory.fkplaces, inventory.fkmaterials, inventory.opened]
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+
+def decodeToken(token):
+    """Liest den Schlüssel (fkplaces, fkmaterials, opened) aus einem Fortsetzungstoken."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError('Ungültiges Fortsetzungstoken.')
+    if not isinstance(key, list) or len(key) != 3 or not all(isinstance(value, int) for value in key):
+        raise ValueError('Ungültiges Fortsetzungstoken.')
+    return tuple(key)
+
+
+def _intParameter(params, name):
+    if params.get(name) is None:
+        return None
+    try:
+        return int(params.get(name))
+    except ValueError:
+        raise ValueError('Der Parameter ' + name + ' muss eine Zahl sein.')
+
+
+def parseInventoryParameters(params):
+    """Liest die Query-Parameter von getInventory.
+
+    limit, next: Seitengröße und Fortsetzungstoken; ohne beide wird das gesamte Inventar zurückgegeben
+    place, material, art: Filter nach Lagerplatz, Material und Materialart
+    fields: kommagetrennte Liste der Felder (siehe inventory_fields)
+
+    Löst bei ungültigen Parametern einen ValueError aus.
+    """
+    params = params or {}
+    options = dict(place=_intParameter(params, 'place'), material=_intParameter(params, 'material'),
+                   art=params.get('art'), limit=_intParameter(params, 'limit'), after=None, fields=None)
+
+    if params.get('next'):
+        options['after'] = decodeToken(params.get('next'))
+        if options['limit'] is None:
+            options['limit'] = default_page_size
+    if (options['limit'] is not None) and not (0 < options['limit'] <= max_page_size):
+        raise ValueError('Der Parameter limit muss zwischen 1 und ' + str(max_page_size) + ' liegen.')
+
+    if params.get('fields'):
+        fields = [field.strip() for field in params.get('fields').split(',') if field.strip()]
+        unknown = [field for field in fields if field not in inventory_fields]
+        if unknown:
+            raise ValueError('Unbekannte Felder: ' + ', '.join(unknown))
+        options['fields'] = fields
+    return options
+
+
+def loadInventory(session, place=None, material=None, art=None, limit=None, after=None, fields=None):
+    """Lädt das Inventar sortiert nach (fkplaces, fkmaterials, opened).
+
+    Mit limit wird nur eine Seite ab dem Schlüssel after geladen (Keyset-Pagination). Materialien und Lagerplätze werden
+    nur geladen, wenn sie ausgewählt sind (je eine Abfrage für die ganze Seite), ebenso die Bewertung.
+
+    Returns
+    ------
+    (Liste der serialisierten Positionen, Fortsetzungstoken oder None)
+    """
+    fields = fields or inventory_fields
+    query = session.query(Inventory)
+
+    if place is not None:
+        query = query.filter(Inventory.fkplaces == place)
+    if material is not None:
+        query = query.filter(Inventory.fkmaterials == material)
+    if art is not None:
+        query = query.join(Inventory.material).filter(Material.art == art)
+    if after is not None:
+        query = query.filter(tuple_(Inventory.fkplaces, Inventory.fkmaterials, Inventory.opened) > after)
+
+    if 'material' in fields:
+        query = query.options(selectinload(Inventory.material))
+    if 'place' in fields:
+        query = query.options(selectinload(Inventory.place))
+
+    query = query.order_by(Inventory.fkplaces, Inventory.fkmaterials, Inventory.opened)
+    if limit is not None:
+        # Eine Zeile mehr laden, um das Ende des Inventars zu erkennen
+        query = query.limit(limit + 1)
+    inventory = query.all()
+
+    token = None
+    if (limit is not None) and (len(inventory) > limit):
+        inventory = inventory[:limit]
+        token = encodeToken(inventory[-1])
+
+    # Serialize the queryset
+    result = compileSerializer(InventorySchema(only=[field for field in fields if field != 'value_of_materials'])). \
+        many(inventory)
+
+    if 'value_of_materials' in fields:
+        # Ermittle den Wert der Positionen mittels dem Preis aus den Wareneingängen (eine Abfrage für alle Positionen)
+        values = calcMaterialValues(session, [(pos.fkmaterials, pos.quantity) for pos in inventory])
+        for pos, value in zip(result, values):
+            pos['value_of_materials'] = value
+
+    return result, token
@@ -0,0 +1,62 @@
+import logging
+import simplejson as json
+from db import session_scope
+from query_stats import trackQueries
+from inventory import parseInventoryParameters, loadInventory
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+@trackQueries
+def getInventory(event, context):  # Lambda Function
+    """Gibt das aktuelle Inventar zurück.
+
+    Parameters
+    ----------
+    event: dict, required
+        API Gateway Lambda Proxy Input Format
+
+        Event doc: https://docs.aws.amazon.com/apigateway/latest/developerguide/set-up-lambda-proxy-integrations.html#api-gateway-simple-proxy-for-lambda-input-format
+
+    context: object, required
+        Lambda Context runtime methods and attributes
+
+        Context doc: https://docs.aws.amazon.com/lambda/latest/dg/python-context-object.html
+
+    Returns
+    ------
+    API Gateway Lambda Proxy Output Format: dict
+
+        Return doc: https://docs.aws.amazon.com/apigateway/latest/developerguide/set-up-lambda-proxy-integrations.html
+    """
+
+    try:
+        options = parseInventoryParameters(event.get('queryStringParameters'))
+    except ValueError as e:
+        return {
+            "statusCode": 400,
+            'headers': {
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+            },
+            "body": json.dumps({"message": str(e)}),
+        }
+
+    with session_scope() as session:
+        result, token = loadInventory(session, **options)
+
+    # Mit limit bzw. next wird eine Seite mit Fortsetzungstoken zurückgegeben, sonst das gesamte Inventar
+    if options['limit'] is not None:
+        result = {'items': result, 'next': token}
+
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps(result, use_decimal=True),
+    }
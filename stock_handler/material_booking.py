@@ -0,0 +1,93 @@
+import os
+import simplejson as json
+from datetime import datetime as dt
+from marshmallow import ValidationError
+from schema_stock import StockEntry, StockBalance, BookMaterialSchema, StockEntrySchema
+from balances import bookBalances
+from row_serializer import compileSerializer
+
+# Maximale Anzahl an Buchungen je Sammelbuchung
+max_bookings = int(os.environ.get('MAX_BATCH_BOOKINGS', 1000))
+
+
+def _lineError(line, message):
+    return {'line': line, 'statusCode': 400, 'message': message}
+
+
+def bookMaterials(session, lines, material_cache):
+    """Bucht viele Materialbewegungen in einer Transaktion.
+
+    Alle Materialnummern werden über den Materialcache geprüft (fehlende Einträge mit einer IN-Abfrage), die Bestände
+    aller Abbuchungen mit einer Abfrage gelesen (und bis zum Ende der Transaktion gesperrt) und alle Buchungen
+    gesammelt eingefügt (je Buchung ein INSERT, damit die IDs für die Antwort bekannt sind). Fehlerhafte Zeilen werden
+    übersprungen, die übrigen Zeilen trotzdem gebucht.
+
+    Returns
+    ------
+    Liste mit einem Ergebnis je Zeile: {'line', 'statusCode', 'stockEntry'} bzw. {'line', 'statusCode', 'message'}
+    """
+    results = [None] * len(lines)
+
+    # Validierung der einzelnen Zeilen
+    schema = BookMaterialSchema()
+    bookings = []
+    for line, data in enumerate(lines):
+        try:
+            booking = schema.load(data)
+        except ValidationError as e:
+            results[line] = _lineError(line, 'Ungültige Daten: ' + json.dumps(e.messages))
+            continue
+
+        if booking['fkmaterials'] < 50000000:
+            results[line] = _lineError(line, 'Die Buchung von Fertigware mit diesem Service ist nicht erlaubt.')
+            continue
+        bookings.append((line, booking))
+
+    # Prüfen ob die Materialien existieren (Materialcache, höchstens eine Abfrage)
+    materials = set(material_cache.getMaterials(session, [booking['fkmaterials'] for line, booking in bookings]))
+
+    # Bestände aller Materialien mit Abbuchungen (eine Abfrage, gesperrt bis zum Ende der Buchung)
+    withdrawals = set(booking['fkmaterials'] for line, booking in bookings
+                      if (booking['quantity'] < 0) and (booking['fkmaterials'] in materials))
+    balances = {}
+    if len(withdrawals) > 0:
+        for balance in session.query(StockBalance). \
+                filter(StockBalance.fkmaterials.in_(withdrawals) & (StockBalance.productionOrderNr == '')). \
+                with_for_update():
+            balances[(balance.fkmaterials, balance.fkplaces, balance.opened)] = balance.quantity
+
+    booking_date = dt.now()
+    entries = []
+    lines_booked = []
+    for line, booking in bookings:
+        if booking['fkmaterials'] not in materials:
+            results[line] = _lineError(line, 'Die Materialnummer existiert nicht.')
+            continue
+
+        opened = int(booking.get('opened', False))
+        key = (booking['fkmaterials'], booking['fkplaces'], opened)
+        if (booking['quantity'] < 0) and (balances.get(key, 0) < abs(booking['quantity'])):
+            results[line] = _lineError(line, 'Der Lagerbestand für das Material ist zu niedrig.')
+            continue
+
+        # Vorherige Zeilen derselben Sammelbuchung berücksichtigen
+        balances[key] = balances.get(key, 0) + booking['quantity']
+
+        entry = dict(fkmaterials=booking['fkmaterials'], fkplaces=booking['fkplaces'], opened=opened,
+                     quantity=booking['quantity'], productionOrderNr='', booking_date=booking_date)
+        entries.append(entry)
+        lines_booked.append(line)
+
+    # Buchungen und Bestände gesammelt schreiben. return_defaults ergänzt die Einträge um idstockEntries, damit die
+    # Antwort wie bei der Einzelbuchung die ID jeder Buchung enthält.
+    if len(entries) > 0:
+        session.bulk_insert_mappings(StockEntry, entries, return_defaults=True)
+        bookBalances(session, entries)
+
+    serializer = compileSerializer(StockEntrySchema(), columns=['idstockEntries', 'fkmaterials', 'fkplaces', 'opened',
+                                                                'quantity', 'productionOrderNr', 'booking_date'],
+                                   mapping=True)
+    for line, entry in zip(lines_booked, entries):
+        results[line] = {'line': line, 'statusCode': 200, 'stockEntry': serializer.one(entry)}
+
+    return results
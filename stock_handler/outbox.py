@@ -0,0 +1,128 @@
+import logging
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+import simplejson as json
+from db import session_scope
+from schema_stock import OutboxEvent
+
+# Transaktionaler Outbox: Nachrichten an andere Dienste werden in derselben Transaktion wie die Buchung in outboxEvents
+# geschrieben und von dispatchOutbox (outbox_handler.py) zugestellt. Jedes Ereignis trägt einen Idempotency-Key, damit
+# der Empfänger Wiederholungen erkennt.
+
+logger = logging.getLogger()
+
+# Ereignisse je Durchlauf, Sperrfrist eines abgeholten Ereignisses und Wiederholungen mit Backoff und Jitter
+outbox_batch_size = int(os.environ.get('OUTBOX_BATCH_SIZE', 50))
+outbox_lease = float(os.environ.get('OUTBOX_LEASE', 120))
+outbox_max_attempts = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 10))
+outbox_backoff = float(os.environ.get('OUTBOX_BACKOFF', 30))
+outbox_backoff_max = float(os.environ.get('OUTBOX_BACKOFF_MAX', 3600))
+# Ergebnisse der Zustellung werden je OUTBOX_RECORD_SIZE Ereignisse geschrieben
+outbox_record_size = int(os.environ.get('OUTBOX_RECORD_SIZE', 5))
+
+
+def addEvent(session, target, payload):
+    """Legt ein Ereignis für den Dienst target in der Transaktion der Session an und gibt es zurück."""
+    event = OutboxEvent(idempotency_key=str(uuid.uuid4()), target=target, payload=json.dumps(payload),
+                        state='pending', attempts=0, next_attempt=datetime.now())
+    session.add(event)
+    return event
+
+
+def claimEvents(limit=None):
+    """Holt fällige Ereignisse in einer kurzen Transaktion ab und sperrt sie für outbox_lease Sekunden.
+
+    Die Zustellung läuft außerhalb der Transaktion, damit keine Zeilensperren über HTTP-Aufrufe gehalten werden. Bricht
+    der Dispatcher ab, werden die Ereignisse nach Ablauf der Sperrfrist erneut zugestellt.
+    """
+    if limit is None:
+        limit = outbox_batch_size
+
+    with session_scope() as session:
+        now = datetime.now()
+        events = session.query(OutboxEvent). \
+            filter((OutboxEvent.state == 'pending') & (OutboxEvent.next_attempt <= now)). \
+            order_by(OutboxEvent.next_attempt, OutboxEvent.idoutboxEvents). \
+            limit(limit).with_for_update().all()
+        for event in events:
+            event.next_attempt = now + timedelta(seconds=outbox_lease)
+        return [dict(idoutboxEvents=event.idoutboxEvents, idempotency_key=event.idempotency_key,
+                     target=event.target, payload=json.loads(event.payload), attempts=event.attempts)
+                for event in events]
+
+
+def retryDelay(attempts):
+    """Wartezeit vor dem nächsten Versuch: exponentiell wachsend, zufällig gestreut."""
+    return random.uniform(0.5, 1.0) * min(outbox_backoff_max, outbox_backoff * (2 ** (attempts - 1)))
+
+
+def recordResults(results):
+    """Schreibt die Ergebnisse der Zustellung fort.
+
+    results: Liste von (Ereignis als dict, Fehlermeldung oder None)
+    """
+    if len(results) <= 0:
+        return
+
+    with session_scope() as session:
+        now = datetime.now()
+        for event, error in results:
+            values = {OutboxEvent.attempts: event['attempts'] + 1}
+            if error is None:
+                values[OutboxEvent.state] = 'delivered'
+                values[OutboxEvent.delivery_date] = now
+                values[OutboxEvent.last_error] = None
+            elif event['attempts'] + 1 >= outbox_max_attempts:
+                logger.error('Ereignis ' + event['idempotency_key'] + ' nach ' + str(event['attempts'] + 1) +
+                             ' Versuchen aufgegeben: ' + error)
+                values[OutboxEvent.state] = 'failed'
+                values[OutboxEvent.last_error] = error[:255]
+            else:
+                values[OutboxEvent.next_attempt] = now + timedelta(seconds=retryDelay(event['attempts'] + 1))
+                values[OutboxEvent.last_error] = error[:255]
+            session.query(OutboxEvent).filter(OutboxEvent.idoutboxEvents == event['idoutboxEvents']). \
+                update(values, synchronize_session=False)
+
+
+def releaseEvents(events):
+    """Gibt abgeholte, nicht zugestellte Ereignisse ohne Zählung eines Versuchs sofort wieder frei."""
+    if len(events) <= 0:
+        return
+
+    with session_scope() as session:
+        session.query(OutboxEvent). \
+            filter(OutboxEvent.idoutboxEvents.in_([event['idoutboxEvents'] for event in events])). \
+            update({OutboxEvent.next_attempt: datetime.now()}, synchronize_session=False)
+
+
+def dispatchEvents(deliver, limit=None, stop=None):
+    """Stellt einen Block fälliger Ereignisse zu und gibt (zugestellt, fehlgeschlagen) zurück.
+
+    deliver(target, payload, idempotency_key) stellt ein Ereignis zu und löst bei einem Fehler eine Exception aus.
+    Vor jedem Ereignis wird stop() geprüft: Gibt es True zurück, werden die restlichen Ereignisse wieder freigegeben.
+    Die Ergebnisse werden in Blöcken von outbox_record_size Ereignissen geschrieben, damit bei einem Abbruch der
+    Function höchstens diese Ereignisse erneut zugestellt werden.
+    """
+    events = claimEvents(limit)
+    results = []
+    delivered = 0
+    failed = 0
+    for position, event in enumerate(events):
+        if stop is not None and stop():
+            releaseEvents(events[position:])
+            break
+        try:
+            deliver(event['target'], event['payload'], event['idempotency_key'])
+            results.append((event, None))
+            delivered = delivered + 1
+        except Exception as e:
+            logger.warning('Zustellung von Ereignis ' + event['idempotency_key'] + ' fehlgeschlagen: ' + str(e))
+            results.append((event, str(e)))
+            failed = failed + 1
+        if len(results) >= outbox_record_size:
+            recordResults(results)
+            results = []
+    recordResults(results)
+    return delivered, failed
@@ -0,0 +1,31 @@
+import logging
+import os
+from query_stats import trackQueries
+from outbox import dispatchEvents, outbox_batch_size
+from integration import deliverEvent
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Reserve bis zum Timeout der Function, in der kein weiteres Ereignis mehr zugestellt wird (Millisekunden)
+dispatch_reserve_ms = int(os.environ.get('OUTBOX_RESERVE_MS', 15000))
+
+
+@trackQueries
+def dispatchOutbox(event, context):  # Lambda Function (zeitgesteuert)
+    """Stellt die fälligen Ereignisse aus outboxEvents blockweise zu, solange volle Blöcke anstehen. Vor jedem
+    Ereignis wird die verbleibende Laufzeit geprüft, damit zugestellte Ereignisse vor dem Timeout gespeichert sind."""
+    def stop():
+        return context is not None and context.get_remaining_time_in_millis() < dispatch_reserve_ms
+
+    delivered = 0
+    failed = 0
+    while True:
+        block_delivered, block_failed = dispatchEvents(deliverEvent, stop=stop)
+        delivered = delivered + block_delivered
+        failed = failed + block_failed
+        if block_delivered + block_failed < outbox_batch_size or block_failed > 0 or stop():
+            break
+
+    logger.info('Outbox: ' + str(delivered) + ' zugestellt, ' + str(failed) + ' fehlgeschlagen')
+    return {'delivered': delivered, 'failed': failed}
@@ -0,0 +1,115 @@
+import sys
+import logging
+import simplejson as json
+from db import session_scope
+from query_stats import trackQueries
+from schema_stock import Material, BookProductToStockSchema
+from request_body import decodeBody
+from booking_handler import bookToStock, material_cache
+from integration import readProductionOrder, IntegrationError
+from production_orders import ProductionOrderCache
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Produktionsaufträge, bleiben über warme Aufrufe des Containers erhalten
+production_order_cache = ProductionOrderCache()
+
+
+def _unavailableResponse(error):
+    """Antwort, wenn die Produktion oder der Versand nicht erreichbar ist."""
+    return {
+        "statusCode": 503,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps({"message": str(error)}),
+    }
+
+
+def fetchProductionOrder(productionOrderNr):
+    """Fragt den Produktionsauftrag bei der Produktion ab und gibt (Auftrag, Fehlerantwort) zurück."""
+    logger.info('Start Request')
+    try:
+        r = readProductionOrder(productionOrderNr)
+    except IntegrationError as e:
+        return None, _unavailableResponse(e)
+    logger.info('End Request')
+
+    if r.status_code != 200:
+        return None, {
+            "statusCode": 400,
+            'headers': {
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+            },
+            "body": json.dumps({"message": 'Fehler bei der Abfrage der ProductionOrderNr. ' + json.dumps(r.json())}),
+        }
+
+    prodOrder = json.loads(r.text)
+
+    if prodOrder['statusCode'] != 200:
+        return None, {
+            "statusCode": 400,
+            'headers': {
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+            },
+            "body": json.dumps({"message": 'Fehler bei der Abfrage der ProductionOrderNr: ' + json.dumps(r.json())}),
+        }
+
+    try:
+        return {'articleNumber': int(prodOrder['body'][0]['articleNumber']),
+                'quantity': int(prodOrder['body'][0]['quantity'])}, None
+    except:
+        e = sys.exc_info()[0]
+        return None, {
+            "statusCode": 400,
+            'headers': {
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+            },
+            "body": json.dumps({"message": 'Fehler bei der Abfrage der ProductionOrderNr. Der Rückgabewert ist '
+                                           'invalide. :' + str(e)})
+        }
+
+
+@trackQueries
+def bookProductToStock(event, context):  # Lambda Function
+    """Zubuchung von Produkten mit Produktions-Order-Nr."""
+    logger.info(event)
+
+    bookProduct, error = decodeBody(event, BookProductToStockSchema())
+    if error is not None:
+        return error
+    logger.info(bookProduct)
+
+    prodOrder, error = production_order_cache.get(bookProduct['productionOrderNr'], fetchProductionOrder)
+    logger.info(json.dumps({'productionOrderCache': production_order_cache.statistics()}))
+    if error is not None:
+        return error
+    fkmaterials = prodOrder['articleNumber']
+    quantity = prodOrder['quantity']
+
+    logger.info('Datenbank Änderungen')
+    with session_scope() as session:
+        query_material = material_cache.getMaterial(session, fkmaterials)
+
+        # Anlegen des Materials (falls nicht vorhanden!)
+        if query_material is None:
+            material_new = Material(idmaterials=fkmaterials, name='Fertigware eines Kunden', size=1, measure='st',
+                                    art='Fertigware')
+            session.add(material_new)
+            material_cache.bumpVersion(session)
+            session.commit()
+
+    # Der Versand erhält den Status über den Outbox (dispatchOutbox), sobald die Buchung committet ist
+    shipping_status = {'productionOrderNr': bookProduct['productionOrderNr'], 'statusID': 4,
+                       'statusDescription': 'Auf Lager'}
+    return bookToStock(fkmaterials, bookProduct['fkplaces'], 0, quantity, bookProduct['productionOrderNr'],
+                       events=[('versand', shipping_status)])
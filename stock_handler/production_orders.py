@@ -0,0 +1,111 @@
+# Cache der Produktionsaufträge (productionOrderNr -> articleNumber, quantity) aus der Produktion.
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from db import session_scope
+from material_cache import MemoryBackend
+from schema_stock import ProductionOrder
+
+logger = logging.getLogger()
+
+# Gültigkeit eines Eintrags im Speicher und in der Tabelle productionOrders, maximale Anzahl an Einträgen im Speicher
+order_cache_ttl = float(os.environ.get('PRODUCTION_ORDER_CACHE_TTL', 3600))
+order_cache_size = int(os.environ.get('PRODUCTION_ORDER_CACHE_SIZE', 512))
+
+
+class ProductionOrderCache(object):
+    """Read-Through-Cache in zwei Stufen: Speicher des Containers (LRU mit TTL) und Tabelle productionOrders, die
+    allen Containern gemeinsam ist und damit auch Kaltstarts bedient.
+
+    Gleichzeitige Abfragen desselben Auftrags im Container warten auf die erste Abfrage, statt die Produktion erneut
+    aufzurufen. Nur erfolgreiche Abfragen werden gespeichert.
+    """
+
+    def __init__(self, size=order_cache_size, ttl=order_cache_ttl):
+        self.ttl = ttl
+        self.memory = MemoryBackend(size=size, ttl=ttl)
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.hits = 0
+        self.table_hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    def get(self, productionOrderNr, fetch):
+        """Gibt (Auftrag als dict mit articleNumber und quantity, Fehler) zurück.
+
+        fetch(productionOrderNr) fragt die Produktion ab und gibt ebenfalls (Auftrag, Fehler) zurück; ist der Fehler
+        nicht None, wird nichts gespeichert und der Fehler unverändert zurückgegeben.
+        """
+        order = self.memory.get(0, productionOrderNr)
+        if order is not None:
+            self.hits = self.hits + 1
+            return order, None
+
+        with self.lock:
+            flight = self.in_flight.get(productionOrderNr)
+            leader = flight is None
+            if leader:
+                flight = self.in_flight[productionOrderNr] = {'event': threading.Event(), 'result': None,
+                                                              'error': None}
+
+        if not leader:
+            flight['event'].wait()
+            self.shared = self.shared + 1
+            if flight['error'] is not None:
+                raise flight['error']
+            return flight['result']
+
+        try:
+            flight['result'] = self._load(productionOrderNr, fetch)
+            return flight['result']
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[productionOrderNr]
+            flight['event'].set()
+
+    def _load(self, productionOrderNr, fetch):
+        order = self._readTable(productionOrderNr)
+        if order is not None:
+            self.table_hits = self.table_hits + 1
+            self.memory.set(0, productionOrderNr, order)
+            return order, None
+
+        self.misses = self.misses + 1
+        order, error = fetch(productionOrderNr)
+        if error is None:
+            self.memory.set(0, productionOrderNr, order)
+            self._writeTable(productionOrderNr, order)
+        return order, error
+
+    def _readTable(self, productionOrderNr):
+        with session_scope() as session:
+            row = session.query(ProductionOrder.articleNumber, ProductionOrder.quantity). \
+                filter((ProductionOrder.productionOrderNr == productionOrderNr) &
+                       (ProductionOrder.fetched >= datetime.now() - timedelta(seconds=self.ttl))).first()
+        return {'articleNumber': row[0], 'quantity': row[1]} if row is not None else None
+
+    def _writeTable(self, productionOrderNr, order):
+        try:
+            with session_scope() as session:
+                session.merge(ProductionOrder(productionOrderNr=productionOrderNr,
+                                              articleNumber=order['articleNumber'], quantity=order['quantity'],
+                                              fetched=datetime.now()))
+        except IntegrityError:
+            # Ein anderer Container hat den Auftrag gleichzeitig gespeichert
+            logger.info('Produktionsauftrag ' + str(productionOrderNr) + ' bereits gespeichert')
+
+    def statistics(self):
+        lookups = self.hits + self.table_hits + self.misses + self.shared
+        return {
+            'hits': self.hits,
+            'table_hits': self.table_hits,
+            'misses': self.misses,
+            'shared': self.shared,
+            'hit_rate': round((lookups - self.misses) / float(lookups), 3) if lookups else 0.0,
+        }
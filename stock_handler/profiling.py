@@ -0,0 +1,197 @@
+# Zeiten, Metriken (CloudWatch Embedded Metric Format) und Profile je Aufruf einer Lambda Function.
+# Identische Kopie in stock_handler/profiling.py und receiving_handler/profiling.py, bitte synchron halten.
+import glob
+import logging
+import os
+import sys
+import threading
+import time
+import simplejson as json
+from contextlib import contextmanager
+from functools import wraps
+
+logger = logging.getLogger()
+
+# Namespace der Metriken, METRICS_EMF=0 schaltet die Ausgabe ab
+metrics_namespace = os.environ.get('METRICS_NAMESPACE', 'EsiMawi')
+metrics_emf = os.environ.get('METRICS_EMF', '1') == '1'
+
+# Profil bei jedem Aufruf (PROFILE_MODE=cprofile oder sample), optional nur für die Functions in PROFILE_HANDLERS
+# (kommagetrennt). Mit PROFILE_HEADER=1 werden außerdem einzelne Aufrufe mit dem Header X-Profile: cprofile|sample
+# profiliert. Standardmäßig aus, da jeder Aufrufer der API den Header setzen kann. Die Profile werden in PROFILE_DIR
+# geschrieben, die ältesten über PROFILE_KEEP hinaus gelöscht.
+profile_mode = os.environ.get('PROFILE_MODE', '')
+profile_handlers = [name.strip() for name in os.environ.get('PROFILE_HANDLERS', '').split(',') if name.strip()]
+profile_header = os.environ.get('PROFILE_HEADER', '0') == '1'
+profile_dir = os.environ.get('PROFILE_DIR', '/tmp')
+profile_keep = int(os.environ.get('PROFILE_KEEP', 20))
+# Abstand der Stichproben des Sampling-Profilers in Sekunden
+sample_interval = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', 0.005))
+
+profile_modes = ('cprofile', 'sample')
+
+
+class InvocationTimer(object):
+    """Zeiten der Phasen (z.B. http, serialization) des aktuellen Aufrufs in Sekunden.
+
+    Die Zeit einer Phase enthält keine SQL-Statements, die währenddessen ausgeführt werden (db_time liefert die
+    bisherige SQL-Zeit des Aufrufs, gesetzt von query_stats). Verschachtelte Aufrufe derselben Phase zählen einmal.
+    """
+
+    def __init__(self):
+        self.db_time = lambda: 0.0
+        self.reset()
+
+    def reset(self):
+        self.phases = {}
+        self.active = set()
+
+    @contextmanager
+    def measure(self, phase):
+        if phase in self.active:
+            yield
+            return
+        self.active.add(phase)
+        db_start = self.db_time()
+        start = time.time()
+        try:
+            yield
+        finally:
+            duration = time.time() - start - (self.db_time() - db_start)
+            self.phases[phase] = self.phases.get(phase, 0.0) + max(duration, 0.0)
+            self.active.discard(phase)
+
+
+invocation_timer = InvocationTimer()
+
+
+def timeDump(schema_class):
+    """Erfasst Schema.dump der Klasse als Phase serialization."""
+    dump = schema_class.dump
+
+    @wraps(dump)
+    def timedDump(self, *args, **kwargs):
+        with invocation_timer.measure('serialization'):
+            return dump(self, *args, **kwargs)
+
+    schema_class.dump = timedDump
+    return schema_class
+
+
+class SamplingProfiler(object):
+    """Nimmt in einem eigenen Thread alle interval Sekunden den Stack des profilierten Threads auf und schreibt die
+    Stacks im Folded-Format (eine Zeile je Stack mit Anzahl, z.B. für flamegraph.pl oder speedscope)."""
+
+    def __init__(self, interval=sample_interval):
+        self.interval = interval
+        self.thread_id = threading.current_thread().ident
+        self.stacks = {}
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='SamplingProfiler')
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(os.path.basename(frame.f_code.co_filename) + ':' + frame.f_code.co_name)
+                frame = frame.f_back
+            key = ';'.join(reversed(stack))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def stop(self, path):
+        self.stopped.set()
+        self.thread.join()
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.stacks.items(), key=lambda item: item[1], reverse=True):
+                f.write(stack + ' ' + str(count) + '\n')
+
+
+class CProfileProfiler(object):
+    """Deterministisches Profil mit cProfile, gespeichert im pstats-Format (python -m pstats, snakeviz)."""
+
+    def __init__(self):
+        import cProfile
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self, path):
+        self.profile.disable()
+        self.profile.dump_stats(path)
+
+
+def requestedProfile(handler, event):
+    """Gibt die angeforderte Art des Profils (cprofile, sample) oder None zurück."""
+    if profile_header and isinstance(event, dict):
+        for name, value in (event.get('headers') or {}).items():
+            if name.lower() == 'x-profile' and value in profile_modes:
+                return value
+    if profile_mode in profile_modes and (not profile_handlers or handler in profile_handlers):
+        return profile_mode
+    return None
+
+
+def startProfile(handler, event):
+    """Startet das angeforderte Profil des Aufrufs und gibt (Art, Profiler) bzw. (None, None) zurück."""
+    mode = requestedProfile(handler, event)
+    if mode is None:
+        return None, None
+    profiler = CProfileProfiler() if mode == 'cprofile' else SamplingProfiler()
+    profiler.start()
+    return mode, profiler
+
+
+def stopProfile(mode, profiler, handler, context):
+    """Beendet das Profil, schreibt es nach profile_dir und gibt den Dateinamen zurück."""
+    if profiler is None:
+        return None
+    request_id = getattr(context, 'aws_request_id', None) or str(int(time.time() * 1000))
+    path = os.path.join(profile_dir, 'profile-%s-%s.%s' % (handler, request_id, 'prof' if mode == 'cprofile'
+                                                            else 'folded'))
+    try:
+        profiler.stop(path)
+        _removeOldProfiles()
+    except (IOError, OSError) as e:
+        logger.warning('Profil konnte nicht geschrieben werden: ' + str(e))
+        return None
+    logger.info('Profil ' + json.dumps({'handler': handler, 'mode': mode, 'file': path, 'request_id': request_id}))
+    return path
+
+
+def _removeOldProfiles():
+    profiles = sorted(glob.glob(os.path.join(profile_dir, 'profile-*')), key=os.path.getmtime, reverse=True)
+    for path in profiles[profile_keep:]:
+        os.remove(path)
+
+
+def emitMetrics(handler, context, wall_time, db_time, queries, failed, profile_file=None):
+    """Gibt die Metriken des Aufrufs als Zeile im CloudWatch Embedded Metric Format auf stdout aus."""
+    if not metrics_emf:
+        return
+    metrics = [('WallTime', 'Milliseconds'), ('DbTime', 'Milliseconds'), ('HttpTime', 'Milliseconds'),
+               ('SerializationTime', 'Milliseconds'), ('Queries', 'Count'), ('Errors', 'Count')]
+    line = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{'Namespace': metrics_namespace, 'Dimensions': [['Function']],
+                                   'Metrics': [{'Name': name, 'Unit': unit} for name, unit in metrics]}],
+        },
+        'Function': handler,
+        'WallTime': round(wall_time * 1000, 3),
+        'DbTime': round(db_time * 1000, 3),
+        'HttpTime': round(invocation_timer.phases.get('http', 0.0) * 1000, 3),
+        'SerializationTime': round(invocation_timer.phases.get('serialization', 0.0) * 1000, 3),
+        'Queries': queries,
+        'Errors': 1 if failed else 0,
+        'RequestId': getattr(context, 'aws_request_id', None),
+    }
+    if profile_file is not None:
+        line['ProfileFile'] = profile_file
+    sys.stdout.write(json.dumps(line) + '\n')
+    sys.stdout.flush()
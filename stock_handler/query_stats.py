@@ -0,0 +1,141 @@
+# Erfassung der SQL-Statements je Aufruf einer Lambda Function.
+# Identische Kopie in stock_handler/query_stats.py und receiving_handler/query_stats.py, bitte synchron halten.
+import logging
+import os
+import random
+import time
+import simplejson as json
+from functools import wraps
+from sqlalchemy import event
+from db import engine, getPoolStatistics
+from profiling import invocation_timer, startProfile, stopProfile, emitMetrics
+
+logger = logging.getLogger()
+
+# SQL_TRACE=1 protokolliert jedes Statement mit Parametern und Dauer (ersetzt echo=True).
+sql_trace = os.environ.get('SQL_TRACE', '0') == '1'
+# Anteil der Aufrufe, deren Zusammenfassung protokolliert wird. Aufrufe mit langsamen Statements oder Fehlern werden
+# immer protokolliert.
+sample_rate = float(os.environ.get('QUERY_LOG_SAMPLE_RATE', 0.1))
+slow_query_ms = float(os.environ.get('SLOW_QUERY_MS', 500))
+# Anzahl der Statements (nach Gesamtdauer) in der Zusammenfassung
+summary_top = int(os.environ.get('QUERY_LOG_TOP', 5))
+
+# Maximale Anzahl an Statements je Lambda Function (Name der Function -> Budget), wird von den Handlern gesetzt.
+# Überschreitungen werden immer protokolliert, benchmarks/query_budget.py prüft die Budgets lokal.
+query_budgets = {}
+
+
+class QueryStatistics(object):
+    """Dauer, Anzahl und Zeilen der SQL-Statements des aktuellen Aufrufs."""
+
+    def __init__(self):
+        self.reset(None)
+
+    def reset(self, handler):
+        self.handler = handler
+        self.count = 0
+        self.rows = 0
+        self.time = 0.0
+        self.slow = 0
+        self.statements = {}
+
+    def record(self, statement, duration, rows):
+        self.count = self.count + 1
+        self.time = self.time + duration
+        if rows is not None and rows > 0:
+            self.rows = self.rows + rows
+        if duration * 1000 >= slow_query_ms:
+            self.slow = self.slow + 1
+
+        entry = self.statements.get(statement)
+        if entry is None:
+            entry = self.statements[statement] = [0, 0.0, 0.0, 0]
+        entry[0] = entry[0] + 1
+        entry[1] = entry[1] + duration
+        entry[2] = max(entry[2], duration)
+        if rows is not None and rows > 0:
+            entry[3] = entry[3] + rows
+
+    def summary(self):
+        top = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)[:summary_top]
+        return {
+            'handler': self.handler,
+            'queries': self.count,
+            'distinct': len(self.statements),
+            'rows': self.rows,
+            'db_ms': round(self.time * 1000, 3),
+            'slow': self.slow,
+            'top': [{'sql': ' '.join(statement.split())[:120], 'count': entry[0], 'ms': round(entry[1] * 1000, 3),
+                     'max_ms': round(entry[2] * 1000, 3), 'rows': entry[3]} for statement, entry in top],
+            'budget': query_budgets.get(self.handler),
+            'pool': getPoolStatistics(),
+        }
+
+    def overBudget(self):
+        budget = query_budgets.get(self.handler)
+        return (budget is not None) and (self.count > budget)
+
+
+query_statistics = QueryStatistics()
+invocation_timer.db_time = lambda: query_statistics.time
+
+
+@event.listens_for(engine, 'before_cursor_execute')
+def _beforeCursorExecute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.time())
+
+
+@event.listens_for(engine, 'after_cursor_execute')
+def _afterCursorExecute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.time() - conn.info['query_start'].pop()
+    rows = cursor.rowcount
+    query_statistics.record(statement, duration, rows)
+
+    if sql_trace:
+        logger.info('SQL ' + json.dumps({'handler': query_statistics.handler, 'ms': round(duration * 1000, 3),
+                                         'rows': rows, 'sql': statement, 'parameters': str(parameters)}))
+    elif duration * 1000 >= slow_query_ms:
+        logger.warning('Langsames SQL ' + json.dumps({'handler': query_statistics.handler,
+                                                       'ms': round(duration * 1000, 3), 'rows': rows,
+                                                       'sql': ' '.join(statement.split())[:500]}))
+
+
+def logQuerySummary(failed=False):
+    """Protokolliert die Zusammenfassung des aktuellen Aufrufs als eine JSON-Zeile (gesampelt)."""
+    over_budget = query_statistics.overBudget()
+    if failed or over_budget or sql_trace or query_statistics.slow > 0 or random.random() < sample_rate:
+        summary = query_statistics.summary()
+        summary['failed'] = failed
+        if over_budget:
+            logger.warning('Query-Budget überschritten ' + json.dumps(summary))
+        else:
+            logger.info('SQL-Zusammenfassung ' + json.dumps(summary))
+
+
+def trackQueries(func):
+    """Decorator für Lambda Functions: erfasst die SQL-Statements des Aufrufs und protokolliert eine Zusammenfassung.
+
+    Zusätzlich werden Gesamt-, SQL-, HTTP- und Serialisierungszeit sowie die Anzahl der Statements als Metriken im
+    Embedded Metric Format ausgegeben und der Aufruf auf Anforderung profiliert (siehe profiling.py).
+    """
+
+    @wraps(func)
+    def wrapper(event, context):
+        query_statistics.reset(func.__name__)
+        invocation_timer.reset()
+        mode, profiler = startProfile(func.__name__, event)
+        start = time.time()
+        failed = True
+        try:
+            response = func(event, context)
+            failed = False
+            return response
+        finally:
+            wall_time = time.time() - start
+            profile_file = stopProfile(mode, profiler, func.__name__, context)
+            logQuerySummary(failed)
+            emitMetrics(func.__name__, context, wall_time, query_statistics.time, query_statistics.count, failed,
+                        profile_file)
+
+    return wrapper
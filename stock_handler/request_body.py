@@ -0,0 +1,82 @@
+import base64
+import binascii
+import os
+import simplejson as json
+from marshmallow import ValidationError
+
+# Maximale Größe des Request-Bodys in Zeichen. Größere Requests werden vor dem Parsen abgewiesen.
+max_body_size = int(os.environ.get('MAX_BODY_SIZE', 262144))
+# Länge eines base64-kodierten Bodys der maximalen Größe (4 Zeichen je angefangene 3 Bytes)
+max_encoded_size = (max_body_size + 2) // 3 * 4
+
+
+def _rejectConstant(constant):
+    raise ValueError('Ungültiger JSON-Wert: ' + constant)
+
+
+def _errorResponse(statusCode, message):
+    return {
+        "statusCode": statusCode,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+        },
+        "body": json.dumps({"message": message}),
+    }
+
+
+def parseBody(event):
+    """Liest den Body eines API Gateway Events als striktes JSON.
+
+    Returns
+    ------
+    (Daten, None) bei Erfolg, sonst (None, API Gateway Antwort mit Statuscode 400 bzw. 413)
+    """
+    body = event.get('body')
+    if body is None:
+        return None, _errorResponse(400, 'Der Request enthält keinen Body.')
+
+    # Größe vor dem Dekodieren prüfen
+    base64_encoded = event.get('isBase64Encoded')
+    if len(body) > (max_encoded_size if base64_encoded else max_body_size):
+        return None, _errorResponse(413, 'Der Request ist zu groß (maximal ' + str(max_body_size) + ' Zeichen).')
+
+    if base64_encoded:
+        try:
+            body = base64.b64decode(body, validate=True)
+        except (binascii.Error, ValueError) as e:
+            return None, _errorResponse(400, 'Der Body ist nicht gültig base64-kodiert: ' + str(e))
+        if len(body) > max_body_size:
+            return None, _errorResponse(413, 'Der Request ist zu groß (maximal ' + str(max_body_size) + ' Zeichen).')
+
+    try:
+        return json.loads(body, parse_constant=_rejectConstant), None
+    except ValueError as e:
+        return None, _errorResponse(400, 'Der Body ist kein gültiges JSON: ' + str(e))
+
+
+def loadBody(data, schema, many=False):
+    """Validiert bereits gelesene Daten mit dem übergebenen Schema.
+
+    Returns
+    ------
+    (Daten, None) bei Erfolg, sonst (None, API Gateway Antwort mit Statuscode 400)
+    """
+    try:
+        return schema.load(data, many=many), None
+    except ValidationError as e:
+        return None, _errorResponse(400, 'Ungültige Daten: ' + json.dumps(e.messages))
+
+
+def decodeBody(event, schema, many=False):
+    """Liest den Body eines API Gateway Events als striktes JSON und validiert ihn mit dem übergebenen Schema.
+
+    Returns
+    ------
+    (Daten, None) bei Erfolg, sonst (None, API Gateway Antwort mit Statuscode 400 bzw. 413)
+    """
+    data, error = parseBody(event)
+    if error is not None:
+        return None, error
+    return loadBody(data, schema, many=many)
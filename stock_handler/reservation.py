@@ -0,0 +1,177 @@
+from collections import defaultdict
+from sqlalchemy import func, and_, or_
+from schema_stock import StockBalance, GoodsOrder, GoodsOrderPosition, Material
+
+
+def lockMaterials(session, fkmaterials, productionOrderNrs):
+    """Sperrt die Materialien aller Orders eines Requests bis zum Ende der Transaktion (SELECT ... FOR UPDATE).
+
+    Parallele Reservierungen desselben Materials werden dadurch nacheinander ausgeführt. Die Sperren werden immer in
+    aufsteigender Reihenfolge der Materialnummer angefordert, um Deadlocks zwischen den Transaktionen zu vermeiden.
+    """
+    # Lesen der jeweils zuletzt bestätigten Daten statt eines Snapshots vom Beginn der Transaktion
+    if session.bind.dialect.name == 'mysql':
+        session.connection(execution_options={'isolation_level': 'READ COMMITTED'})
+
+    fkmaterials = set(fkmaterials)
+    if len(productionOrderNrs) > 0:
+        fkmaterials.update(fkmaterial for (fkmaterial,) in session.query(StockBalance.fkmaterials).
+                           filter(StockBalance.productionOrderNr.in_(productionOrderNrs)).distinct())
+    if len(fkmaterials) <= 0:
+        return
+
+    session.query(Material.idmaterials).filter(Material.idmaterials.in_(fkmaterials)). \
+        order_by(Material.idmaterials).with_for_update().all()
+
+
+def loadStock(session, fkmaterials, productionOrderNrs):
+    """Ermittelt den Bestand je (ProductionOrderNr, Material, Lagerplatz) für alle Materialien und
+    Produktionsaufträge eines Requests mit einer Abfrage auf stockBalances, älteste Einbuchung zuerst (FIFO)."""
+    conditions = []
+    if len(fkmaterials) > 0:
+        conditions.append(and_(StockBalance.fkmaterials.in_(fkmaterials), StockBalance.productionOrderNr != ''))
+    if len(productionOrderNrs) > 0:
+        conditions.append(StockBalance.productionOrderNr.in_(productionOrderNrs))
+    if len(conditions) <= 0:
+        return []
+
+    return session.query(func.ifnull(func.sum(StockBalance.quantity), 0).label('quantity'),
+                         func.min(StockBalance.first_booking_date).label('booking_date'),
+                         StockBalance.productionOrderNr, StockBalance.fkmaterials, StockBalance.fkplaces). \
+        filter(or_(*conditions)). \
+        group_by(StockBalance.productionOrderNr, StockBalance.fkmaterials, StockBalance.fkplaces). \
+        having(func.ifnull(func.sum(StockBalance.quantity), 0) > 0). \
+        order_by(func.min(StockBalance.first_booking_date), StockBalance.productionOrderNr,
+                 StockBalance.fkplaces).all()
+
+
+def loadReservedStock(session, productionOrderNrs):
+    """Ermittelt den offen reservierten Bestand je (ProductionOrderNr, Lagerplatz) mit einer Abfrage."""
+    reserved = defaultdict(int)
+    if len(productionOrderNrs) <= 0:
+        return reserved
+
+    reserved_query = session.query(func.ifnull(func.sum(GoodsOrderPosition.quantity), 0),
+                                   GoodsOrderPosition.productionOrderNr, GoodsOrderPosition.fkplaces). \
+        filter(GoodsOrderPosition.productionOrderNr.in_(productionOrderNrs) &
+               ((GoodsOrderPosition.done != 1) | (GoodsOrderPosition.done.is_(None)))). \
+        group_by(GoodsOrderPosition.productionOrderNr, GoodsOrderPosition.fkplaces)
+
+    for quantity, productionOrderNr, fkplaces in reserved_query:
+        reserved[(productionOrderNr, fkplaces)] = quantity
+    return reserved
+
+
+def reserveWithArticelNr(lots, reserved, fkmaterials, quantity):
+    """Reserviert die Menge eines Materials FIFO auf die Bestände der Produktionsaufträge (im Speicher)."""
+    if len(lots) <= 0:
+        # Problem: Für die Materialnummer gibt es keinen Bestand, daher kann dieser auch nicht ausgeliefert werden.
+        return None, 'Für den Artikel ' + str(fkmaterials) + ' gibt es keinen Bestand.'
+
+    # Anlegen des Reservierungskopfes
+    new_goodsOrder = GoodsOrder(fkmaterials=fkmaterials)
+
+    # Reservieren der Menge
+    remaining_quantity = quantity
+    for lot in lots:
+        if remaining_quantity <= 0:
+            break
+
+        # Berechnung des nicht reservierten Bestands
+        not_reserved_stock = lot.quantity - reserved[(lot.productionOrderNr, lot.fkplaces)]
+
+        # Der Bestand der ProductionOrderNr ist komplett reserviert. Zur nächsten ProductionOrderNr springen.
+        if not_reserved_stock <= 0:
+            continue
+
+        # Menge der Reservierung ermitteln: entweder die komplette Restmenge oder der komplette freie Bestand
+        booked_stock = min(not_reserved_stock, remaining_quantity)
+
+        # Buchen der Reservierung
+        new_goodsOrder.goodsOrderPos.append(GoodsOrderPosition(productionOrderNr=lot.productionOrderNr,
+                                                               quantity=booked_stock, fkplaces=lot.fkplaces))
+        reserved[(lot.productionOrderNr, lot.fkplaces)] += booked_stock
+        remaining_quantity = remaining_quantity - booked_stock
+
+    if remaining_quantity > 0:
+        # Fehler:  Der Bestand für die Reservierung ist nicht ausreichend!
+        return new_goodsOrder, 'Der Bestand für den Artikel ' + str(fkmaterials) + \
+               ' ist nicht ausreichend. Insgesamt  konnten ' + str(remaining_quantity) + ' Stück nicht gebucht werden.'
+
+    return new_goodsOrder, ''
+
+
+def reserveWithProdOrderNr(lots, reserved, productionOrderNr):
+    """Reserviert den gesamten freien Bestand eines Produktionsauftrags (im Speicher)."""
+    if len(lots) <= 0:
+        # Der Produktionsauftrag existiert nicht (mehr)
+        return None, 'Der Produktionsauftrag ' + productionOrderNr + ' existiert nicht.'
+
+    # Erst prüfen, dann buchen: Ist ein Lagerplatz bereits vollständig reserviert, wird nichts angelegt.
+    not_reserved = []
+    for lot in lots:
+        not_reserved_stock = lot.quantity - reserved[(productionOrderNr, lot.fkplaces)]
+        if not_reserved_stock <= 0:
+            # Der Produktionauftrag wurde vollständig reserviert
+            return None, 'Der Produktionsauftrag ' + productionOrderNr + ' wurde bereits vollständig reserviert.'
+        not_reserved.append((lot, not_reserved_stock))
+
+    # Anlegen des Reservierungskopfes und Buchen der Reservierungen
+    new_goodsOrder = GoodsOrder(fkmaterials=lots[0].fkmaterials)
+    for lot, not_reserved_stock in not_reserved:
+        new_goodsOrder.goodsOrderPos.append(GoodsOrderPosition(productionOrderNr=productionOrderNr,
+                                                               quantity=not_reserved_stock, fkplaces=lot.fkplaces))
+        reserved[(productionOrderNr, lot.fkplaces)] += not_reserved_stock
+
+    return new_goodsOrder, ''
+
+
+def reserveOrders(session, orders):
+    """Reserviert alle Orders eines Requests.
+
+    Die betroffenen Materialien werden zuerst gesperrt. Danach werden Bestände und offene Reservierungen aller
+    Materialien und Produktionsaufträge mit je einer aggregierten Abfrage gelesen, die Verteilung erfolgt im Speicher
+    und die Reservierungen werden gemeinsam eingefügt. Muss als erste Operation einer Transaktion aufgerufen werden
+    (siehe db.runTransaction).
+
+    Returns
+    ------
+    Liste von (Reservierung, Fehlermeldung) in der Reihenfolge der Orders
+    """
+    fkmaterials = set(order.get('fkmaterials') for order in orders
+                      if (order.get('fkmaterials') is not None) and (order.get('quantity') is not None))
+    productionOrderNrs = set(order.get('productionOrderNr') for order in orders
+                             if order.get('productionOrderNr') is not None)
+
+    lockMaterials(session, fkmaterials, productionOrderNrs)
+    stock = loadStock(session, fkmaterials, productionOrderNrs)
+    reserved = loadReservedStock(session, set(lot.productionOrderNr for lot in stock))
+
+    lots_by_material = defaultdict(list)
+    lots_by_productionOrderNr = defaultdict(list)
+    for lot in stock:
+        if lot.fkmaterials in fkmaterials and lot.productionOrderNr != '':
+            lots_by_material[lot.fkmaterials].append(lot)
+        if lot.productionOrderNr in productionOrderNrs:
+            lots_by_productionOrderNr[lot.productionOrderNr].append(lot)
+
+    # Eine Order kann folgendes enthalten:
+    # - Materialnummer + Menge : Ermitteln von ProductionOrders + Reservieren
+    # - ProductionOrderNr : Reservieren
+    results = []
+    for order in orders:
+        if (order.get('fkmaterials') is not None) and (order.get('quantity') is not None):
+            reservation, error_message = reserveWithArticelNr(lots_by_material[order.get('fkmaterials')], reserved,
+                                                              order.get('fkmaterials'), order.get('quantity'))
+        elif order.get('productionOrderNr') is not None:
+            reservation, error_message = reserveWithProdOrderNr(
+                lots_by_productionOrderNr[order.get('productionOrderNr')], reserved, order.get('productionOrderNr'))
+        else:
+            reservation = None
+            error_message = 'Bad Request.'
+        results.append((reservation, error_message))
+
+    # Reservierungsköpfe einfügen; die Positionen mit bekanntem Schlüssel werden dabei gesammelt (executemany) gebucht.
+    session.add_all([reservation for reservation, error_message in results if reservation is not None])
+    session.flush()
+    return results
@@ -3,9 +3,10 @@ from marshmallow_sqlalchemy.fields import Nested
 from marshmallow import Schema, fields
 from sqlalchemy.dialects.mysql import TINYINT, DOUBLE
 from datetime import datetime as dt
-from sqlalchemy import Column, ForeignKey, Integer, String, DateTime
+from sqlalchemy import Column, ForeignKey, Integer, String, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
+from profiling import timeDump
 
 Base = declarative_base()
 dtf = "%Y/%m/%d %H:%M:%S"
@@ -65,6 +66,36 @@ class StockEntry(Base):
     opened = Column(TINYINT, nullable=False)
     quantity = Column(Integer, nullable=False)
     booking_date = Column(DateTime, nullable=False, default=dt.now)
+    # Gesetzt bei Snapshot-Zeilen der Verdichtung (compaction.py): Summe aller Buchungen vor diesem Zeitpunkt
+    snapshot_date = Column(DateTime)
+
+
+class StockEntryArchive(Base):
+    __tablename__ = 'stockEntriesArchive'
+    idstockEntries = Column(Integer, primary_key=True, autoincrement=False)
+    fkplaces = Column(Integer, nullable=False)
+    fkmaterials = Column(Integer, nullable=False)
+    productionOrderNr = Column(String(45))
+    opened = Column(TINYINT, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    booking_date = Column(DateTime, nullable=False)
+    # Snapshot-Zeile in stockEntries, in der die Buchung enthalten ist
+    fksnapshot = Column(Integer, nullable=False)
+    archive_date = Column(DateTime, nullable=False, default=dt.now)
+
+
+class StockBalance(Base):
+    __tablename__ = 'stockBalances'
+    fkmaterials = Column(Integer, ForeignKey('materials.idmaterials'), primary_key=True)
+    fkplaces = Column(Integer, ForeignKey('places.idplaces'), primary_key=True)
+    productionOrderNr = Column(String(45), primary_key=True, default='')
+    opened = Column(TINYINT, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    first_booking_date = Column(DateTime, nullable=False, default=dt.now)
+
+    # Bestände je Produktionsauftrag (Reservierung, Sperre der Materialien). Ohne Menge, da sie bei jeder Buchung
+    # geändert wird.
+    __table_args__ = (Index('ix_stockBalances_order_place_material', 'productionOrderNr', 'fkplaces', 'fkmaterials'),)
 
 
 class GoodsOrder(Base):
@@ -84,6 +115,9 @@ class GoodsOrderPosition(Base):
     done = Column(TINYINT)
     fkplaces = Column(Integer, ForeignKey('places.idplaces'), primary_key=True)
 
+    # Offen reservierte Menge je Produktionsauftrag und Lagerplatz
+    __table_args__ = (Index('ix_goodsOrdersPos_order_place_done', 'productionOrderNr', 'fkplaces', 'done', 'quantity'),)
+
     goodsOrder = relationship("GoodsOrder", back_populates="goodsOrderPos")
     place = relationship('Place', back_populates="reservations")
 
@@ -108,39 +142,120 @@ class ReceivingPosition(Base):
     price = Column(DOUBLE)
     fkordersPos = Column(Integer, ForeignKey('ordersPos.idordersPos'))
 
+    # Wareneingänge je Material für die Bewertung (LIFO), gleicher Index in schema_receiving.py
+    __table_args__ = (Index('ix_receivingsPos_material', 'fkmaterials', 'fkreceivings', 'position', 'quantity',
+                            'price'),)
+
     material = relationship("Material", back_populates="receivingPos")
     receiving = relationship("Receiving", back_populates="receivingPos")
 
 
+class MaterialValuation(Base):
+    __tablename__ = 'materialValuations'
+    fkmaterials = Column(Integer, ForeignKey('materials.idmaterials'), primary_key=True)
+    layers = Column(Text, nullable=False)
+    updated = Column(DateTime, nullable=False, default=dt.now, onupdate=dt.now)
+
+
+class CacheVersion(Base):
+    __tablename__ = 'cacheVersions'
+    name = Column(String(45), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class ProductionOrder(Base):
+    __tablename__ = 'productionOrders'
+    productionOrderNr = Column(String(45), primary_key=True)
+    articleNumber = Column(Integer, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    fetched = Column(DateTime, nullable=False, default=dt.now)
+
+
+class OutboxEvent(Base):
+    __tablename__ = 'outboxEvents'
+    idoutboxEvents = Column(Integer, primary_key=True)
+    idempotency_key = Column(String(36), nullable=False, unique=True)
+    target = Column(String(20), nullable=False)
+    payload = Column(Text, nullable=False)
+    state = Column(String(10), nullable=False, default='pending')
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt = Column(DateTime, nullable=False, default=dt.now)
+    last_error = Column(String(255))
+    creation_date = Column(DateTime, nullable=False, default=dt.now)
+    delivery_date = Column(DateTime)
+
+    # Fällige Ereignisse (claimEvents)
+    __table_args__ = (Index('ix_outboxEvents_state_next_attempt', 'state', 'next_attempt'),)
+
+
 # SCHEMA
-class MaterialSchema(SQLAlchemyAutoSchema):
-    class Meta:
-        model = Material
+class LazySchema(object):
+    """Platzhalter für eine Schema-Klasse. SQLAlchemyAutoSchema liest das Modell bei der Definition der Klasse, daher
+    wird jede Klasse erst beim ersten Aufruf gebaut und nur von den Lambda Functions, die sie verwenden."""
 
+    def __init__(self, build):
+        self.build = build
+        self.schema_class = None
 
-class PlaceSchema(SQLAlchemyAutoSchema):
-    class Meta:
-        model = Place
+    def __call__(self, *args, **kwargs):
+        if self.schema_class is None:
+            self.schema_class = timeDump(self.build())
+        return self.schema_class(*args, **kwargs)
 
 
-class InventorySchema(SQLAlchemyAutoSchema):
-    class Meta:
-        model = Inventory
-        include_fk = True
-        exclude = ['value_of_materials']
+def _materialSchema():
+    class MaterialSchema(SQLAlchemyAutoSchema):
+        class Meta:
+            model = Material
 
-    value_of_materials = auto_field(dump_only=True)
+    return MaterialSchema
 
-    # Override materials field to use a nested representation rather than pks
-    material = Nested(lambda: MaterialSchema(), dump_only=True)
-    place = Nested(lambda: PlaceSchema(), dump_only=True)
 
+MaterialSchema = LazySchema(_materialSchema)
 
-class StockEntrySchema(SQLAlchemyAutoSchema):
-    class Meta:
-        model = StockEntry
-        include_fk = True
-        datetimeformat = dtf
+
+def _placeSchema():
+    class PlaceSchema(SQLAlchemyAutoSchema):
+        class Meta:
+            model = Place
+
+    return PlaceSchema
+
+
+PlaceSchema = LazySchema(_placeSchema)
+
+
+def _inventorySchema():
+    class InventorySchema(SQLAlchemyAutoSchema):
+        class Meta:
+            model = Inventory
+            include_fk = True
+            exclude = ['value_of_materials']
+
+        value_of_materials = auto_field(dump_only=True)
+
+        # Override materials field to use a nested representation rather than pks
+        material = Nested(lambda: MaterialSchema(), dump_only=True)
+        place = Nested(lambda: PlaceSchema(), dump_only=True)
+
+    return InventorySchema
+
+
+InventorySchema = LazySchema(_inventorySchema)
+
+
+def _stockEntrySchema():
+    class StockEntrySchema(SQLAlchemyAutoSchema):
+        class Meta:
+            model = StockEntry
+            include_fk = True
+            exclude = ('snapshot_date',)
+            datetimeformat = dtf
+
+    return StockEntrySchema
+
+
+StockEntrySchema = LazySchema(_stockEntrySchema)
 
 
 class BookMaterialSchema(Schema):
@@ -161,22 +276,34 @@ class BookProductFromStockSchema(Schema):
     fkgoodsOrders = fields.Integer(required=True)
 
 
-class ReservationOrderPositionSchema(SQLAlchemyAutoSchema):
-    class Meta:
-        model = GoodsOrderPosition
-        include_fk = True
-        load_instance = True
-        exclude = ["done"]
+def _reservationOrderPositionSchema():
+    class ReservationOrderPositionSchema(SQLAlchemyAutoSchema):
+        class Meta:
+            model = GoodsOrderPosition
+            include_fk = True
+            load_instance = True
+            exclude = ["done"]
+
+    return ReservationOrderPositionSchema
+
+
+ReservationOrderPositionSchema = LazySchema(_reservationOrderPositionSchema)
+
+
+def _reservationOrderSchema():
+    class ReservationOrderSchema(SQLAlchemyAutoSchema):
+        class Meta:
+            model = GoodsOrder
+            include_fk = True
+            load_instance = True
+            exclude = ["idgoodsOrders"]
+
+        goodsOrderPos = Nested(ReservationOrderPositionSchema(), many=True)
 
+    return ReservationOrderSchema
 
-class ReservationOrderSchema(SQLAlchemyAutoSchema):
-    class Meta:
-        model = GoodsOrder
-        include_fk = True
-        load_instance = True
-        exclude = ["idgoodsOrders"]
 
-    goodsOrderPos = Nested(ReservationOrderPositionSchema(), many=True)
+ReservationOrderSchema = LazySchema(_reservationOrderSchema)
 
 
 class GoodsOrderSchema(Schema):
@@ -186,5 +313,5 @@ class GoodsOrderSchema(Schema):
 
 
 class ReservationResponseSchema(Schema):
-    reservation = Nested(ReservationOrderSchema())
+    reservation = Nested(lambda: ReservationOrderSchema())
     error_message = fields.String()
@@ -0,0 +1,131 @@
+import simplejson as json
+from bisect import bisect_right
+from collections import defaultdict
+from schema_stock import Receiving, ReceivingPosition, MaterialValuation
+
+
+def lifoValue(receivings, quantity):
+    """Bewertet eine Menge mit den Preisen der übergebenen, nach Datum absteigend sortierten Wareneingänge (LIFO)."""
+
+    # Keine Wareneingänge vorhanden.
+    if (receivings is None) or (len(receivings) <= 0):
+        return 0.0
+
+    # Einzelne Wareneingänge verechnen.
+    remaining_quantity = quantity
+    value = 0.0
+    for receiving in receivings:
+        # Keine zu verrechnende Menge übrig.
+        if remaining_quantity <= 0:
+            break
+
+        # Kein Preis vorhanden. Ermittlung abbrechen, da die Kennzahl nun nicht valide berechnet werden kann.
+        if receiving.price is None:
+            value = 0.0
+            break
+
+        # Wareneingang hat keine Menge.
+        if receiving.quantity <= 0:
+            continue
+
+        # Menge ermitteln:
+        current_quantity = 0
+        if receiving.quantity >= remaining_quantity:
+            # Die Menge des Wareingangs ist größer als die Restmenge. -> Die komplette Restmenge mit dem
+            # Preis des Wareingangs verrechnen.
+            current_quantity = remaining_quantity
+        elif remaining_quantity > receiving.quantity:
+            # Die Restmenge ist größer als die Menge des Wareingangs -> Die komplette Menge des Wareingangs
+            # verrechnen.
+            current_quantity = receiving.quantity
+
+        # Wert summieren.
+        value = value + (current_quantity * float(receiving.price))
+        remaining_quantity = remaining_quantity - current_quantity
+
+    if remaining_quantity <= 0:
+        return value
+    else:
+        return 0.0
+
+
+def loadReceivings(session, fkmaterials):
+    """Lädt die Wareneingänge aller übergebenen Materialien mit einer Abfrage, gruppiert nach Material und
+    absteigend nach Datum sortiert."""
+    receivings = defaultdict(list)
+    if len(fkmaterials) <= 0:
+        return receivings
+
+    receiving_query = session.query(ReceivingPosition.fkmaterials, ReceivingPosition.price,
+                                    ReceivingPosition.quantity, Receiving.receiving_date). \
+        filter(ReceivingPosition.fkmaterials.in_(fkmaterials)). \
+        filter(ReceivingPosition.fkreceivings == Receiving.id). \
+        order_by(ReceivingPosition.fkmaterials, Receiving.receiving_date.desc(), ReceivingPosition.fkreceivings.desc(),
+                 ReceivingPosition.position.desc())
+
+    for receiving in receiving_query:
+        receivings[receiving.fkmaterials].append(receiving)
+    return receivings
+
+
+def layerValue(valuation, quantity):
+    """Bewertet eine Menge anhand der gespeicherten Bewertungsschichten eines Materials (LIFO).
+
+    Die Schichten werden von receiving_handler/valuation.py gepflegt (älteste zuerst, mit kumulierten Mengen und
+    Werten). Die Grenze der verrechneten Menge wird per binärer Suche ermittelt, der Wert ergibt sich aus der Differenz
+    der kumulierten Werte. Gegenüber lifoValue (Summe von der jüngsten Schicht an) weicht das Ergebnis nur durch die
+    Rundung der Gleitkommazahlen ab, höchstens um etwa 1e-12 des Werts aller Schichten.
+    """
+    cum_quantity = valuation['cumQuantity']
+    cum_value = valuation['cumValue']
+
+    # Keine Wareneingänge vorhanden oder keine zu verrechnende Menge.
+    if (len(cum_quantity) <= 0) or (quantity <= 0):
+        return 0.0
+
+    total_quantity = cum_quantity[-1]
+
+    # Die jüngste Schicht ohne Preis wird erreicht, bevor die Menge verrechnet ist.
+    no_price = valuation['noPrice']
+    if (no_price >= 0) and (total_quantity - cum_quantity[no_price] < quantity):
+        return 0.0
+
+    # Nicht genügend Wareneingänge für die Menge vorhanden.
+    if total_quantity < quantity:
+        return 0.0
+
+    # Nicht verrechnete (älteste) Menge und die Schicht, in der die Verrechnung endet.
+    remaining_quantity = total_quantity - quantity
+    index = bisect_right(cum_quantity, remaining_quantity)
+    price = float(valuation['layers'][index][4])
+    return (cum_quantity[index] - remaining_quantity) * price + (cum_value[-1] - cum_value[index])
+
+
+def calcMaterialValues(session, positions):
+    """Ermittelt die Werte beliebig vieler (Material, Menge)-Paare mit nur einer Datenbankabfrage (LIFO).
+
+    Verwendet die gespeicherten Bewertungsschichten. Nur für Materialien ohne Schichten werden die Wareneingänge
+    (ebenfalls mit einer Abfrage) gelesen. Die Reihenfolge der Rückgabe entspricht der Reihenfolge der übergebenen
+    Paare.
+    """
+    fkmaterials = set(fkmaterials for fkmaterials, quantity in positions)
+
+    valuations = {}
+    if len(fkmaterials) > 0:
+        for valuation in session.query(MaterialValuation).filter(MaterialValuation.fkmaterials.in_(fkmaterials)):
+            valuations[valuation.fkmaterials] = json.loads(valuation.layers)
+
+    receivings = loadReceivings(session, fkmaterials - set(valuations))
+
+    values = []
+    for fkmaterials, quantity in positions:
+        if fkmaterials in valuations:
+            values.append(layerValue(valuations[fkmaterials], quantity))
+        else:
+            values.append(lifoValue(receivings.get(fkmaterials), quantity))
+    return values
+
+
+def calcMaterialValue(session, fkmaterials, quantity):
+    """Ermittelt den Wert des Materials mittels des Preises aus den letzten Wareneingängen (LIFO)."""
+    return calcMaterialValues(session, [(fkmaterials, quantity)])[0]
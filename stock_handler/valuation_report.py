@@ -0,0 +1,238 @@
+import argparse
+import csv
+import sys
+from datetime import date
+import numpy as np
+from schema_stock import StockEntry, StockEntryArchive, Receiving, ReceivingPosition
+
+# Bewertungsbericht: Bestand und LIFO-Wert aller Materialien zu beliebig vielen Stichtagen (z.B. Monatsenden).
+# Buchungen und Wareneingänge werden je einmal als Spalten (NumPy-Arrays) geladen. Die Bestände zu den Stichtagen
+# ergeben sich aus kumulierten Summen, die LIFO-Werte (Regeln wie valuation.layerValue) aus den kumulierten Mengen und
+# Werten der Wareneingänge per binärer Suche (np.searchsorted) - für alle Materialien und Stichtage gleichzeitig.
+# Aufruf: python valuation_report.py [--from JJJJ-MM] [--to JJJJ-MM] [--dates ...] [--format csv|parquet] [--output ...]
+
+report_columns = ['fkmaterials', 'date', 'quantity', 'value']
+report_formats = ('csv', 'parquet')
+# Höchstzahl der Stichtage je Bericht
+max_report_dates = 240
+
+
+def parquetAvailable():
+    """Parquet wird nur mit pyarrow unterstützt (nicht Teil von requirements.txt)."""
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        return False
+    return hasattr(pyarrow.parquet, 'write_table')
+
+
+def monthEnds(first, last):
+    """Gibt die Monatsenden der Monate first bis last (je JJJJ-MM) als datetime64[D] zurück."""
+    months = np.arange(np.datetime64(first, 'M'), np.datetime64(last, 'M') + 1)
+    return (months + 1).astype('datetime64[D]') - 1
+
+
+def parseReportParameters(params):
+    """Liest die Query-Parameter des Bewertungsberichts.
+
+    dates: kommagetrennte Stichtage (JJJJ-MM-TT), sonst die Monatsenden von from bis to (JJJJ-MM, ohne Angabe die
+    letzten zwölf abgeschlossenen Monate)
+    format: csv (Standard) oder parquet
+
+    Löst bei ungültigen Parametern einen ValueError aus.
+    """
+    params = params or {}
+    options = dict(format=params.get('format') or 'csv')
+    if options['format'] not in report_formats:
+        raise ValueError('Der Parameter format muss csv oder parquet sein.')
+    if options['format'] == 'parquet' and not parquetAvailable():
+        raise ValueError('Das Format parquet wird nicht unterstützt (pyarrow fehlt).')
+
+    try:
+        if params.get('dates'):
+            dates = np.unique(np.array([value.strip() for value in params.get('dates').split(',') if value.strip()],
+                                       dtype='datetime64[D]'))
+        else:
+            last = params.get('to') or str(np.datetime64(date.today(), 'M') - 1)
+            first = params.get('from') or str(np.datetime64(last, 'M') - 11)
+            dates = monthEnds(first, last)
+    except ValueError:
+        raise ValueError('Ungültiger Stichtag, erwartet werden JJJJ-MM-TT (dates) bzw. JJJJ-MM (from, to).')
+
+    if not (0 < len(dates) <= max_report_dates):
+        raise ValueError('Der Bericht muss zwischen 1 und ' + str(max_report_dates) + ' Stichtage umfassen.')
+    options['dates'] = dates
+    return options
+
+
+def loadEntries(session):
+    """Lädt alle Lagerbuchungen (Journal ohne Snapshot-Zeilen sowie Archiv der Verdichtung) mit einer Abfrage.
+
+    Returns
+    ------
+    (fkmaterials, quantity, booking_date) als Arrays
+    """
+    live = session.query(StockEntry.fkmaterials, StockEntry.quantity, StockEntry.booking_date). \
+        filter(StockEntry.snapshot_date.is_(None))
+    archived = session.query(StockEntryArchive.fkmaterials, StockEntryArchive.quantity,
+                             StockEntryArchive.booking_date)
+    rows = live.union_all(archived).all()
+    return (np.array([row[0] for row in rows], dtype=np.int64),
+            np.array([row[1] for row in rows], dtype=np.int64),
+            np.array([row[2] for row in rows], dtype='datetime64[s]'))
+
+
+def loadLayers(session):
+    """Lädt alle Wareneingangspositionen mit Wareneingangsdatum mit einer Abfrage.
+
+    Returns
+    ------
+    (fkmaterials, fkreceivings, position, quantity, price, receiving_date) als Arrays, fehlende Preise als NaN und
+    fehlende Daten als NaT
+    """
+    rows = session.query(ReceivingPosition.fkmaterials, ReceivingPosition.fkreceivings, ReceivingPosition.position,
+                         ReceivingPosition.quantity, ReceivingPosition.price, Receiving.receiving_date). \
+        filter(ReceivingPosition.fkreceivings == Receiving.id).all()
+    return (np.array([row[0] for row in rows], dtype=np.int64),
+            np.array([row[1] for row in rows], dtype=np.int64),
+            np.array([row[2] for row in rows], dtype=np.int64),
+            np.array([row[3] or 0 for row in rows], dtype=np.int64),
+            np.array([row[4] for row in rows], dtype=np.float64),
+            np.array([row[5] for row in rows], dtype='datetime64[s]'))
+
+
+def valuationReport(entries, layers, dates):
+    """Berechnet Bestand und LIFO-Wert aller gebuchten Materialien zu allen Stichtagen.
+
+    Ein Stichtag umfasst alle Buchungen und Wareneingänge bis einschließlich dieses Tages. Bewertet wird wie in
+    valuation.layerValue mit den bis zum Stichtag eingegangenen Wareneingängen: Reichen sie für den Bestand nicht oder
+    wird dabei ein Wareneingang ohne Preis erreicht, ist der Wert 0. Wareneingänge ohne Datum gelten als älteste.
+
+    Alle Materialien werden in gemeinsamen Arrays verarbeitet: Der Schlüssel (Material, Zeitpunkt) wird als eine
+    Ganzzahl (Materialindex * span + Sekunden) gebildet, sodass ein np.searchsorted über alle Buchungen bzw.
+    Wareneingänge die Grenzen je Material und Stichtag liefert.
+
+    Returns
+    ------
+    dict mit den Arrays fkmaterials, date, quantity und value, sortiert nach Material und Stichtag
+    """
+    entry_materials, entry_quantities, entry_dates = entries
+    layer_materials, layer_receivings, layer_positions, layer_quantities, layer_prices, layer_dates = layers
+    dates = np.unique(np.asarray(dates, dtype='datetime64[D]'))
+
+    # Materialien mit Buchungen; Wareneingänge anderer Materialien werden nicht benötigt
+    materials, entry_index = np.unique(entry_materials, return_inverse=True)
+    known = np.isin(layer_materials, materials)
+    layer_index = np.searchsorted(materials, layer_materials[known])
+
+    # Zeitpunkte in Sekunden. Stichtag: Beginn des Folgetags (ausschließlich)
+    cutoff_seconds = (dates + 1).astype('datetime64[s]').astype(np.int64)
+    entry_seconds = entry_dates.astype(np.int64)
+    undated = np.isnat(layer_dates[known])
+    layer_seconds = layer_dates[known].astype(np.int64)
+    seconds = np.concatenate((cutoff_seconds, entry_seconds, layer_seconds[~undated]))
+    origin = seconds.min() - 1
+    span = seconds.max() - origin + 1
+
+    # Raster Material x Stichtag mit dem ersten Schlüssel des Materials und dem Schlüssel des Stichtags
+    grid_index = np.repeat(np.arange(len(materials), dtype=np.int64), len(dates))
+    start_keys = grid_index * span
+    cutoff_keys = start_keys + (np.tile(cutoff_seconds, len(materials)) - origin)
+
+    # Bestand: kumulierte Buchungen bis zum Stichtag abzüglich der kumulierten Buchungen vorheriger Materialien
+    entry_keys = entry_index.astype(np.int64) * span + (entry_seconds - origin)
+    order = np.argsort(entry_keys, kind='mergesort')
+    entry_keys = entry_keys[order]
+    entry_cumulative = np.concatenate(([0], np.cumsum(entry_quantities[order])))
+    quantities = entry_cumulative[np.searchsorted(entry_keys, cutoff_keys)] - \
+        entry_cumulative[np.searchsorted(entry_keys, start_keys)]
+
+    # Wareneingänge je Material älteste zuerst (Datum, Wareneingang, Position)
+    layer_keys = layer_index.astype(np.int64) * span + np.where(undated, 0, layer_seconds - origin)
+    order = np.lexsort((layer_positions[known], layer_receivings[known], layer_keys))
+    layer_keys = layer_keys[order]
+    prices = layer_prices[known][order]
+    has_price = ~np.isnan(prices)
+    prices = np.where(has_price, prices, 0.0)
+    counted = np.where(has_price & (layer_quantities[known][order] > 0), layer_quantities[known][order], 0)
+    cum_quantity = np.cumsum(counted)
+    cum_value = np.cumsum(counted * prices)
+    pad_quantity = np.concatenate(([0], cum_quantity))
+    pad_value = np.concatenate(([0.0], cum_value))
+
+    values = np.zeros(len(grid_index))
+    if len(layer_keys) > 0:
+        # Schichten des Materials bis zum Stichtag: [first, end)
+        first = np.searchsorted(layer_keys, start_keys)
+        end = np.searchsorted(layer_keys, cutoff_keys)
+        base = pad_quantity[first]
+        total = pad_quantity[end] - base
+        valid = (quantities > 0) & (total >= quantities)
+
+        # Die jüngste Schicht ohne Preis wird erreicht, bevor der Bestand verrechnet ist.
+        no_price = np.concatenate(([-1], np.maximum.accumulate(np.where(has_price, -1,
+                                                                        np.arange(len(layer_keys))))))[end]
+        valid = valid & ~((no_price >= first) & (pad_quantity[end] - pad_quantity[no_price + 1] < quantities))
+
+        # Nicht verrechnete (älteste) Menge und die Schicht, in der die Verrechnung endet
+        remaining = base + total - quantities
+        index = np.minimum(np.searchsorted(cum_quantity, remaining, side='right'), len(layer_keys) - 1)
+        values = np.where(valid, (cum_quantity[index] - remaining) * prices[index] +
+                          (pad_value[end] - cum_value[index]), 0.0)
+
+    return {'fkmaterials': materials[grid_index], 'date': np.tile(dates, len(materials)), 'quantity': quantities,
+            'value': values}
+
+
+def loadValuationReport(session, dates):
+    """Lädt Buchungen und Wareneingänge (zwei Abfragen) und berechnet den Bewertungsbericht zu den Stichtagen."""
+    return valuationReport(loadEntries(session), loadLayers(session), dates)
+
+
+def writeCsv(report, target):
+    """Schreibt den Bericht als CSV (Werte auf zwei Nachkommastellen gerundet) in die Textdatei target."""
+    writer = csv.writer(target, lineterminator='\n')
+    writer.writerow(report_columns)
+    writer.writerows(zip(report['fkmaterials'].tolist(), report['date'].astype(str).tolist(),
+                         report['quantity'].tolist(), np.round(report['value'], 2).tolist()))
+
+
+def writeParquet(report, target):
+    """Schreibt den Bericht als Parquet in die Binärdatei bzw. den Pfad target (benötigt pyarrow)."""
+    import pyarrow
+    import pyarrow.parquet
+
+    table = pyarrow.Table.from_arrays([pyarrow.array(report[column]) for column in report_columns],
+                                      names=report_columns)
+    pyarrow.parquet.write_table(table, target)
+
+
+if __name__ == '__main__':
+    from db import session_scope
+
+    parser = argparse.ArgumentParser(description='Bestand und LIFO-Wert aller Materialien zu Stichtagen')
+    parser.add_argument('--from', dest='first', help='erster Monat (JJJJ-MM)')
+    parser.add_argument('--to', dest='last', help='letzter Monat (JJJJ-MM)')
+    parser.add_argument('--dates', help='kommagetrennte Stichtage (JJJJ-MM-TT) statt der Monatsenden')
+    parser.add_argument('--format', default='csv', choices=report_formats)
+    parser.add_argument('--output', help='Datei, ohne Angabe stdout (nur csv)')
+    args = parser.parse_args()
+
+    try:
+        options = parseReportParameters({'from': args.first, 'to': args.last, 'dates': args.dates,
+                                         'format': args.format})
+    except ValueError as e:
+        parser.error(str(e))
+    if options['format'] == 'parquet' and args.output is None:
+        parser.error('Für parquet muss --output angegeben werden.')
+
+    with session_scope() as session:
+        report = loadValuationReport(session, options['dates'])
+
+    if options['format'] == 'parquet':
+        writeParquet(report, args.output)
+    elif args.output is None:
+        writeCsv(report, sys.stdout)
+    else:
+        with open(args.output, 'w') as f:
+            writeCsv(report, f)
@@ -0,0 +1,79 @@
+import base64
+import io
+import logging
+import simplejson as json
+from db import session_scope
+from profiling import invocation_timer
+from query_stats import trackQueries
+from valuation_report import parseReportParameters, loadValuationReport, writeCsv, writeParquet
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+@trackQueries
+def getValuationReport(event, context):  # Lambda Function
+    """Gibt Bestand und LIFO-Wert aller Materialien zu den Stichtagen als CSV oder Parquet zurück.
+
+    Parameters
+    ----------
+    event: dict, required
+        API Gateway Lambda Proxy Input Format
+
+        Event doc: https://docs.aws.amazon.com/apigateway/latest/developerguide/set-up-lambda-proxy-integrations.html#api-gateway-simple-proxy-for-lambda-input-format
+
+    context: object, required
+        Lambda Context runtime methods and attributes
+
+        Context doc: https://docs.aws.amazon.com/lambda/latest/dg/python-context-object.html
+
+    Returns
+    ------
+    API Gateway Lambda Proxy Output Format: dict
+
+        Return doc: https://docs.aws.amazon.com/apigateway/latest/developerguide/set-up-lambda-proxy-integrations.html
+    """
+
+    try:
+        options = parseReportParameters(event.get('queryStringParameters'))
+    except ValueError as e:
+        return {
+            "statusCode": 400,
+            'headers': {
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+            },
+            "body": json.dumps({"message": str(e)}),
+        }
+
+    with session_scope() as session:
+        report = loadValuationReport(session, options['dates'])
+    logger.info('Bewertungsbericht: ' + str(len(report['fkmaterials'])) + ' Zeilen, ' + str(len(options['dates'])) +
+                ' Stichtage')
+
+    # Parquet wird base64-kodiert zurückgegeben (BinaryMediaTypes der API)
+    with invocation_timer.measure('serialization'):
+        if options['format'] == 'parquet':
+            output = io.BytesIO()
+            writeParquet(report, output)
+            body = base64.b64encode(output.getvalue()).decode('ascii')
+            content_type = 'application/vnd.apache.parquet'
+        else:
+            output = io.StringIO()
+            writeCsv(report, output)
+            body = output.getvalue()
+            content_type = 'text/csv; charset=utf-8'
+
+    return {
+        "statusCode": 200,
+        'headers': {
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST,GET',
+            'Content-Type': content_type,
+            'Content-Disposition': 'attachment; filename="bewertung.' + options['format'] + '"'
+        },
+        "body": body,
+        "isBase64Encoded": options['format'] == 'parquet',
+    }